@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Benchmark for Excel output writers
+بنچمارک نوشتن خروجی اکسل: pd.ExcelWriter در برابر StreamingExcelWriter (ردیف در ثانیه و حافظه)
+
+هر روش در یک فرآیند جداگانه اجرا می‌شود تا بیشینه حافظه (peak RSS) آن مستقل اندازه‌گیری شود.
+
+Usage:
+    python benchmarks/bench_excel_writer.py [--rows 100000 200000] [--chunk-size 10000]
+"""
+
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# اضافه کردن مسیر ماژول به sys.path
+current_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(current_dir))
+sys.path.insert(0, str(current_dir / 'benchmarks'))
+
+from utils.excel_writer import StreamingExcelWriter
+from bench_patterns import build_corpus
+
+METHODS = ['pandas', 'streaming', 'streaming-chunks']
+
+
+def build_chunk(start, rows, corpus):
+    """ساخت یک تکه نمونه شبیه خروجی استخراج"""
+    index = np.arange(start, start + rows)
+    return pd.DataFrame({
+        'description': [corpus[i % len(corpus)] for i in index],
+        'amount': index * 1000,
+        'sheet_name': 'Sheet1',
+        'شماره_وضعیت': np.where(index % 2 == 0, (index % 97).astype(str), None),
+        'مبلغ_ارزی': np.where(index % 3 == 0, index * 1.5, np.nan),
+        'اطمینان_استخراج': (index % 10) / 10,
+    })
+
+
+def run_method(method, rows, chunk_size, path):
+    """اجرای یک روش و چاپ زمان نوشتن و بیشینه حافظه"""
+    corpus = build_corpus(1000)
+    if method == 'streaming-chunks':
+        # داده هرگز به طور کامل در حافظه ساخته نمی‌شود
+        chunks = (build_chunk(start, min(chunk_size, rows - start), corpus) for start in range(0, rows, chunk_size))
+        start_time = time.perf_counter()
+        with StreamingExcelWriter(path) as writer:
+            writer.write_sheet('data', chunks)
+    else:
+        df = build_chunk(0, rows, corpus)
+        start_time = time.perf_counter()
+        if method == 'pandas':
+            with pd.ExcelWriter(path, engine='openpyxl') as writer:
+                df.to_excel(writer, sheet_name='data', index=False)
+        else:
+            with StreamingExcelWriter(path) as writer:
+                writer.write_sheet('data', df)
+    seconds = time.perf_counter() - start_time
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"{seconds} {peak_mb}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='بنچمارک نوشتن خروجی اکسل')
+    parser.add_argument('--rows', type=int, nargs='+', default=[100000, 200000], help='تعداد ردیف‌های هر اجرا')
+    parser.add_argument('--chunk-size', type=int, default=10000, help='اندازه تکه‌ها در روش streaming-chunks')
+    parser.add_argument('--run', choices=METHODS, help=argparse.SUPPRESS)
+    parser.add_argument('--path', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        run_method(args.run, args.rows[0], args.chunk_size, args.path)
+        return 0
+
+    print(f"   {'rows':<10}{'method':<18}{'seconds':>10}{'rows/s':>12}{'peak MB':>10}")
+    with tempfile.TemporaryDirectory() as directory:
+        for rows in args.rows:
+            outputs = {}
+            for method in METHODS:
+                path = os.path.join(directory, f'{method}.xlsx')
+                output = subprocess.run(
+                    [sys.executable, __file__, '--run', method, '--rows', str(rows),
+                     '--chunk-size', str(args.chunk_size), '--path', path],
+                    check=True, capture_output=True, text=True
+                ).stdout.split()
+                seconds, peak_mb = float(output[-2]), float(output[-1])
+                outputs[method] = path
+                print(f"   {rows:<10}{method:<18}{seconds:>10.2f}{rows / seconds:>12.0f}{peak_mb:>10.0f}")
+
+            # بررسی یکسان بودن محتوای فایل‌ها
+            expected = pd.read_excel(outputs['pandas'])
+            for method in METHODS[1:]:
+                pd.testing.assert_frame_equal(pd.read_excel(outputs[method]), expected)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the columnar ingest cache
+بنچمارک حافظه نهان ورودی: پارس xlsx در برابر بارگذاری شیت‌های ذخیره شده
+
+Usage:
+    python benchmarks/bench_ingest_cache.py [--sheets 20] [--rows 2000]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# اضافه کردن مسیر ماژول به sys.path
+current_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(current_dir))
+sys.path.insert(0, str(current_dir / 'benchmarks'))
+
+from utils.excel_reader import read_sheets
+from utils.ingest_cache import IngestCache
+from bench_read_sheets import build_workbook
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='بنچمارک حافظه نهان ورودی')
+    parser.add_argument('--sheets', type=int, default=20, help='تعداد شیت‌ها')
+    parser.add_argument('--rows', type=int, default=2000, help='تعداد ردیف هر شیت')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'ledger.xlsx')
+        build_workbook(path, args.sheets, args.rows)
+        cache = IngestCache(os.path.join(directory, 'cache'))
+
+        expected, baseline = timed(lambda: read_sheets(path, workers=1))
+        _, cold = timed(lambda: read_sheets(path, workers=1, cache=cache))
+        sheets, warm = timed(lambda: read_sheets(path, workers=1, cache=cache))
+
+        # بررسی یکسان بودن ترتیب و محتوای شیت‌ها
+        if list(sheets) != list(expected) or any(not sheets[name].equals(expected[name]) for name in expected):
+            print("❌ نتیجه حافظه نهان متفاوت است")
+            return 1
+
+        print(f"📊 {args.sheets} شیت × {args.rows} ردیف")
+        print(f"   {'method':<24}{'seconds':>10}{'speedup':>10}")
+        print(f"   {'xlsx parse':<24}{baseline:>10.3f}{1:>9.2f}x")
+        print(f"   {'cold cache (parse+store)':<24}{cold:>10.3f}{baseline / cold:>9.2f}x")
+        print(f"   {'warm cache':<24}{warm:>10.3f}{baseline / warm:>9.2f}x")
+        print(f"   {cache.format_stats()}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Scaling benchmark for parallel extract_batch
+بنچمارک مقیاس‌پذیری extract_batch با process pool
+
+Usage:
+    python benchmarks/bench_parallel.py [-n 200000] [--workers 1 2 4 8 16] [--chunksize 0]
+"""
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+# اضافه کردن مسیر ماژول به sys.path
+current_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(current_dir))
+sys.path.insert(0, str(current_dir / 'benchmarks'))
+
+from core.extractors import SmartExtractor
+from bench_patterns import build_corpus
+
+
+def main():
+    parser = argparse.ArgumentParser(description='بنچمارک مقیاس‌پذیری extract_batch')
+    parser.add_argument('-n', '--rows', type=int, default=200000, help='تعداد ردیف‌های نمونه')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8, 16],
+                        help='تعداد فرآیندهای هر اجرا')
+    parser.add_argument('--chunksize', type=int, default=0, help='اندازه هر تکه (0 یعنی خودکار)')
+    args = parser.parse_args()
+
+    corpus = build_corpus(args.rows)
+    extractor = SmartExtractor(parallel_threshold=0)
+
+    print(f"📊 {len(corpus)} ردیف، {os.cpu_count()} هسته")
+    print(f"   {'workers':<10}{'seconds':>10}{'rows/s':>12}{'speedup':>10}")
+    serial = None
+    baseline_seconds = None
+    for workers in args.workers:
+        start = time.perf_counter()
+        result = extractor.extract_batch(corpus, workers=workers, chunksize=args.chunksize or None)
+        seconds = time.perf_counter() - start
+
+        # بررسی یکسان بودن نتایج و شمارنده‌ها با اجرای اول
+        if serial is None:
+            serial, baseline_seconds = result, seconds
+        elif (result.results != serial.results
+              or result.successful_extractions != serial.successful_extractions
+              or result.failed_extractions != serial.failed_extractions):
+            print(f"❌ نتیجه متفاوت با {workers} فرآیند")
+            return 1
+
+        print(f"   {workers:<10}{seconds:>10.2f}{len(corpus) / seconds:>12.0f}{baseline_seconds / seconds:>9.2f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Benchmark for multi-sheet Excel reading
+بنچمارک خواندن فایل چندشیتی: باز کردن مجدد برای هر شیت در برابر یک بار باز کردن و خواندن موازی
+
+Usage:
+    python benchmarks/bench_read_sheets.py [--sheets 40] [--rows 500] [--workers 1 2 4]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+# اضافه کردن مسیر ماژول به sys.path
+current_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(current_dir))
+sys.path.insert(0, str(current_dir / 'benchmarks'))
+
+from utils.excel_reader import read_sheets
+from bench_patterns import build_corpus
+
+
+def build_workbook(path, sheets, rows):
+    """ساخت فایل نمونه با یک شیت برای هر پیمانکار"""
+    corpus = build_corpus(sheets * rows)
+    with pd.ExcelWriter(path, engine='openpyxl') as writer:
+        for index in range(sheets):
+            pd.DataFrame({
+                'تاریخ': ['1402/01/01'] * rows,
+                'شرح': corpus[index * rows:(index + 1) * rows],
+                'مبلغ': range(rows),
+            }).to_excel(writer, sheet_name=f'پیمانکار_{index + 1}', index=False)
+
+
+def read_per_sheet(path):
+    """روش قبلی: فهرست شیت‌ها با ExcelFile و باز کردن مجدد فایل برای هر شیت"""
+    excel_file = pd.ExcelFile(path)
+    return {name: pd.read_excel(path, sheet_name=name) for name in excel_file.sheet_names}
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='بنچمارک خواندن فایل چندشیتی')
+    parser.add_argument('--sheets', type=int, default=40, help='تعداد شیت‌ها')
+    parser.add_argument('--rows', type=int, default=500, help='تعداد ردیف هر شیت')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4], help='تعداد فرآیندهای هر اجرا')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'ledger.xlsx')
+        build_workbook(path, args.sheets, args.rows)
+
+        expected, baseline = timed(lambda: read_per_sheet(path))
+        print(f"📊 {args.sheets} شیت × {args.rows} ردیف، {os.cpu_count()} هسته")
+        print(f"   {'method':<24}{'seconds':>10}{'speedup':>10}")
+        print(f"   {'per-sheet re-read':<24}{baseline:>10.2f}{1:>9.2f}x")
+
+        for workers in args.workers:
+            sheets, seconds = timed(lambda: read_sheets(path, workers=workers))
+            # بررسی یکسان بودن ترتیب و محتوای شیت‌ها
+            if list(sheets) != list(expected) or any(not sheets[name].equals(expected[name]) for name in expected):
+                print(f"❌ نتیجه متفاوت با {workers} فرآیند")
+                return 1
+            name = 'single open' if workers == 1 else f'single open, {workers} proc'
+            print(f"   {name:<24}{seconds:>10.2f}{baseline / seconds:>9.2f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Benchmark for exact and fuzzy matching in the standalone reconciliation
+بنچمارک تطبیق مغایرت‌گیری: حلقه تودرتوی iterrows در برابر اتصال درهم‌سازی (تطبیق دقیق)،
+شاخص معکوس کلمه‌ها (تطبیق فازی) و کوچک شدن مراحل با ماسک ردیف‌های تطبیق شده
+
+Usage:
+    python benchmarks/bench_reconciliation.py [--rows 10000 100000 1000000] [--fuzzy-rows 2000 10000]
+                                              [--pipeline-rows 20000 50000] [--reference-rows 400]
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# اضافه کردن مسیر ماژول به sys.path
+current_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(current_dir))
+
+from standalone_reconciliation import StandaloneReconciliation
+
+
+def build_ledgers(rows, seed=0):
+    """دو دفتر نمونه: فایل B همان صورت‌وضعیت‌ها با ترتیب دیگر، اختلاف کمتر از یک ریال و ردیف‌های اضافه"""
+    rng = np.random.default_rng(seed)
+    invoices = rng.integers(1, max(rows // 2, 2), rows)
+    amounts = rng.integers(1_000, 10_000_000, rows) / 100
+    df_a = pd.DataFrame({
+        'description': [f'صورت وضعیت شماره {invoice} - پیمانکار {invoice % 97}' for invoice in invoices],
+        'amount': amounts,
+    })
+    order = rng.permutation(rows)
+    amounts_b = amounts[order] + rng.choice([0.0, 0.004, -0.009, 0.5], rows)
+    df_b = pd.DataFrame({
+        'description': [f'پرداخت صورت وضعیت شماره {invoice} - پیمانکار {invoice % 97}' for invoice in invoices[order]],
+        # بخشی از مبالغ به صورت متن با جداکننده هزارگان
+        'amount': [f'{amount:,.3f}' if index % 5 == 0 else amount for index, amount in enumerate(amounts_b)],
+    })
+    return df_a, df_b
+
+
+def build_fuzzy_ledgers(rows, seed=0):
+    """دو دفتر با شرح‌های متفاوت از یک رویداد (نام پیمانکار، پروژه و شرح کار) برای تطبیق فازی"""
+    rng = np.random.default_rng(seed)
+    contractors = [f'شرکت {name} {index}' for index, name in enumerate(rng.choice(['آرمان', 'پارس', 'نوین', 'سازه'], 300))]
+    items = ['اجرای فونداسیون', 'خرید تجهیزات', 'حمل مصالح', 'نصب اسکلت', 'عایق کاری', 'لوله کشی']
+    events = [(contractor, project, item) for contractor, project, item in zip(
+        rng.choice(contractors, rows), rng.integers(100, 400, rows), rng.choice(items, rows))]
+    amounts = rng.integers(1_000, 10_000_000, rows) / 100
+    df_a = pd.DataFrame({
+        'description': [f'{contractor} پروژه P{project} {item}' for contractor, project, item in events],
+        'amount': amounts,
+    })
+    order = rng.permutation(rows)
+    df_b = pd.DataFrame({
+        'description': [f'پرداخت به {events[index][0]} P{events[index][1]} {events[index][2]}' for index in order],
+        'amount': amounts[order] * rng.choice([1.0, 1.005, 1.2], rows),
+    })
+    return df_a, df_b
+
+
+def brute_force_fuzzy_matches(reconciliation, df_a, df_b):
+    """امتیازدهی همه جفت‌ها و تخصیص حریصانه بهترین جفت‌ها، هر ردیف یک بار (برای بررسی درستی)"""
+    rows_a = [(idx_a, str(row_a.get('description', '')), reconciliation._convert_to_float(row_a.get('amount', 0)))
+              for idx_a, row_a in df_a.iterrows()]
+    rows_b = [(str(row_b.get('description', '')), reconciliation._convert_to_float(row_b.get('amount', 0)))
+              for _, row_b in df_b.iterrows()]
+    scored = []
+    for position_a, (_, description_a, amount_a) in enumerate(rows_a):
+        for position_b, (description_b, amount_b) in enumerate(rows_b):
+            similarity = reconciliation._calculate_similarity(description_a, description_b)
+            amount_similarity = 100.0 if abs(amount_a - amount_b) / max(amount_a, 1) < 0.01 else 0
+            total_score = (similarity * 0.7) + (amount_similarity * 0.3)
+            if total_score > 70:
+                scored.append((-total_score, position_a, position_b))
+    assigned_a, assigned_b, assignment = set(), set(), []
+    for negative_score, position_a, position_b in sorted(scored):
+        if position_a not in assigned_a and position_b not in assigned_b:
+            assigned_a.add(position_a)
+            assigned_b.add(position_b)
+            assignment.append((position_a, position_b, -negative_score))
+    return [(f"FUZZY{rows_a[position_a][0]}",) + rows_a[position_a][1:] + rows_b[position_b] + (score,)
+            for position_a, position_b, score in sorted(assignment)]
+
+
+def nested_exact_matches(reconciliation, df_a, df_b):
+    """پیمایش کامل فایل B برای هر ردیف A، هر ردیف B یک بار (برای بررسی درستی)"""
+    matches = []
+    used_b = set()
+    for _, row_a in df_a.iterrows():
+        description_a = str(row_a.get('description', ''))
+        amount_a = reconciliation._convert_to_float(row_a.get('amount', 0))
+        invoice_number = reconciliation.extract_invoice_number(description_a)
+        if invoice_number:
+            for position_b, (_, row_b) in enumerate(df_b.iterrows()):
+                description_b = str(row_b.get('description', ''))
+                amount_b = reconciliation._convert_to_float(row_b.get('amount', 0))
+                if (position_b not in used_b and reconciliation.extract_invoice_number(description_b) == invoice_number
+                        and abs(amount_a - amount_b) < 0.01):
+                    used_b.add(position_b)
+                    matches.append((description_a, amount_a, description_b, amount_b))
+                    break
+    return matches
+
+
+def run_stages(reconciliation, ledger_a, ledger_b, shrink=True):
+    """اجرای سه مرحله تطبیق؛ بدون shrink هر مرحله تطبیق همه ردیف‌های دو دفتر را می‌بیند"""
+    matched_a = np.zeros(len(ledger_a), dtype=bool)
+    matched_b = np.zeros(len(ledger_b), dtype=bool)
+    exact = reconciliation._find_exact_matches(ledger_a, ledger_b, matched_a, matched_b)
+    if shrink:
+        fuzzy = reconciliation._find_fuzzy_matches(ledger_a, ledger_b, matched_a, matched_b)
+    else:
+        fuzzy_a = np.zeros(len(ledger_a), dtype=bool)
+        fuzzy_b = np.zeros(len(ledger_b), dtype=bool)
+        fuzzy = reconciliation._find_fuzzy_matches(ledger_a, ledger_b, fuzzy_a, fuzzy_b)
+        matched_a |= fuzzy_a
+        matched_b |= fuzzy_b
+    missing = reconciliation._find_missing_records(ledger_a, ledger_b, matched_a, matched_b)
+    return exact, fuzzy, missing
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='بنچمارک تطبیق مغایرت‌گیری')
+    parser.add_argument('--rows', type=int, nargs='+', default=[10_000, 100_000, 1_000_000],
+                        help='تعداد ردیف هر دفتر در هر اجرا')
+    parser.add_argument('--fuzzy-rows', type=int, nargs='+', default=[2_000, 10_000],
+                        help='تعداد ردیف هر دفتر در هر اجرای تطبیق فازی')
+    parser.add_argument('--pipeline-rows', type=int, nargs='+', default=[20_000, 50_000],
+                        help='تعداد ردیف هر دفتر در مقایسه مراحل با و بدون کوچک شدن')
+    parser.add_argument('--reference-rows', type=int, default=400,
+                        help='تعداد ردیف دفترهای بررسی درستی با حلقه تودرتو')
+    args = parser.parse_args()
+
+    reconciliation = StandaloneReconciliation()
+
+    # بررسی یکسان بودن نتیجه با حلقه تودرتو روی دفترهای کوچک
+    df_a, df_b = build_ledgers(args.reference_rows, seed=1)
+    expected, nested = timed(lambda: nested_exact_matches(reconciliation, df_a, df_b))
+    matches, joined = timed(lambda: reconciliation._find_exact_matches(df_a, df_b))
+    found = [(m['description_a'], m['amount_a'], m['description_b'], m['amount_b']) for m in matches]
+    if found != expected:
+        print("❌ نتیجه اتصال درهم‌سازی با حلقه تودرتو متفاوت است")
+        return 1
+    print(f"✅ {len(expected)} تطبیق یکسان در {args.reference_rows} × {args.reference_rows} ردیف "
+          f"(حلقه تودرتو {nested:.2f}s، اتصال درهم‌سازی {joined:.3f}s)")
+
+    print(f"   {'rows':>12}{'matches':>12}{'seconds':>10}{'rows/s':>12}")
+    for rows in args.rows:
+        df_a, df_b = build_ledgers(rows)
+        matches, seconds = timed(lambda: reconciliation._find_exact_matches(df_a, df_b))
+        print(f"   {rows:>12,}{len(matches):>12,}{seconds:>10.2f}{rows / seconds:>12,.0f}")
+
+    # تطبیق فازی: بررسی درستی با امتیازدهی همه جفت‌ها و سپس زمان و نسبت هرس نامزدها
+    df_a, df_b = build_fuzzy_ledgers(args.reference_rows, seed=1)
+    expected, brute_force = timed(lambda: brute_force_fuzzy_matches(reconciliation, df_a, df_b))
+    matches, indexed = timed(lambda: reconciliation._find_fuzzy_matches(df_a, df_b))
+    found = [(m['statement_number'], m['description_a'], m['amount_a'], m['description_b'], m['amount_b'],
+              m['similarity_score']) for m in matches]
+    if found != expected:
+        print("❌ نتیجه شاخص معکوس با امتیازدهی همه جفت‌ها متفاوت است")
+        return 1
+    print(f"✅ {len(expected)} تطبیق فازی یکسان در {args.reference_rows} × {args.reference_rows} ردیف "
+          f"(همه جفت‌ها {brute_force:.2f}s، شاخص معکوس {indexed:.3f}s)")
+
+    print(f"   {'rows':>12}{'matches':>12}{'candidates':>14}{'pruned':>9}{'seconds':>10}")
+    for rows in args.fuzzy_rows:
+        df_a, df_b = build_fuzzy_ledgers(rows)
+        matches, seconds = timed(lambda: reconciliation._find_fuzzy_matches(df_a, df_b))
+        stats = reconciliation.fuzzy_stats
+        print(f"   {rows:>12,}{len(matches):>12,}{stats['candidates']:>14,}{stats['pruned_ratio'] * 100:>8.1f}%"
+              f"{seconds:>10.2f}")
+
+    # مراحل پشت سر هم: نیمی از ردیف‌ها با شماره صورت‌وضعیت و نیمی فقط با شرح مشابه؛ با ماسک‌ها
+    # تطبیق فازی و رکوردهای مفقود فقط ردیف‌های باقی‌مانده را می‌بینند
+    print(f"   {'rows':>12}{'exact':>10}{'fuzzy':>10}{'missing':>10}{'full':>10}{'shrinking':>11}{'speedup':>9}")
+    for rows in args.pipeline_rows:
+        exact_a, exact_b = build_ledgers(rows // 2)
+        fuzzy_a, fuzzy_b = build_fuzzy_ledgers(rows - rows // 2)
+        ledger_a = reconciliation._prepare_ledger(pd.concat([exact_a, fuzzy_a], ignore_index=True))
+        ledger_b = reconciliation._prepare_ledger(pd.concat([exact_b, fuzzy_b], ignore_index=True))
+        _, full = timed(lambda: run_stages(reconciliation, ledger_a, ledger_b, shrink=False))
+        (exact, fuzzy, missing), shrinking = timed(lambda: run_stages(reconciliation, ledger_a, ledger_b))
+        print(f"   {rows:>12,}{len(exact):>10,}{len(fuzzy):>10,}{len(missing):>10,}{full:>10.2f}{shrinking:>11.2f}"
+              f"{full / shrinking:>8.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,12 +4,15 @@ Core module for Smart Extractor
 """
 
 from .extractors import SmartExtractor
-from .models import ExtractionResult, CurrencyInfo
+from .models import ExtractionResult, CurrencyInfo, ExtractionSummary
 from .patterns import Patterns
+from .keyword_matcher import KeywordMatcher
 
 __all__ = [
     'SmartExtractor',
     'ExtractionResult',
     'CurrencyInfo', 
-    'Patterns'
+    'ExtractionSummary',
+    'Patterns',
+    'KeywordMatcher'
 ]
@@ -0,0 +1,166 @@
+"""
+Columnar batch extraction result
+نتیجه استخراج دسته‌ای ستونی (آرایه‌های NumPy به جای لیست dataclass ها)
+"""
+
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .models import CurrencyInfo, ExtractionResult
+
+
+def _encode(value: Optional[str], categories: Dict[str, int]) -> int:
+    """کد دسته‌ای یک مقدار (-1 برای None)"""
+    if value is None:
+        return -1
+    return categories.setdefault(value, len(categories))
+
+
+class ColumnarBatchResult:
+    """نتیجه دسته‌ای به صورت struct-of-arrays
+
+    مبلغ، نرخ و اطمینان آرایه‌های float64 هستند، نوع ارز و نوع سند کدهای
+    دسته‌ای (int) با فهرست دسته‌ها، و متن‌ها و شماره‌ها آرایه‌های object.
+    ExtractionResult هر ردیف فقط هنگام دسترسی (result[i]) ساخته می‌شود.
+    """
+
+    def __init__(self, original_text: np.ndarray, invoice_number: np.ndarray,
+                 currency_amount: np.ndarray, exchange_rate: np.ndarray,
+                 currency_codes: np.ndarray, currency_categories: Sequence[str],
+                 currency_text: np.ndarray, has_currency: np.ndarray,
+                 company_name: np.ndarray, document_type_codes: np.ndarray,
+                 document_type_categories: Sequence[str], confidence: np.ndarray):
+        self.original_text = original_text
+        self.invoice_number = invoice_number
+        self.currency_amount = currency_amount
+        self.exchange_rate = exchange_rate
+        self.currency_codes = currency_codes
+        self.currency_categories: Tuple[str, ...] = tuple(currency_categories)
+        self.currency_text = currency_text
+        self.has_currency = has_currency
+        self.company_name = company_name
+        self.document_type_codes = document_type_codes
+        self.document_type_categories: Tuple[str, ...] = tuple(document_type_categories)
+        self.confidence = confidence
+
+    @classmethod
+    def from_results(cls, results: Iterable[ExtractionResult]) -> 'ColumnarBatchResult':
+        """ساخت نتیجه ستونی از جریان ExtractionResult ها (مثلاً iter_extract)"""
+        original_text: List = []
+        invoice_number: List = []
+        company_name: List = []
+        currency_text: List = []
+        currency_amount: List[float] = []
+        exchange_rate: List[float] = []
+        confidence: List[float] = []
+        currency_codes: List[int] = []
+        document_type_codes: List[int] = []
+        has_currency: List[bool] = []
+        currencies: Dict[str, int] = {}
+        document_types: Dict[str, int] = {}
+
+        for result in results:
+            info = result.currency_info
+            original_text.append(result.original_text)
+            invoice_number.append(result.invoice_number)
+            company_name.append(result.company_name)
+            confidence.append(result.confidence)
+            document_type_codes.append(_encode(result.document_type, document_types))
+            has_currency.append(info is not None)
+            currency_amount.append(np.nan if info is None or info.amount is None else info.amount)
+            exchange_rate.append(np.nan if info is None or info.rate is None else info.rate)
+            currency_codes.append(_encode(info.currency if info else None, currencies))
+            currency_text.append(info.original_text if info else None)
+
+        def objects(values: List) -> np.ndarray:
+            array = np.empty(len(values), dtype=object)
+            array[:] = values
+            return array
+
+        def codes(values: List[int], categories: Dict[str, int]) -> np.ndarray:
+            # تعداد دسته‌ها معمولاً کم است و کدهای int8 کافی هستند
+            return np.array(values, dtype=np.int8 if len(categories) < 127 else np.int32)
+
+        return cls(
+            original_text=objects(original_text),
+            invoice_number=objects(invoice_number),
+            currency_amount=np.array(currency_amount, dtype=np.float64),
+            exchange_rate=np.array(exchange_rate, dtype=np.float64),
+            currency_codes=codes(currency_codes, currencies),
+            currency_categories=list(currencies),
+            currency_text=objects(currency_text),
+            has_currency=np.array(has_currency, dtype=bool),
+            company_name=objects(company_name),
+            document_type_codes=codes(document_type_codes, document_types),
+            document_type_categories=list(document_types),
+            confidence=np.array(confidence, dtype=np.float64),
+        )
+
+    @property
+    def total_records(self) -> int:
+        return len(self.confidence)
+
+    @property
+    def successful_extractions(self) -> int:
+        # ردیف‌های خطادار اطمینان صفر دارند، پس همان آستانه extract_batch کافی است
+        return int(np.count_nonzero(self.confidence > 0.5))
+
+    @property
+    def failed_extractions(self) -> int:
+        return self.total_records - self.successful_extractions
+
+    def __len__(self) -> int:
+        return self.total_records
+
+    def __getitem__(self, index: int) -> ExtractionResult:
+        """ساخت ExtractionResult یک ردیف هنگام دسترسی"""
+        currency_info = None
+        if self.has_currency[index]:
+            amount = self.currency_amount[index]
+            rate = self.exchange_rate[index]
+            code = self.currency_codes[index]
+            currency_info = CurrencyInfo(
+                amount=None if np.isnan(amount) else float(amount),
+                currency=self.currency_categories[code] if code >= 0 else None,
+                rate=None if np.isnan(rate) else float(rate),
+                original_text=self.currency_text[index]
+            )
+        code = self.document_type_codes[index]
+        return ExtractionResult(
+            original_text=self.original_text[index],
+            invoice_number=self.invoice_number[index],
+            currency_info=currency_info,
+            company_name=self.company_name[index],
+            document_type=self.document_type_categories[code] if code >= 0 else None,
+            confidence=float(self.confidence[index])
+        )
+
+    def __iter__(self) -> Iterator[ExtractionResult]:
+        for index in range(len(self)):
+            yield self[index]
+
+    def to_dataframe(self):
+        """DataFrame بدون کپی آرایه‌ها (ستون‌های نوع ارز و نوع سند categorical هستند)"""
+        import pandas as pd
+
+        return pd.DataFrame({
+            'original_description': self.original_text,
+            'invoice_number': self.invoice_number,
+            'currency_amount': self.currency_amount,
+            'currency_type': pd.Categorical.from_codes(self.currency_codes, categories=self.currency_categories),
+            'exchange_rate': self.exchange_rate,
+            'company_name': self.company_name,
+            'document_type': pd.Categorical.from_codes(self.document_type_codes, categories=self.document_type_categories),
+            'extraction_confidence': self.confidence,
+        }, copy=False)
+
+    def to_dict(self) -> Dict:
+        """تبدیل به دیکشنری (همان ساختار BatchExtractionResult.to_dict)"""
+        return {
+            'results': [result.to_dict() for result in self],
+            'total_records': self.total_records,
+            'successful_extractions': self.successful_extractions,
+            'failed_extractions': self.failed_extractions,
+            'success_rate': self.successful_extractions / self.total_records if self.total_records > 0 else 0
+        }
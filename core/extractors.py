@@ -3,27 +3,138 @@ Main extractor class for Smart Extractor
 کلاس اصلی استخراج کننده اطلاعات
 """
 
-from typing import List, Optional
-from .models import ExtractionResult, CurrencyInfo, BatchExtractionResult
+import os
+import re
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Iterator, List, Optional, Union
+from .models import ExtractionResult, CurrencyInfo, BatchExtractionResult, ExtractionSummary
 from .patterns import Patterns
 
+if TYPE_CHECKING:
+    import pandas as pd
+    from .columnar import ColumnarBatchResult
+    from .persistent_cache import PersistentExtractionCache
+
 
 class SmartExtractor:
     """کلاس اصلی استخراج کننده اطلاعات هوشمند"""
     
-    def __init__(self):
+    # حداقل تعداد متن برای اجرای موازی extract_batch
+    PARALLEL_THRESHOLD = 5000
+    
+    # فیلدهای قابل انتخاب با پارامتر fields (نام ویژگی‌های ExtractionResult)
+    FIELDS = ('invoice_number', 'currency_info', 'company_name', 'document_type')
+    
+    # ستون‌های خروجی extract_series برای هر فیلد
+    FIELD_COLUMNS = {
+        'invoice_number': ('invoice_number',),
+        'currency_info': ('currency_amount', 'currency_type', 'exchange_rate'),
+        'company_name': ('company_name',),
+        'document_type': ('document_type',),
+    }
+    
+    def __init__(self, cache_size: Optional[int] = None, parallel_threshold: Optional[int] = None,
+                 persistent_cache: Optional['PersistentExtractionCache'] = None):
         self.patterns = Patterns()
+        self.parallel_threshold = self.PARALLEL_THRESHOLD if parallel_threshold is None else parallel_threshold
+        
+        # حافظه نهان ماندگار (SQLite) برای extract_series بین اجراهای مختلف
+        self.persistent_cache = persistent_cache
+        
+        # حافظه نهان LRU نتایج بر اساس متن شرح (None یا 0 یعنی غیرفعال)
+        self.cache_size = cache_size
+        self._cache: Optional[OrderedDict] = OrderedDict() if cache_size else None
+        self._cache_version: Optional[str] = None
+        self._cache_hits = 0
+        self._cache_misses = 0
+        self._cache_evictions = 0
     
-    def extract_from_text(self, text: str) -> ExtractionResult:
-        """استخراج اطلاعات از یک متن"""
+    @classmethod
+    def resolve_fields(cls, fields: Optional[Iterable[str]]) -> Optional[frozenset]:
+        """اعتبارسنجی fields؛ None یعنی همه فیلدها"""
+        if fields is None:
+            return None
+        selected = frozenset([fields] if isinstance(fields, str) else fields)
+        unknown = selected.difference(cls.FIELDS)
+        if unknown:
+            raise ValueError(f"فیلدهای نامعتبر: {sorted(unknown)} (مجاز: {list(cls.FIELDS)})")
+        return None if len(selected) == len(cls.FIELDS) else selected
+    
+    def extract_from_text(self, text: str, fields: Optional[Iterable[str]] = None) -> ExtractionResult:
+        """استخراج اطلاعات از یک متن
+
+        با fields فقط استخراج‌کننده‌های همان فیلدها اجرا می‌شوند؛ بقیه فیلدها None
+        می‌مانند و اطمینان کلی میانگین اطمینان فیلدهای انتخاب‌شده است.
+        """
+        fields = self.resolve_fields(fields)
         if not text:
             return ExtractionResult(original_text=text, confidence=0.0)
         
+        if self._cache is None:
+            return self._extract_uncached(text, fields)
+        
+        # با تغییر مجموعه الگوها نتایج قبلی معتبر نیستند
+        version = self.patterns.version()
+        if version != self._cache_version:
+            self._cache.clear()
+            self._cache_version = version
+        
+        key = text if fields is None else (text, fields)
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._cache.move_to_end(key)
+            self._cache_hits += 1
+            return self._copy_result(cached)
+        
+        self._cache_misses += 1
+        result = self._extract_uncached(text, fields)
+        self._cache[key] = result
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+            self._cache_evictions += 1
+        return self._copy_result(result)
+    
+    @staticmethod
+    def _copy_result(result: ExtractionResult) -> ExtractionResult:
+        """کپی نتیجه تا تغییر آن توسط فراخواننده حافظه نهان را خراب نکند"""
+        currency_info = result.currency_info
+        if currency_info is not None:
+            currency_info = CurrencyInfo(currency_info.amount, currency_info.currency,
+                                         currency_info.rate, currency_info.original_text)
+        return ExtractionResult(result.original_text, result.invoice_number, currency_info,
+                                result.company_name, result.document_type, result.confidence)
+    
+    def cache_info(self) -> Dict[str, Any]:
+        """آمار حافظه نهان نتایج"""
+        return {
+            'hits': self._cache_hits,
+            'misses': self._cache_misses,
+            'evictions': self._cache_evictions,
+            'size': len(self._cache) if self._cache is not None else 0,
+            'max_size': self.cache_size or 0,
+        }
+    
+    def clear_cache(self):
+        """خالی کردن حافظه نهان و صفر کردن آمار آن"""
+        if self._cache is not None:
+            self._cache.clear()
+        self._cache_hits = self._cache_misses = self._cache_evictions = 0
+    
+    def _extract_uncached(self, text: str, fields: Optional[frozenset] = None) -> ExtractionResult:
+        """استخراج اطلاعات از یک متن غیرخالی بدون حافظه نهان"""
+        wanted = self.FIELDS if fields is None else fields
+        
         # استخراج شماره صورت‌وضعیت
-        invoice_number, invoice_confidence = self.patterns.extract_invoice_number(text)
+        invoice_number, invoice_confidence = None, 0.0
+        if 'invoice_number' in wanted:
+            invoice_number, invoice_confidence = self.patterns.extract_invoice_number(text)
         
         # استخراج اطلاعات ارز
-        currency_data, currency_confidence = self.patterns.extract_currency_info(text)
+        currency_data, currency_confidence = None, 0.0
+        if 'currency_info' in wanted:
+            currency_data, currency_confidence = self.patterns.extract_currency_info(text)
         currency_info = None
         if currency_data:
             currency_info = CurrencyInfo(
@@ -34,10 +145,14 @@ class SmartExtractor:
             )
         
         # استخراج نام شرکت
-        company_name, company_confidence = self.patterns.extract_company(text)
+        company_name, company_confidence = None, 0.0
+        if 'company_name' in wanted:
+            company_name, company_confidence = self.patterns.extract_company(text)
         
         # تشخیص نوع سند
-        document_type, doc_confidence = self.patterns.detect_document_type(text)
+        document_type, doc_confidence = None, 0.0
+        if 'document_type' in wanted:
+            document_type, doc_confidence = self.patterns.detect_document_type(text)
         
         # محاسبه اطمینان کلی
         confidences = [invoice_confidence, currency_confidence, company_confidence, doc_confidence]
@@ -53,38 +168,210 @@ class SmartExtractor:
             confidence=overall_confidence
         )
     
-    def extract_batch(self, texts: List[str]) -> BatchExtractionResult:
-        """استخراج اطلاعات از لیستی از متون"""
-        results = []
-        successful = 0
-        failed = 0
+    def extract_batch(self, texts: List[str], workers: Optional[int] = None,
+                      chunksize: Optional[int] = None,
+                      fields: Optional[Iterable[str]] = None) -> BatchExtractionResult:
+        """استخراج اطلاعات از لیستی از متون
+
+        با workers > 1 (یا 0 برای تعداد هسته‌ها) تکه‌هایی به اندازه chunksize بین
+        فرآیندهای یک process pool پخش می‌شوند؛ ترتیب نتایج حفظ و شمارنده‌ها ادغام
+        می‌شوند. دسته‌های کوچک‌تر از parallel_threshold به صورت سریال اجرا می‌شوند.
+        fields مانند extract_from_text استخراج را به فیلدهای انتخاب‌شده محدود می‌کند.
+        """
+        fields = self.resolve_fields(fields)
+        texts = list(texts)
+        if workers == 0:
+            workers = os.cpu_count() or 1
+        if not workers or workers <= 1 or len(texts) < self.parallel_threshold:
+            return self._extract_batch_serial(texts, fields)
         
-        for text in texts:
-            try:
-                result = self.extract_from_text(text)
-                results.append(result)
-                if result.confidence > 0.5:  # آستانه موفقیت
-                    successful += 1
-                else:
-                    failed += 1
-            except Exception:
-                failed += 1
-                results.append(ExtractionResult(original_text=text, confidence=0.0))
+        if not chunksize:
+            # چند تکه برای هر فرآیند تا بار کاری متوازن بماند
+            chunksize = max(1, -(-len(texts) // (workers * 4)))
+        chunks = [texts[start:start + chunksize] for start in range(0, len(texts), chunksize)]
+        
+        initargs = (type(self.patterns), self.patterns.pattern_sources(), self.cache_size)
+        with ProcessPoolExecutor(max_workers=min(workers, len(chunks)),
+                                 initializer=_init_worker, initargs=initargs) as executor:
+            partial_results = list(executor.map(partial(_extract_chunk, fields=fields), chunks))
+        
+        return BatchExtractionResult(
+            results=[result for partial in partial_results for result in partial.results],
+            total_records=len(texts),
+            successful_extractions=sum(partial.successful_extractions for partial in partial_results),
+            failed_extractions=sum(partial.failed_extractions for partial in partial_results)
+        )
+    
+    def _extract_batch_serial(self, texts: List[str], fields: Optional[frozenset] = None) -> BatchExtractionResult:
+        """استخراج سریال لیستی از متون در همین فرآیند"""
+        summary = ExtractionSummary()
+        results = list(self.iter_extract(texts, summary, fields))
         
         return BatchExtractionResult(
             results=results,
             total_records=len(texts),
-            successful_extractions=successful,
-            failed_extractions=failed
+            successful_extractions=summary.successful_extractions,
+            failed_extractions=summary.failed_extractions
         )
     
+    def extract_batch_columnar(self, texts: Iterable[str]) -> 'ColumnarBatchResult':
+        """استخراج دسته‌ای با نتیجه ستونی (آرایه‌های NumPy به جای لیست نتایج)"""
+        from .columnar import ColumnarBatchResult
+        
+        return ColumnarBatchResult.from_results(self.iter_extract(texts))
+    
+    def iter_extract(self, texts: Iterable[str], summary: Optional[ExtractionSummary] = None,
+                     fields: Optional[Iterable[str]] = None) -> Iterator[ExtractionResult]:
+        """استخراج تنبل: نتیجه هر متن به محض آماده شدن برگردانده می‌شود
+
+        حافظه مصرفی به تعداد ردیف‌ها بستگی ندارد؛ اگر summary داده شود آمار
+        get_extraction_summary همزمان در آن به‌روز می‌شود.
+        """
+        fields = self.resolve_fields(fields)
+        for text in texts:
+            try:
+                result = self.extract_from_text(text, fields)
+                failed = False
+            except Exception:
+                result = ExtractionResult(original_text=text, confidence=0.0)
+                failed = True
+            if summary is not None:
+                summary.update(result, failed)
+            yield result
+    
+    def extract_series(self, texts: 'pd.Series', fields: Optional[Iterable[str]] = None) -> 'pd.DataFrame':
+        """استخراج ستونی از یک سری متن با موتور رشته‌ای pandas
+
+        خروجی هم‌اندیس با texts و همان مقادیر extract_from_text برای هر ردیف است
+        (ستون‌ها مانند extract_from_description_column بدون original_description).
+        مقادیر غیرمتنی یا خالی مانند متن خالی بدون نتیجه و با اطمینان صفر هستند.
+        با fields فقط ستون‌های فیلدهای انتخاب‌شده (FIELD_COLUMNS) و اطمینان تولید می‌شوند.
+        اگر persistent_cache تنظیم شده باشد فقط متن‌های جدید استخراج می‌شوند.
+        """
+        fields = self.resolve_fields(fields)
+        if self.persistent_cache is not None:
+            return self._extract_series_cached(texts, fields)
+        return self._extract_series(texts, fields)
+
+    def _extract_series_cached(self, texts: 'pd.Series', fields: Optional[frozenset]) -> 'pd.DataFrame':
+        """extract_series با خواندن و نوشتن یکجای حافظه نهان ماندگار"""
+        import numpy as np
+        import pandas as pd
+        from .vectorized import as_object, text_mask
+
+        cache = self.persistent_cache
+        namespace = f"{self.patterns.version()}|{','.join(sorted(fields)) if fields else '*'}"
+        has_text = text_mask(texts).to_numpy()
+        keys = np.full(len(texts), None, dtype=object)
+        keys[has_text] = [cache.make_key(namespace, text) for text in texts[has_text]]
+        cached = cache.get_many(keys[has_text])
+        hit = np.fromiter((key in cached for key in keys), dtype=bool, count=len(keys))
+
+        positions = np.arange(len(texts))
+        computed = self._extract_series(texts[~hit], fields)
+        computed.index = positions[~hit]
+        computed_keys = keys[~hit]
+        stored = computed[has_text[~hit]]
+        cache.set_many({
+            key: {column: (None if pd.isna(value) else value) for column, value in row.items()}
+            for key, row in zip(computed_keys[has_text[~hit]], stored.to_dict('records'))
+        })
+
+        from_cache = pd.DataFrame([cached[key] for key in keys[hit]], index=positions[hit], columns=computed.columns)
+        result = pd.concat([computed, from_cache]).sort_index() if len(from_cache) else computed
+        for column in result.columns:
+            if column in ('currency_amount', 'exchange_rate', 'extraction_confidence'):
+                result[column] = result[column].astype(float)
+            else:
+                result[column] = as_object(result[column])
+        result.index = texts.index
+        return result
+
+    def _extract_series(self, texts: 'pd.Series', fields: Optional[frozenset]) -> 'pd.DataFrame':
+        """استخراج ستونی بدون حافظه نهان ماندگار"""
+        import numpy as np
+        import pandas as pd
+        from .vectorized import as_object, first_keyword, first_match, take, text_mask, to_float
+
+        wanted = self.FIELDS if fields is None else fields
+        registry = self.patterns.registry()
+        has_text = text_mask(texts).to_numpy()
+        columns = {}
+        zeros = np.zeros(len(texts))
+        invoice_confidence = currency_confidence = company_confidence = document_confidence = zeros
+
+        def column(frame, name, numeric=False):
+            if name not in frame.columns:
+                return np.full(len(texts), np.nan) if numeric else as_object([None] * len(texts)).to_numpy()
+            return frame[name].astype(float).to_numpy() if numeric else as_object(frame[name]).to_numpy()
+
+        # شماره صورت‌وضعیت
+        if 'invoice_number' in wanted:
+            invoice = first_match(texts, registry.invoice.patterns, re.IGNORECASE)
+            invoice_confidence = take(registry.invoice_confidences, invoice['pattern'].to_numpy(), 0.0).astype(float)
+            columns['invoice_number'] = column(invoice, 1)
+
+        # اطلاعات ارز؛ ردیفی که تبدیل عدد آن خطا دهد به الگوی بعدی می‌رود
+        def convert_currency(pattern_index, whole, groups):
+            amount_text = groups[1].str.replace(',', '', regex=False)
+            amount = to_float(amount_text)
+            failed = amount_text.fillna('').ne('') & amount.isna()
+            rate = pd.Series(np.nan, index=groups.index)
+            if 3 in groups.columns:
+                rate_text = groups[3]
+                has_rate = rate_text.fillna('').ne('')
+                rate = to_float(rate_text.str.replace(',', '', regex=False)).where(has_rate)
+                failed |= has_rate & rate.isna()
+            frame = pd.DataFrame({
+                'amount': amount,
+                'currency': groups[2] if 2 in groups.columns else None,
+                'rate': rate,
+                'confidence': np.where(rate.fillna(0) != 0, 1.0, 0.8),
+            }, index=groups.index)
+            return frame[~failed]
+
+        if 'currency_info' in wanted:
+            currency = first_match(texts, registry.currency.patterns, re.IGNORECASE, convert_currency)
+            if 'confidence' in currency.columns:
+                currency_confidence = currency['confidence'].fillna(0.0).to_numpy(dtype=float)
+            columns['currency_amount'] = column(currency, 'amount', numeric=True)
+            columns['currency_type'] = column(currency, 'currency')
+            columns['exchange_rate'] = column(currency, 'rate', numeric=True)
+
+        # نام شرکت
+        if 'company_name' in wanted:
+            company_index = first_keyword(texts, registry.company)
+            company_confidence = take(registry.company_confidences, company_index, 0.0).astype(float)
+            columns['company_name'] = take(registry.company.keywords, company_index, None)
+
+        # نوع سند (مانند detect_document_type: trie برای الگوهای کلمه‌ای، در غیر این صورت str.extract)
+        if 'document_type' in wanted:
+            lowered = texts.astype(object).where(has_text, None).str.lower()
+            if registry.document_keywords is not None:
+                keyword_index = first_keyword(lowered, registry.document_keywords)
+                document_index = take(registry.document_keyword_patterns, keyword_index, -1).astype(int)
+            else:
+                document_index = first_match(lowered, registry.document_type.patterns, re.IGNORECASE)['pattern'].to_numpy()
+            columns['document_type'] = np.where(has_text, take(registry.document_types, document_index, 'سند متفرقه'), None)
+            document_confidence = np.where(has_text, take(registry.document_type_confidences, document_index, 0.5), 0.0).astype(float)
+
+        # اطمینان کلی: میانگین اطمینان‌های غیرصفر
+        confidences = (invoice_confidence, currency_confidence, company_confidence, document_confidence)
+        total = confidences[0] + confidences[1] + confidences[2] + confidences[3]
+        count = sum((confidence > 0).astype(int) for confidence in confidences)
+        columns['extraction_confidence'] = np.divide(total, count, out=np.zeros(len(texts)), where=count > 0)
+
+        return pd.DataFrame(columns, index=texts.index)
+
     def extract_from_description_column(self, descriptions: List[str]) -> List[dict]:
         """استخراج اطلاعات از ستون شرح و تبدیل به لیست دیکشنری"""
-        batch_result = self.extract_batch(descriptions)
-        
-        extracted_data = []
-        for result in batch_result.results:
-            data = {
+        return list(self.iter_description_rows(descriptions))
+    
+    def iter_description_rows(self, descriptions: Iterable[str],
+                              summary: Optional[ExtractionSummary] = None) -> Iterator[dict]:
+        """نسخه جریانی extract_from_description_column (یک دیکشنری برای هر شرح)"""
+        for result in self.iter_extract(descriptions, summary):
+            yield {
                 'original_description': result.original_text,
                 'invoice_number': result.invoice_number,
                 'currency_amount': result.currency_info.amount if result.currency_info else None,
@@ -94,12 +381,11 @@ class SmartExtractor:
                 'document_type': result.document_type,
                 'extraction_confidence': result.confidence
             }
-            extracted_data.append(data)
-        
-        return extracted_data
     
-    def get_extraction_summary(self, batch_result: BatchExtractionResult) -> dict:
-        """خلاصه نتایج استخراج"""
+    def get_extraction_summary(self, batch_result: Union[BatchExtractionResult, ExtractionSummary]) -> dict:
+        """خلاصه نتایج استخراج (از نتیجه دسته‌ای یا خلاصه در حال اجرای iter_extract)"""
+        if isinstance(batch_result, ExtractionSummary):
+            return batch_result.to_dict()
         return {
             'total_records': batch_result.total_records,
             'successful_extractions': batch_result.successful_extractions,
@@ -107,3 +393,22 @@ class SmartExtractor:
             'success_rate': batch_result.successful_extractions / batch_result.total_records if batch_result.total_records > 0 else 0,
             'average_confidence': sum(r.confidence for r in batch_result.results) / len(batch_result.results) if batch_result.results else 0
         }
+
+# استخراج‌کننده هر فرآیند process pool
+_worker_extractor: Optional[SmartExtractor] = None
+
+
+def _init_worker(patterns_class: type, sources: tuple, cache_size: Optional[int]):
+    """ساخت استخراج‌کننده فرآیند با همان مجموعه الگوهای فرآیند اصلی"""
+    global _worker_extractor
+    (patterns_class.INVOICE_PATTERNS, patterns_class.CURRENCY_PATTERNS,
+     patterns_class.COMPANY_PATTERNS, patterns_class.DOCUMENT_TYPE_PATTERNS) = sources
+    patterns_class.invalidate_registry()
+    _worker_extractor = SmartExtractor(cache_size=cache_size)
+    _worker_extractor.patterns = patterns_class()
+
+
+def _extract_chunk(texts: List[str], fields: Optional[frozenset] = None) -> BatchExtractionResult:
+    """استخراج سریال یک تکه در فرآیند کارگر"""
+    return _worker_extractor._extract_batch_serial(texts, fields)
+
@@ -0,0 +1,120 @@
+"""
+Multi-keyword matcher for Smart Extractor
+جستجوی هم‌زمان چندین کلمه کلیدی در متن با یک trie کامپایل‌شده
+"""
+
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+_END = ''
+
+
+class KeywordMatcher:
+    """جستجوگر چندکلمه‌ای مبتنی بر trie
+
+    کلمات کلیدی یک بار در یک trie قرار می‌گیرند و trie به یک عبارت منظم
+    تودرتو کامپایل می‌شود؛ در هر موقعیت متن تنها مسیر منطبق trie پیموده
+    می‌شود و هزینه به تعداد کلمات بستگی ندارد. شاخه‌ها حریصانه هستند، بنابراین
+    در هر موقعیت طولانی‌ترین کلمه انتخاب می‌شود (leftmost-longest).
+
+    اندیس کلمات همان اولویت آنهاست؛ first_by_priority همان نتیجه‌ی حلقه
+    `for keyword in keywords: if keyword in text` را برمی‌گرداند. برای
+    فهرست‌های کوتاه خود همین حلقه سریع‌تر است و مستقیماً استفاده می‌شود.
+    """
+
+    # تا این تعداد کلمه، جستجوی خطی با `in` از پیمایش trie سریع‌تر است
+    LINEAR_SCAN_LIMIT = 24
+
+    def __init__(self, keywords: Iterable[str], ignore_case: bool = False):
+        self.keywords: Tuple[str, ...] = tuple(keywords)
+        self.ignore_case = ignore_case
+        self._folded = tuple(self._fold(keyword) for keyword in self.keywords)
+
+        # اندیس اولین رخداد هر کلمه (کلمات تکراری اولویت اول را نگه می‌دارند)
+        self._index: Dict[str, int] = {}
+        for index, keyword in enumerate(self.keywords):
+            if keyword:
+                self._index.setdefault(self._fold(keyword), index)
+
+        trie: dict = {}
+        for key in self._index:
+            node = trie
+            for char in key:
+                node = node.setdefault(char, {})
+            node[_END] = True
+
+        # کمترین اندیس بین کلماتی که پیشوند هر کلمه هستند (از جمله خودش)؛
+        # کلمه‌ای که پیشوند کلمه طولانی‌تر منطبق باشد در همان موقعیت رخ داده است
+        self._prefix_priority: Dict[str, int] = {}
+        for key, index in self._index.items():
+            best = index
+            for length in range(1, len(key)):
+                prefix_index = self._index.get(key[:length])
+                if prefix_index is not None and prefix_index < best:
+                    best = prefix_index
+            self._prefix_priority[key] = best
+
+        flags = re.IGNORECASE if ignore_case else 0
+        body = self._node_pattern(trie) if self._index else None
+        self._regex = re.compile(body, flags) if body else None
+        self._overlapping = re.compile(f'(?=({body}))', flags) if body else None
+
+    def _fold(self, text: str) -> str:
+        return text.lower() if self.ignore_case else text
+
+    @classmethod
+    def _node_pattern(cls, node: dict) -> str:
+        """تبدیل یک گره trie به عبارت منظم (شاخه‌های طولانی‌تر مقدم هستند)"""
+        branches = [re.escape(char) + cls._node_pattern(child)
+                    for char, child in node.items() if char != _END]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        if _END in node:
+            body = '(?:' + body + ')?'
+        return body
+
+    def _keyword_index(self, matched: str) -> int:
+        return self._index[self._fold(matched)]
+
+    def search(self, text: str) -> Optional[Tuple[int, int, int]]:
+        """اولین تطابق leftmost-longest به صورت (شروع، پایان، اندیس کلمه)"""
+        if self._regex is None or not text:
+            return None
+        match = self._regex.search(text)
+        if match is None:
+            return None
+        return match.start(), match.end(), self._keyword_index(match.group(0))
+
+    def find_all(self, text: str) -> List[Tuple[int, int, int]]:
+        """تمام تطابق‌های leftmost-longest بدون هم‌پوشانی"""
+        if self._regex is None or not text:
+            return []
+        return [(match.start(), match.end(), self._keyword_index(match.group(0)))
+                for match in self._regex.finditer(text)]
+
+    def contains_any(self, text: str) -> bool:
+        """آیا حداقل یکی از کلمات در متن وجود دارد"""
+        if self._regex is None or not text:
+            return False
+        return self._regex.search(text) is not None
+
+    def first_by_priority(self, text: str) -> Optional[int]:
+        """اندیس پراولویت‌ترین کلمه‌ای که در هر جای متن آمده است"""
+        if self._overlapping is None or not text:
+            return None
+        if len(self._index) <= self.LINEAR_SCAN_LIMIT:
+            folded = self._fold(text)
+            for index, keyword in enumerate(self._folded):
+                if keyword and keyword in folded:
+                    return index
+            return None
+
+        best = None
+        for match in self._overlapping.finditer(text):
+            priority = self._prefix_priority[self._fold(match.group(1))]
+            if best is None or priority < best:
+                best = priority
+                if best == 0:
+                    break
+        return best
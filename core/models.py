@@ -64,3 +64,39 @@ class BatchExtractionResult:
             'failed_extractions': self.failed_extractions,
             'success_rate': self.successful_extractions / self.total_records if self.total_records > 0 else 0
         }
+
+
+@dataclass
+class ExtractionSummary:
+    """خلاصه در حال اجرای استخراج (برای پردازش جریانی بدون نگهداری نتایج)"""
+    total_records: int = 0
+    successful_extractions: int = 0
+    failed_extractions: int = 0
+    confidence_sum: float = 0.0
+    
+    def update(self, result: ExtractionResult, failed: bool = False):
+        """افزودن نتیجه یک ردیف به آمار"""
+        self.total_records += 1
+        self.confidence_sum += result.confidence
+        if not failed and result.confidence > 0.5:  # آستانه موفقیت
+            self.successful_extractions += 1
+        else:
+            self.failed_extractions += 1
+    
+    @property
+    def success_rate(self) -> float:
+        return self.successful_extractions / self.total_records if self.total_records > 0 else 0
+    
+    @property
+    def average_confidence(self) -> float:
+        return self.confidence_sum / self.total_records if self.total_records > 0 else 0
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """تبدیل به دیکشنری (همان کلیدهای get_extraction_summary)"""
+        return {
+            'total_records': self.total_records,
+            'successful_extractions': self.successful_extractions,
+            'failed_extractions': self.failed_extractions,
+            'success_rate': self.success_rate,
+            'average_confidence': self.average_confidence
+        }
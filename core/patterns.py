@@ -3,8 +3,147 @@ Pattern definitions for text extraction
 الگوهای regex برای استخراج اطلاعات از متن
 """
 
+import hashlib
 import re
-from typing import List, Tuple
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .keyword_matcher import KeywordMatcher
+
+# نویسه‌های ویژه regex؛ الگوی بدون این نویسه‌ها (حتی با فاصله) یک رشته ساده است
+_REGEX_METACHARACTERS = frozenset('.^$*+?{}[]\\|()')
+
+
+class PatternFamily:
+    """یک خانواده الگو که در یک alternation کامپایل‌شده واحد ادغام شده است
+
+    الگوها به ترتیب اولویت در یک alternation با گروه‌های نام‌دار (p0، p1، ...)
+    قرار می‌گیرند. ابتدا الگوی اول (بالاترین اولویت) جستجو می‌شود؛ اگر یافت
+    نشد، بقیه الگوها با نسخه بدون گروه همین alternation در یک پیمایش بررسی
+    می‌شوند که چپ‌ترین موقعیت منطبق را برمی‌گرداند و alternation نام‌دار در
+    همان موقعیت مشخص می‌کند کدام الگو منطبق شده است. اگر آن الگو پراولویت‌ترین
+    الگوی باقی‌مانده نباشد، جستجو از موقعیت بعدی تنها با الگوهای پراولویت‌تر
+    ادامه می‌یابد؛ بنابراین نتیجه همان حلقه‌ی re.search روی الگوها است.
+    """
+
+    def __init__(self, patterns: Sequence[str], flags: int = 0):
+        self.patterns = tuple(patterns)
+        self.flags = flags
+        self.compiled = tuple(re.compile(pattern, flags) for pattern in self.patterns)
+
+        # الگوهای تکراری هرگز برنده نمی‌شوند و از alternation کنار گذاشته می‌شوند
+        alternatives: List[int] = []
+        seen = set()
+        for index, pattern in enumerate(self.patterns):
+            if pattern not in seen:
+                seen.add(pattern)
+                alternatives.append(index)
+
+        # نگاشت شماره گروه بیرونی هر الگو به اندیس آن
+        self._group_to_index: Dict[int, int] = {}
+        named_parts = []
+        group_number = 1
+        for index in alternatives:
+            named_parts.append(f'(?P<p{index}>{self.patterns[index]})')
+            self._group_to_index[group_number] = index
+            group_number += 1 + self.compiled[index].groups
+        self.combined = re.compile('|'.join(named_parts), flags) if named_parts else None
+
+        # _scanners[k]: alternation بدون گروه از الگوهای باقی‌مانده با اندیس کمتر از k
+        self._first = self.compiled[0] if self.compiled else None
+        self._scanners: List[Optional['re.Pattern']] = []
+        for bound in range(len(self.patterns) + 1):
+            parts = [f'(?:{self.patterns[i]})' for i in alternatives[1:] if i < bound]
+            self._scanners.append(re.compile('|'.join(parts), flags) if parts else None)
+
+    def search(self, text: str) -> Optional[Tuple[int, 're.Match']]:
+        """یافتن الگوی با بالاترین اولویت؛ خروجی (اندیس الگو، match)"""
+        if self._first is None:
+            return None
+        match = self._first.search(text)
+        if match:
+            return 0, match
+
+        best = None
+        scanner = self._scanners[-1]
+        position = 0
+        while scanner is not None:
+            hit = scanner.search(text, position)
+            if hit is None:
+                break
+            start = hit.start()
+            index = self._group_to_index[self.combined.match(text, start).lastindex]
+            best = (index, start)
+            scanner = self._scanners[index]
+            position = start + 1
+
+        if best is None:
+            return None
+        index, start = best
+        return index, self.compiled[index].match(text, start)
+
+    def search_from(self, text: str, start_index: int) -> Optional[Tuple[int, 're.Match']]:
+        """جستجوی ترتیبی از الگوی start_index به بعد (برای حالت‌های بازگشتی)"""
+        for index in range(start_index, len(self.compiled)):
+            match = self.compiled[index].search(text)
+            if match:
+                return index, match
+        return None
+
+
+class PatternRegistry:
+    """مجموعه الگوهای کامپایل‌شده یک کلاس Patterns به همراه قواعد اطمینان"""
+
+    def __init__(self, sources: tuple):
+        # خود لیست‌ها و یک کپی از محتوای آنها برای تشخیص تغییر الگوها نگه داشته می‌شوند
+        self.sources = sources
+        self.snapshot = tuple(list(source) for source in sources)
+        invoice_patterns, currency_patterns, company_patterns, document_type_patterns = (
+            tuple(source) for source in sources
+        )
+        self.version = hashlib.sha1(
+            repr((invoice_patterns, currency_patterns, company_patterns, document_type_patterns)).encode('utf-8')
+        ).hexdigest()[:12]
+
+        self.invoice = PatternFamily(invoice_patterns, re.IGNORECASE)
+        self.invoice_confidences = tuple(
+            1.0 if 'صورت وضعیت' in pattern or 'Invoice' in pattern else 0.8
+            for pattern in invoice_patterns
+        )
+
+        self.currency = PatternFamily(currency_patterns, re.IGNORECASE)
+
+        self.company = KeywordMatcher(company_patterns)
+        self.company_confidences = tuple(
+            0.9 if company in ['ایران', 'Iran'] else 0.7
+            for company in company_patterns
+        )
+
+        document_patterns = [pattern for pattern, _ in document_type_patterns]
+        self.document_type = PatternFamily(document_patterns, re.IGNORECASE)
+        self.document_types = tuple(doc_type for _, doc_type in document_type_patterns)
+
+        self.document_type_confidences = tuple(
+            0.9 if pattern in ['صورت وضعیت', 'Invoice'] else 0.7
+            for pattern, _ in document_type_patterns
+        )
+
+        # الگوهای نوع سند که فقط از کلمات ساده تشکیل شده‌اند با یک trie بررسی می‌شوند
+        self.document_keywords: Optional[KeywordMatcher] = None
+        self.document_keyword_patterns: Tuple[int, ...] = ()
+        pieces = [(index, piece) for index, pattern in enumerate(document_patterns) for piece in pattern.split('|')]
+        if pieces and all(piece and _REGEX_METACHARACTERS.isdisjoint(piece) for _, piece in pieces):
+            self.document_keywords = KeywordMatcher([piece for _, piece in pieces], ignore_case=True)
+            self.document_keyword_patterns = tuple(index for index, _ in pieces)
+
+    def is_current(self, sources: tuple) -> bool:
+        """آیا لیست‌های الگو از زمان ساخت تغییر نکرده‌اند (جایگزینی، افزودن/حذف یا ویرایش درجا)"""
+        # مقایسه تاپل‌ها برای لیست‌های یکسان (is) محتوا را نمی‌بیند؛ ویرایش درجا (lst[0] = ...)
+        # فقط با مقایسه با کپی محتوا دیده می‌شود (مقایسه لیست‌ها ابتدا is را بررسی می‌کند و ارزان است)
+        invoice, currency, company, document = sources
+        snapshot_invoice, snapshot_currency, snapshot_company, snapshot_document = self.snapshot
+        return (sources == self.sources
+                and invoice == snapshot_invoice and currency == snapshot_currency
+                and company == snapshot_company and document == snapshot_document)
 
 
 class Patterns:
@@ -67,17 +206,43 @@ class Patterns:
         (r'سند متفرقه|Misc', 'سند متفرقه'),
     ]
     
+    @classmethod
+    def pattern_sources(cls) -> tuple:
+        """لیست‌های الگوی فعلی (برای تشخیص تغییر الگوها)"""
+        return (cls.INVOICE_PATTERNS, cls.CURRENCY_PATTERNS, cls.COMPANY_PATTERNS, cls.DOCUMENT_TYPE_PATTERNS)
+
+    @classmethod
+    def registry(cls) -> PatternRegistry:
+        """دریافت الگوهای کامپایل‌شده؛ با تغییر الگوها دوباره ساخته می‌شود"""
+        sources = cls.pattern_sources()
+        # هر زیرکلاس رجیستری مخصوص خود را دارد
+        registry = cls.__dict__.get('_registry')
+        if registry is None or not registry.is_current(sources):
+            registry = PatternRegistry(sources)
+            cls._registry = registry
+        return registry
+
+    @classmethod
+    def invalidate_registry(cls):
+        """دور انداختن الگوهای کامپایل‌شده تا فراخوانی بعدی آنها را دوباره بسازد"""
+        cls._registry = None
+
+    @classmethod
+    def version(cls) -> str:
+        """نسخه مجموعه الگوهای فعلی"""
+        return cls.registry().version
+
     @classmethod
     def extract_invoice_number(cls, text: str) -> Tuple[Optional[str], float]:
         """استخراج شماره صورت‌وضعیت از متن"""
         if not text:
             return None, 0.0
         
-        for pattern in cls.INVOICE_PATTERNS:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                confidence = 1.0 if 'صورت وضعیت' in pattern or 'Invoice' in pattern else 0.8
-                return match.group(1), confidence
+        registry = cls.registry()
+        found = registry.invoice.search(text)
+        if found:
+            index, match = found
+            return match.group(1), registry.invoice_confidences[index]
         
         return None, 0.0
     
@@ -87,30 +252,33 @@ class Patterns:
         if not text:
             return None, 0.0
         
-        for pattern in cls.CURRENCY_PATTERNS:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                groups = match.groups()
-                amount_str = groups[0].replace(',', '') if groups[0] else None
-                currency = groups[1]
-                rate = groups[2] if len(groups) > 2 else None
-                
-                try:
-                    amount = float(amount_str) if amount_str else None
-                    if rate:
-                        rate = float(rate.replace(',', ''))
-                except (ValueError, TypeError):
-                    continue
-                
-                # محاسبه اطمینان
-                confidence = 1.0 if rate else 0.8
-                
-                return {
-                    'amount': amount,
-                    'currency': currency,
-                    'rate': rate,
-                    'original_text': match.group(0)
-                }, confidence
+        registry = cls.registry()
+        found = registry.currency.search(text)
+        while found:
+            index, match = found
+            groups = match.groups()
+            amount_str = groups[0].replace(',', '') if groups[0] else None
+            currency = groups[1]
+            rate = groups[2] if len(groups) > 2 else None
+            
+            try:
+                amount = float(amount_str) if amount_str else None
+                if rate:
+                    rate = float(rate.replace(',', ''))
+            except (ValueError, TypeError):
+                # الگوی بعدی به ترتیب اولویت
+                found = registry.currency.search_from(text, index + 1)
+                continue
+            
+            # محاسبه اطمینان
+            confidence = 1.0 if rate else 0.8
+            
+            return {
+                'amount': amount,
+                'currency': currency,
+                'rate': rate,
+                'original_text': match.group(0)
+            }, confidence
         
         return None, 0.0
     
@@ -120,10 +288,10 @@ class Patterns:
         if not text:
             return None, 0.0
         
-        for company in cls.COMPANY_PATTERNS:
-            if company in text:
-                confidence = 0.9 if company in ['ایران', 'Iran'] else 0.7
-                return company, confidence
+        registry = cls.registry()
+        index = registry.company.first_by_priority(text)
+        if index is not None:
+            return registry.company.keywords[index], registry.company_confidences[index]
         
         return None, 0.0
     
@@ -133,11 +301,16 @@ class Patterns:
         if not text:
             return 'سند متفرقه', 0.5
         
+        registry = cls.registry()
         text_lower = text.lower()
+        if registry.document_keywords is not None:
+            keyword_index = registry.document_keywords.first_by_priority(text_lower)
+            index = registry.document_keyword_patterns[keyword_index] if keyword_index is not None else None
+        else:
+            found = registry.document_type.search(text_lower)
+            index = found[0] if found else None
         
-        for pattern, doc_type in cls.DOCUMENT_TYPE_PATTERNS:
-            if re.search(pattern, text_lower, re.IGNORECASE):
-                confidence = 0.9 if pattern in ['صورت وضعیت', 'Invoice'] else 0.7
-                return doc_type, confidence
+        if index is not None:
+            return registry.document_types[index], registry.document_type_confidences[index]
         
         return 'سند متفرقه', 0.5
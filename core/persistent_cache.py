@@ -0,0 +1,123 @@
+"""
+Persistent extraction cache for Smart Extractor
+حافظه نهان ماندگار نتایج استخراج در SQLite (بین اجراهای مختلف)
+"""
+
+import hashlib
+import json
+import sqlite3
+import time
+from typing import Any, Dict, Iterable
+
+
+class PersistentExtractionCache:
+    """حافظه نهان SQLite نتایج استخراج با سقف اندازه و حذف LRU
+
+    کلید هر ردیف هش sha1 از فضای نام (نسخه الگوها و فیلدهای انتخاب‌شده) و متن
+    شرح است؛ با تغییر الگوها کلیدهای جدید ساخته می‌شوند و ردیف‌های قدیمی با LRU
+    حذف می‌شوند. خواندن و نوشتن برای هر دسته یکجا انجام می‌شود.
+    """
+
+    # حداکثر تعداد پارامتر هر دستور SQLite
+    BATCH_SIZE = 900
+
+    def __init__(self, path: str, max_entries: int = 1_000_000):
+        self.path = str(path)
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.connection = sqlite3.connect(self.path)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS extraction_cache ('
+            'key TEXT PRIMARY KEY, payload TEXT NOT NULL, last_used REAL NOT NULL)'
+        )
+        self.connection.execute(
+            'CREATE INDEX IF NOT EXISTS extraction_cache_last_used ON extraction_cache (last_used)'
+        )
+        self.connection.commit()
+
+    @staticmethod
+    def make_key(namespace: str, text: str) -> str:
+        """کلید یک متن در فضای نام مشخص (نسخه الگوها و فیلدها)
+
+        متن بدون تغییر هش می‌شود؛ الگوها به فاصله‌ها و شکل حروف (ی/ي) حساس هستند
+        و یکسان‌سازی آنها نتیجه متفاوتی می‌دهد.
+        """
+        return hashlib.sha1(f'{namespace}\x1f{text}'.encode('utf-8')).hexdigest()
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """خواندن یکجای چند کلید و به‌روزرسانی زمان آخرین استفاده آنها"""
+        keys = list(dict.fromkeys(keys))
+        found_keys = []
+        payloads = []
+        for start in range(0, len(keys), self.BATCH_SIZE):
+            chunk = keys[start:start + self.BATCH_SIZE]
+            placeholders = ','.join('?' * len(chunk))
+            for key, payload in self.connection.execute(
+                f'SELECT key, payload FROM extraction_cache WHERE key IN ({placeholders})', chunk
+            ):
+                found_keys.append(key)
+                payloads.append(payload)
+
+        # یک بار decode برای کل دسته
+        found = dict(zip(found_keys, json.loads('[' + ','.join(payloads) + ']')))
+
+        if found_keys:
+            now = time.time()
+            for start in range(0, len(found_keys), self.BATCH_SIZE):
+                chunk = found_keys[start:start + self.BATCH_SIZE]
+                placeholders = ','.join('?' * len(chunk))
+                self.connection.execute(
+                    f'UPDATE extraction_cache SET last_used = ? WHERE key IN ({placeholders})', [now] + chunk
+                )
+            self.connection.commit()
+
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+
+    def set_many(self, items: Dict[str, Dict[str, Any]]):
+        """نوشتن یکجای نتایج و حذف قدیمی‌ترین ردیف‌ها در صورت عبور از سقف"""
+        if not items:
+            return
+        now = time.time()
+        self.connection.executemany(
+            'INSERT OR REPLACE INTO extraction_cache (key, payload, last_used) VALUES (?, ?, ?)',
+            [(key, json.dumps(payload, ensure_ascii=False), now) for key, payload in items.items()]
+        )
+        self.prune()
+        self.connection.commit()
+
+    def prune(self):
+        """حذف ردیف‌های کم‌استفاده تا ۹۰٪ سقف (تا حذف در هر دسته تکرار نشود)"""
+        count = self.connection.execute('SELECT COUNT(*) FROM extraction_cache').fetchone()[0]
+        if count <= self.max_entries:
+            return
+        excess = count - int(self.max_entries * 0.9)
+        self.connection.execute(
+            'DELETE FROM extraction_cache WHERE key IN '
+            '(SELECT key FROM extraction_cache ORDER BY last_used LIMIT ?)', (excess,)
+        )
+
+    def __len__(self) -> int:
+        return self.connection.execute('SELECT COUNT(*) FROM extraction_cache').fetchone()[0]
+
+    def stats(self) -> Dict[str, Any]:
+        """آمار خواندن از حافظه نهان"""
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self), 'max_size': self.max_entries}
+
+    def clear(self):
+        """حذف تمام ردیف‌ها"""
+        self.connection.execute('DELETE FROM extraction_cache')
+        self.connection.commit()
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,146 @@
+"""
+Column-level (vectorized) extraction helpers
+توابع کمکی استخراج ستونی با موتور رشته‌ای pandas
+"""
+
+import time
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .keyword_matcher import KeywordMatcher
+
+# تابع تبدیل: (اندیس الگو، متن کامل تطابق، گروه‌ها) -> DataFrame ردیف‌های پذیرفته‌شده
+Converter = Callable[[int, pd.Series, pd.DataFrame], pd.DataFrame]
+
+
+def text_mask(texts: pd.Series) -> pd.Series:
+    """ردیف‌هایی که متن غیرخالی دارند (معادل `if not text` در مسیر ردیفی)"""
+    return texts.map(lambda value: isinstance(value, str) and value != '').astype(bool)
+
+
+def first_match(texts: pd.Series, patterns: Sequence[str], flags: int = 0,
+                convert: Optional[Converter] = None) -> pd.DataFrame:
+    """اولین الگوی منطبق به ترتیب اولویت برای هر ردیف
+
+    هر الگو با یک str.extract فقط روی ردیف‌های حل‌نشده اجرا می‌شود؛ الگو در یک
+    گروه بیرونی قرار می‌گیرد تا تطابق با گروه خالی از عدم تطابق جدا شود. اگر
+    convert داده شود، ردیف‌هایی که حذف کند به الگوی بعدی می‌روند (مانند
+    `continue` در حلقه ردیفی).
+
+    خروجی هم‌اندیس با texts است: ستون 'pattern' (اندیس الگو یا -1)، ستون
+    'match' و گروه‌های 1..n، یا ستون‌های خروجی convert.
+    """
+    index = texts.index
+    pending = texts.reset_index(drop=True)
+    pending = pending[text_mask(pending)]
+
+    frames = []
+    seen = set()
+    for pattern_index, pattern in enumerate(patterns):
+        if pending.empty:
+            break
+        # الگوی تکراری همان نتیجه الگوی قبلی را دارد
+        if pattern in seen:
+            continue
+        seen.add(pattern)
+
+        found = pending.str.extract(f'({pattern})', flags=flags, expand=True)
+        found = found[found.iloc[:, 0].notna()]
+        if found.empty:
+            continue
+
+        whole = found.iloc[:, 0]
+        groups = found.iloc[:, 1:]
+        groups.columns = range(1, groups.shape[1] + 1)
+        if convert is None:
+            frame = groups.assign(match=whole)
+        else:
+            frame = convert(pattern_index, whole, groups)
+        frame = frame.assign(pattern=pattern_index)
+        frames.append(frame)
+        pending = pending.drop(frame.index)
+
+    if frames:
+        result = pd.concat(frames).reindex(range(len(index)))
+    else:
+        result = pd.DataFrame({'pattern': np.full(len(index), -1)})
+    result['pattern'] = result['pattern'].fillna(-1).astype(int)
+    result.index = index
+    return result
+
+
+def first_keyword(texts: pd.Series, matcher: KeywordMatcher) -> np.ndarray:
+    """اندیس پراولویت‌ترین کلمه کلیدی هر ردیف (-1 اگر یافت نشود)"""
+    def lookup(value):
+        if not isinstance(value, str) or not value:
+            return -1
+        found = matcher.first_by_priority(value)
+        return -1 if found is None else found
+
+    return texts.map(lookup).to_numpy(dtype=int)
+
+
+def take(values: Sequence, indices: np.ndarray, default=None) -> np.ndarray:
+    """انتخاب مقدار متناظر هر اندیس (اندیس -1 مقدار پیش‌فرض می‌گیرد)"""
+    table = np.empty(len(values) + 1, dtype=object)
+    table[:len(values)] = list(values)
+    table[-1] = default
+    return table[indices]
+
+
+def to_float(values: pd.Series) -> pd.Series:
+    """تبدیل رشته‌ها با float (NaN برای مقادیر نامعتبر)
+
+    float ارقام فارسی را هم می‌پذیرد، برخلاف pd.to_numeric؛ تبدیل فقط یک بار
+    برای هر مقدار یکتا انجام می‌شود.
+    """
+    def convert(value):
+        try:
+            return float(value)
+        except (ValueError, TypeError):
+            return np.nan
+
+    uniques = values.dropna().unique()
+    table = {value: convert(value) for value in uniques}
+    return values.map(table).astype(float)
+
+
+def as_object(values) -> pd.Series:
+    """ستون object با None به جای NaN (مانند لیست‌های مسیر ردیفی)"""
+    values = pd.Series(values, dtype=object) if not isinstance(values, pd.Series) else values.astype(object)
+    return values.where(values.notna(), None)
+
+
+def extract_unique(texts: pd.Series,
+                   extract: Callable[[pd.Series], pd.DataFrame]) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    """استخراج فقط روی مقادیر یکتا و پخش نتایج به همه ردیف‌ها با کدهای factorize
+
+    خروجی: (DataFrame هم‌اندیس با texts، آمار شامل نسبت مقادیر یکتا و زمان
+    صرفه‌جویی‌شده‌ی تخمینی نسبت به استخراج همه ردیف‌ها)
+    """
+    start = time.perf_counter()
+    codes, uniques = pd.factorize(texts, use_na_sentinel=False)
+    unique_result = extract(pd.Series(uniques, dtype=object))
+    result = unique_result.take(codes)
+    result.index = texts.index
+    elapsed = time.perf_counter() - start
+
+    rows, unique = len(texts), len(uniques)
+    # زمان تخمینی استخراج ردیف‌به‌ردیف با همان هزینه هر مقدار
+    estimated = elapsed / unique * rows if unique else 0.0
+    return result, {
+        'rows': rows,
+        'unique': unique,
+        'unique_ratio': unique / rows if rows else 0.0,
+        'seconds': elapsed,
+        'saved_seconds': max(estimated - elapsed, 0.0),
+    }
+
+
+def format_unique_stats(stats: Dict[str, Any]) -> str:
+    """متن گزارش نسبت مقادیر یکتا و زمان صرفه‌جویی‌شده"""
+    return (f"🔁 {stats['unique']} شرح یکتا از {stats['rows']} ردیف "
+            f"({stats['unique_ratio']:.1%}) - زمان استخراج {stats['seconds']:.2f}s، "
+            f"صرفه‌جویی تقریبی {stats['saved_seconds']:.2f}s")
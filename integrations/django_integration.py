@@ -11,8 +11,9 @@ from ..core.models import ExtractionResult, BatchExtractionResult
 class DjangoIntegration:
     """کلاس یکپارچه‌سازی با جنگو"""
     
-    def __init__(self):
-        self.extractor = SmartExtractor()
+    def __init__(self, cache_size: Optional[int] = 10000):
+        # شرح‌های تکراری (مثلاً تسعیر ماهانه) از حافظه نهان استخراج‌کننده خوانده می‌شوند
+        self.extractor = SmartExtractor(cache_size=cache_size)
     
     def extract_from_model_instances(self, instances: List[Any], description_field: str = 'description') -> List[Dict[str, Any]]:
         """استخراج اطلاعات از نمونه‌های مدل جنگو"""
@@ -11,8 +11,9 @@ from ..core.models import ExtractionResult, BatchExtractionResult
 class OdooIntegration:
     """کلاس یکپارچه‌سازی با اودوو"""
     
-    def __init__(self):
-        self.extractor = SmartExtractor()
+    def __init__(self, cache_size: Optional[int] = 10000):
+        # شرح‌های تکراری (مثلاً تسعیر ماهانه) از حافظه نهان استخراج‌کننده خوانده می‌شوند
+        self.extractor = SmartExtractor(cache_size=cache_size)
     
     def extract_from_account_move_lines(self, move_lines: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """استخراج اطلاعات از خطوط سند حسابداری اودوو"""
@@ -5,24 +5,52 @@ Excel processor for Smart Extractor
 
 import pandas as pd
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterable, Iterator, Optional
 
 # استفاده از import مطلق
 try:
     from smart_extractor.core.extractors import SmartExtractor
+    from smart_extractor.core.persistent_cache import PersistentExtractionCache
+    from smart_extractor.core.vectorized import extract_unique, format_unique_stats
+    from smart_extractor.utils.excel_reader import DEFAULT_CHUNK_ROWS, iter_sheet_chunks, read_sheet_headers, read_sheets
     from smart_extractor.utils.file_handler import FileHandler
+    from smart_extractor.utils.output_sinks import check_output_format, open_output_sink
+    from smart_extractor.utils.sheet_union import concat_sheets
 except ImportError:
     # اگر import مطلق کار نکرد، از import نسبی استفاده کنیم
     from ..core.extractors import SmartExtractor
+    from ..core.persistent_cache import PersistentExtractionCache
+    from ..core.vectorized import extract_unique, format_unique_stats
+    from ..utils.excel_reader import DEFAULT_CHUNK_ROWS, iter_sheet_chunks, read_sheet_headers, read_sheets
     from ..utils.file_handler import FileHandler
+    from ..utils.output_sinks import check_output_format, open_output_sink
+    from ..utils.sheet_union import concat_sheets
 
 
 class ExcelProcessor:
     """کلاس پردازش فایل‌های اکسل"""
     
-    def __init__(self):
-        self.extractor = SmartExtractor()
+    # نگاشت ستون‌های خروجی extract_series به ستون‌های فایل نهایی
+    EXTRACTED_COLUMNS = {
+        'invoice_number': 'شماره_وضعیت',
+        'currency_amount': 'مبلغ_ارزی',
+        'currency_type': 'نوع_ارز',
+        'exchange_rate': 'نرخ_ارز',
+        'company_name': 'نام_شرکت',
+        'document_type': 'نوع_سند',
+        'extraction_confidence': 'اطمینان_استخراج',
+    }
+    
+    # ستون‌های کم‌تنوع که به صورت categorical ذخیره می‌شوند (مبالغ و نرخ‌ها float64 هستند)
+    CATEGORICAL_COLUMNS = ('currency_type', 'document_type')
+    
+    def __init__(self, cache_path: Optional[str] = None, cache_size: int = 1_000_000):
+        # حافظه نهان ماندگار نتایج استخراج (اختیاری) برای اجراهای تکراری روی همان شرح‌ها
+        self.cache = PersistentExtractionCache(cache_path, max_entries=cache_size) if cache_path else None
+        self.extractor = SmartExtractor(persistent_cache=self.cache)
         self.file_handler = FileHandler()
+        # خلاصه نتایج آخرین process_excel_file (بدون خواندن مجدد فایل خروجی)
+        self.last_summary: Optional[Dict[str, Any]] = None
         
         # نگاشت ستون‌های فارسی و انگلیسی
         self.column_mapping = {
@@ -50,23 +78,24 @@ class ExcelProcessor:
             'تاریخ عملیات': 'date',
         }
     
-    def read_excel_file(self, file_path: str) -> pd.DataFrame:
-        """خواندن فایل اکسل و ترکیب تمام شیت‌ها"""
+    def read_excel_file(self, file_path: str, workers: Optional[int] = 0,
+                        sheet_name: Optional[str] = None) -> pd.DataFrame:
+        """خواندن فایل اکسل و ترکیب تمام شیت‌ها
+
+        فایل یک بار باز می‌شود و در فایل‌های چندشیتی، شیت‌ها با workers فرآیند
+        (0 یعنی تعداد هسته‌ها، None یا 1 یعنی سریال) همزمان خوانده می‌شوند.
+        با sheet_name فقط همان شیت خوانده می‌شود.
+        """
         try:
             print(f"📖 خواندن فایل: {file_path}")
             
             # خواندن تمام شیت‌ها
-            excel_file = pd.ExcelFile(file_path)
-            all_sheets_data = []
-            
-            for sheet_name in excel_file.sheet_names:
+            sheets = read_sheets(file_path, workers=workers, sheet_name=sheet_name)
+            for sheet_name in sheets:
                 print(f"   📄 پردازش شیت: {sheet_name}")
-                df_sheet = pd.read_excel(file_path, sheet_name=sheet_name)
-                df_sheet['sheet_name'] = sheet_name
-                all_sheets_data.append(df_sheet)
             
-            # ترکیب تمام شیت‌ها
-            combined_df = pd.concat(all_sheets_data, ignore_index=True)
+            # ترکیب تمام شیت‌ها با انواع داده هم‌تراز و ستون categorical نام شیت
+            combined_df = concat_sheets(sheets, 'sheet_name')
             print(f"   ✅ کل رکوردها: {len(combined_df)}")
             
             # استانداردسازی ستون‌ها
@@ -78,81 +107,197 @@ class ExcelProcessor:
             print(f"❌ خطا در خواندن فایل اکسل: {str(e)}")
             raise
     
+    def iter_excel_chunks(self, file_path: str, chunk_size: int = DEFAULT_CHUNK_ROWS,
+                          sheet_name: Optional[str] = None) -> Iterator[pd.DataFrame]:
+        """خواندن جریانی فایل اکسل در تکه‌های chunk_size ردیفی با ستون sheet_name
+
+        برای دفاتر بزرگ که در حافظه جا نمی‌شوند؛ در هر لحظه فقط یک تکه در حافظه است.
+        """
+        for chunk in iter_sheet_chunks(file_path, chunk_size, sheet_name=sheet_name):
+            yield self._standardize_columns(chunk)
+    
     def _standardize_columns(self, df: pd.DataFrame) -> pd.DataFrame:
         """استانداردسازی نام ستون‌ها"""
-        df.columns = [self.column_mapping.get(str(col).strip(), str(col).strip()) for col in df.columns]
+        df.columns = self._standard_names(df.columns)
         return df
     
-    def extract_and_enrich(self, df: pd.DataFrame, description_column: str = 'description') -> pd.DataFrame:
-        """استخراج اطلاعات از ستون شرح و افزودن ستون‌های جدید"""
+    def _standard_names(self, columns: Iterable) -> List[str]:
+        """نام‌های استاندارد فهرستی از ستون‌ها"""
+        return [self.column_mapping.get(str(col).strip(), str(col).strip()) for col in columns]
+    
+    def extract_and_enrich(self, df: pd.DataFrame, description_column: str = 'description',
+                           fields: Optional[List[str]] = None, verbose: bool = True) -> pd.DataFrame:
+        """استخراج اطلاعات از ستون شرح و افزودن ستون‌های جدید
+
+        با fields (مثلاً ['invoice_number']) فقط همان استخراج‌کننده‌ها اجرا و فقط
+        ستون‌های آنها به همراه اطمینان استخراج اضافه می‌شوند. verbose=False پیام‌های
+        هر فراخوانی را حذف می‌کند (برای پردازش تکه‌تکه).
+        """
         if description_column not in df.columns:
             raise ValueError(f"ستون '{description_column}' در داده‌ها یافت نشد")
         
-        print(f"🔍 استخراج اطلاعات از ستون '{description_column}'...")
+        if verbose:
+            print(f"🔍 استخراج اطلاعات از ستون '{description_column}'...")
         
-        # استخراج اطلاعات از شرح‌ها
-        descriptions = df[description_column].astype(str).tolist()
-        extracted_data = self.extractor.extract_from_description_column(descriptions)
+        # استخراج ستونی فقط روی شرح‌های یکتا و پخش نتایج به همه ردیف‌ها
+        descriptions = df[description_column].astype(str)
+        extracted, stats = extract_unique(
+            descriptions, lambda texts: self.extractor.extract_series(texts, fields=fields)
+        )
+        if verbose:
+            print(f"   {format_unique_stats(stats)}")
+            if self.cache is not None:
+                cache_stats = self.cache.stats()
+                print(f"   💾 حافظه نهان: {cache_stats['hits']} یافت شد، {cache_stats['misses']} استخراج شد "
+                      f"({cache_stats['size']} ردیف ذخیره شده)")
         
         # افزودن ستون‌های جدید به DataFrame
         enriched_df = df.copy()
         
         # ستون‌های استخراج شده
-        enriched_df['شماره_وضعیت'] = [data['invoice_number'] for data in extracted_data]
-        enriched_df['مبلغ_ارزی'] = [data['currency_amount'] for data in extracted_data]
-        enriched_df['نوع_ارز'] = [data['currency_type'] for data in extracted_data]
-        enriched_df['نرخ_ارز'] = [data['exchange_rate'] for data in extracted_data]
-        enriched_df['نام_شرکت'] = [data['company_name'] for data in extracted_data]
-        enriched_df['نوع_سند'] = [data['document_type'] for data in extracted_data]
-        enriched_df['اطمینان_استخراج'] = [data['extraction_confidence'] for data in extracted_data]
+        for source in extracted.columns:
+            values = extracted[source].to_numpy()
+            if source in self.CATEGORICAL_COLUMNS:
+                values = pd.Categorical(values)
+            enriched_df[self.EXTRACTED_COLUMNS[source]] = values
         
-        print(f"✅ {len(enriched_df)} رکورد پردازش شد")
+        if verbose:
+            print(f"✅ {len(enriched_df)} رکورد پردازش شد")
         
         return enriched_df
     
-    def process_excel_file(self, input_path: str, output_suffix: str = "_extracted") -> str:
-        """پردازش کامل فایل اکسل و ذخیره فایل جدید"""
+    def process_excel_file(self, input_path: str, output_suffix: str = "_extracted",
+                           fields: Optional[List[str]] = None, chunk_size: Optional[int] = None,
+                           sheet_name: Optional[str] = None, output_format: str = 'xlsx') -> str:
+        """پردازش کامل فایل اکسل و ذخیره فایل جدید
+
+        با chunk_size فایل به صورت جریانی خوانده می‌شود و استخراج و نوشتن برای هر
+        تکه جداگانه انجام می‌شود تا حافظه مصرفی به اندازه فایل وابسته نباشد.
+        output_format قالب خروجی است (xlsx، parquet، feather یا csv؛ دو قالب ستونی
+        به pyarrow نیاز دارند) و پسوند فایل خروجی را تعیین می‌کند.
+        """
         # اعتبارسنجی فایل
         if not self.file_handler.validate_file_path(input_path):
             raise ValueError(f"فایل {input_path} یافت نشد یا معتبر نیست")
+        check_output_format(output_format)
+        
+        # تولید نام فایل خروجی
+        output_path = self.file_handler.generate_output_filename(input_path, output_suffix, output_format)
+        
+        if chunk_size:
+            return self._process_excel_file_chunked(input_path, output_path, chunk_size, sheet_name, fields,
+                                                    output_format)
         
         # خواندن فایل
-        df = self.read_excel_file(input_path)
+        df = self.read_excel_file(input_path, sheet_name=sheet_name)
         
         # استخراج و غنی‌سازی داده‌ها
-        enriched_df = self.extract_and_enrich(df)
-        
-        # تولید نام فایل خروجی
-        output_path = self.file_handler.generate_output_filename(input_path, output_suffix)
+        enriched_df = self.extract_and_enrich(df, fields=fields)
+        self.last_summary = self.get_processing_summary(enriched_df)
         
         # ذخیره فایل جدید
         try:
-            with pd.ExcelWriter(output_path, engine='openpyxl') as writer:
-                enriched_df.to_excel(writer, sheet_name='داده‌های_استخراج_شده', index=False)
+            with open_output_sink(output_path, output_format, sheet_name='داده‌های_استخراج_شده') as writer:
+                writer.write(enriched_df)
             
             print(f"💾 فایل خروجی ذخیره شد: {output_path}")
+            print(f"   {writer.format_stats()}")
             return output_path
             
         except Exception as e:
             print(f"❌ خطا در ذخیره فایل: {str(e)}")
             raise
     
+    def _process_excel_file_chunked(self, input_path: str, output_path: str, chunk_size: int,
+                                    sheet_name: Optional[str], fields: Optional[List[str]],
+                                    output_format: str = 'xlsx') -> str:
+        """خواندن، استخراج و نوشتن تکه‌به‌تکه در نویسنده خروجی جریانی"""
+        print(f"📖 خواندن جریانی فایل: {input_path} (تکه‌های {chunk_size} ردیفی)")
+        
+        # سرستون خروجی از سرستون همه شیت‌ها، با همان ترتیب concat در حالت عادی
+        columns: List[str] = []
+        for sheet_columns in read_sheet_headers(input_path, sheet_name=sheet_name).values():
+            for column in self._standard_names(sheet_columns) + ['sheet_name']:
+                if column not in columns:
+                    columns.append(column)
+        
+        counts: Dict[str, float] = {}
+        
+        def enriched_chunks():
+            total_rows = 0
+            for index, chunk in enumerate(self.iter_excel_chunks(input_path, chunk_size, sheet_name), 1):
+                enriched = self.extract_and_enrich(chunk, fields=fields, verbose=False)
+                self._add_summary_counts(counts, enriched)
+                total_rows += len(chunk)
+                print(f"   📦 تکه {index}: {len(chunk)} ردیف (کل: {total_rows})")
+                yield enriched
+        
+        try:
+            with open_output_sink(output_path, output_format, sheet_name='داده‌های_استخراج_شده') as writer:
+                total_rows = writer.write(enriched_chunks(), columns=columns)
+            self.last_summary = self._summary_from_counts(counts)
+            
+            # ستون‌های بدون سرستون که فقط در ردیف‌های بعدی ظاهر می‌شوند در خروجی جا ندارند
+            dropped_columns = writer.dropped_columns
+            if dropped_columns:
+                print(f"   ⚠️ ستون‌های بدون سرستون نادیده گرفته شدند: {', '.join(map(str, dropped_columns))}")
+            
+            print(f"💾 فایل خروجی ذخیره شد: {output_path} ({total_rows} رکورد)")
+            print(f"   {writer.format_stats()}")
+            return output_path
+            
+        except Exception as e:
+            print(f"❌ خطا در پردازش جریانی فایل: {str(e)}")
+            raise
+    
     def get_processing_summary(self, df: pd.DataFrame) -> Dict[str, Any]:
         """خلاصه نتایج پردازش"""
-        total_records = len(df)
-        
-        # آمار استخراج
-        invoice_count = df['شماره_وضعیت'].notna().sum()
-        currency_count = df['مبلغ_ارزی'].notna().sum()
-        company_count = df['نام_شرکت'].notna().sum()
+        return self._summary_from_counts(self._summary_counts(df))
+    
+    def get_chunked_processing_summary(self, chunks: Iterable[pd.DataFrame]) -> Dict[str, Any]:
+        """خلاصه نتایج پردازش از تکه‌های یک فایل (مثلاً iter_excel_chunks) بدون ترکیب آنها"""
+        totals: Dict[str, float] = {}
+        for chunk in chunks:
+            self._add_summary_counts(totals, chunk)
+        return self._summary_from_counts(totals)
+    
+    @classmethod
+    def _add_summary_counts(cls, totals: Dict[str, float], df: pd.DataFrame):
+        """افزودن شمارنده‌های یک تکه به مجموع"""
+        for key, value in cls._summary_counts(df).items():
+            totals[key] = totals.get(key, 0) + value
+    
+    @staticmethod
+    def _summary_counts(df: pd.DataFrame) -> Dict[str, float]:
+        """شمارنده‌های جمع‌پذیر خلاصه نتایج"""
+        # ستون‌هایی که با fields انتخاب نشده‌اند صفر شمرده می‌شوند
+        def extracted_count(column):
+            return int(df[column].notna().sum()) if column in df.columns else 0
         
-        avg_confidence = df['اطمینان_استخراج'].mean() if 'اطمینان_استخراج' in df.columns else 0
+        confidence = df['اطمینان_استخراج'] if 'اطمینان_استخراج' in df.columns else pd.Series(dtype=float)
+        return {
+            'total_records': len(df),
+            'invoices_extracted': extracted_count('شماره_وضعیت'),
+            'currency_info_extracted': extracted_count('مبلغ_ارزی'),
+            'companies_identified': extracted_count('نام_شرکت'),
+            'confidence_sum': float(confidence.sum()),
+            'confidence_count': int(confidence.count()),
+        }
+    
+    @staticmethod
+    def _summary_from_counts(counts: Dict[str, float]) -> Dict[str, Any]:
+        """خلاصه نتایج از شمارنده‌ها"""
+        total_records = counts.get('total_records', 0)
+        invoice_count = counts.get('invoices_extracted', 0)
+        currency_count = counts.get('currency_info_extracted', 0)
+        confidence_count = counts.get('confidence_count', 0)
+        avg_confidence = counts['confidence_sum'] / confidence_count if confidence_count else 0
         
         return {
             'total_records': total_records,
             'invoices_extracted': invoice_count,
             'currency_info_extracted': currency_count,
-            'companies_identified': company_count,
+            'companies_identified': counts.get('companies_identified', 0),
             'average_confidence': round(avg_confidence, 2),
             'success_rate': round((invoice_count + currency_count) / (total_records * 2) * 100, 1) if total_records > 0 else 0
         }
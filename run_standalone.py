@@ -78,9 +78,8 @@ def main():
         processor = ExcelProcessor()
         output_path = processor.process_excel_file(args.input_file, suffix)
         
-        # نمایش خلاصه نتایج
-        df = processor.read_excel_file(output_path)
-        summary = processor.get_processing_summary(df)
+        # نمایش خلاصه نتایج (محاسبه شده هنگام پردازش، بدون خواندن مجدد خروجی)
+        summary = processor.last_summary
         
         print(f"\n📊 خلاصه نتایج:")
         print(f"   کل رکوردها: {summary['total_records']}")
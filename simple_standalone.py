@@ -7,17 +7,58 @@ Simple standalone script for Smart Extractor
 import argparse
 import sys
 import os
+import numpy as np
 import pandas as pd
 import re
 from pathlib import Path
-from pandas import ExcelFile, read_excel, concat, isna
+from pandas import isna
+
+# اضافه کردن مسیر ماژول به sys.path
+current_dir = Path(__file__).parent
+sys.path.insert(0, str(current_dir))
+
+# استفاده از import مطلق
+try:
+    from smart_extractor.core.keyword_matcher import KeywordMatcher
+    from smart_extractor.core.vectorized import (
+        as_object, extract_unique, first_keyword, first_match, format_unique_stats, take, text_mask, to_float
+    )
+    from smart_extractor.utils.excel_reader import (
+        DEFAULT_CHUNK_ROWS, ColumnFilter, iter_sheet_chunks, read_sheets
+    )
+    from smart_extractor.utils.ingest_cache import configure_ingest_cache
+    from smart_extractor.utils.layout_registry import configure_layout_registry, get_layout_registry, layout_fingerprint
+    from smart_extractor.utils.excel_writer import StreamingExcelWriter
+    from smart_extractor.utils.output_sinks import OUTPUT_FORMATS, check_output_format, open_output_sink
+    from smart_extractor.utils.pipeline import Pipeline
+    from smart_extractor.utils.sheet_union import concat_sheets, union_columns
+except ImportError:
+    # اگر import مطلق کار نکرد، از import نسبی استفاده کنیم
+    from core.keyword_matcher import KeywordMatcher
+    from core.vectorized import (
+        as_object, extract_unique, first_keyword, first_match, format_unique_stats, take, text_mask, to_float
+    )
+    from utils.excel_reader import (
+        DEFAULT_CHUNK_ROWS, ColumnFilter, iter_sheet_chunks, read_sheets
+    )
+    from utils.ingest_cache import configure_ingest_cache
+    from utils.layout_registry import configure_layout_registry, get_layout_registry, layout_fingerprint
+    from utils.excel_writer import StreamingExcelWriter
+    from utils.output_sinks import OUTPUT_FORMATS, check_output_format, open_output_sink
+    from utils.pipeline import Pipeline
+    from utils.sheet_union import concat_sheets, union_columns
 
 
 class ExcelSheetCombiner:
     """کلاس ترکیب کننده شیت‌های اکسل"""
     
-    def __init__(self):
+    # ستون‌های متنی با نسبت مقادیر یکتای کمتر از این مقدار categorical نگه داشته می‌شوند
+    CATEGORY_MAX_RATIO = 0.5
+    
+    def __init__(self, layout_registry=None):
         self.sheet_name_column = "نام_شیت"
+        # ثبت چیدمان‌های شناخته شده (پیش‌فرض: get_layout_registry)
+        self.layout_registry = layout_registry
         # ستون‌های مهم که باید همیشه حفظ شوند
         self.important_columns = [
             'تاریخ سند', 'شرح سند', 'بدهکار', 'بستانکار', 'بدهكار - ريالي', 
@@ -35,6 +76,55 @@ class ExcelSheetCombiner:
             'قرارداد فروش', 'شماره صورتحساب فروش', 'قرارداد خريد',
             'مانده بستانکار', 'مانده بدهکار'
         ]
+        # گروه‌بندی ستون‌های تکراری (از هر گروه اولین ستون موجود نگهداری می‌شود)
+        self.column_groups = {
+            'بستانکار': ['بستانکار', 'بستانكار - ريالي', 'معادل ریالی بستانکار'],
+            'بدهکار': ['بدهکار', 'بدهكار - ريالي', 'معادل ریالی بدهکار'],
+            'مانده بستانکار': ['مانده بستانکار', 'معادل ریالی مانده بستانکار'],
+            'مانده بدهکار': ['مانده بدهکار', 'معادل ریالی مانده بدهکار'],
+            'بستانكار - ارزي': ['بستانكار - ارزي', 'بستانکار ارزی'],
+            'بدهكار - ارزي': ['بدهكار - ارزي', 'بدهکار ارزی']
+        }
+        # ستون‌های مبلغ بدهکار و بستانکار که مستقیماً float64 خوانده می‌شوند
+        self.amount_columns = [column for columns in self.column_groups.values() for column in columns]
+        # ستون‌های حذف شده برای تحلیل حسابرسی
+        self.audit_columns_to_remove = ['مانده بستانکار', 'مانده بدهکار', 'تاييد شده در سامانه مودیان', 'چاپ سند']
+        # کلمات کلیدی شناسایی ردیف سرستون
+        self.header_keywords = ['شماره', 'تاریخ', 'سند', 'حساب', 'شرح', 'بدهکار', 'بستانکار']
+        
+        # جستجوگرهای کلمات کلیدی (یک بار ساخته می‌شوند)
+        self.important_matcher = KeywordMatcher(self.important_columns)
+        self.low_importance_matcher = KeywordMatcher(self.low_importance_columns)
+        self.header_matcher = KeywordMatcher(self.header_keywords)
+    
+    def detect_header_row(self, rows):
+        """شماره ردیف سرستون در ۳ ردیف اول (اولین ردیف با حداقل ۲ کلمه کلیدی)"""
+        for i, row in enumerate(rows):
+            if i >= 3:  # بررسی ۳ ردیف اول
+                break
+            row_text = ['nan' if isna(cell) else str(cell).lower() for cell in row]
+            header_count = sum(self.header_matcher.contains_any(cell) for cell in row_text)
+            
+            if header_count >= 2:  # اگر حداقل ۲ کلمه سرستون پیدا شد
+                return i
+        return 0
+    
+    def _registry(self):
+        return self.layout_registry if self.layout_registry is not None else get_layout_registry()
+    
+    def resolve_header_row(self, rows):
+        """ردیف سرستون از چیدمان ثبت شده، یا تشخیص با detect_header_row و ثبت چیدمان جدید"""
+        registry = self._registry()
+        if registry is None:
+            return self.detect_header_row(rows)
+        
+        rows = list(rows)
+        header_row = registry.find_header_row(rows)
+        if header_row is None:
+            header_row = self.detect_header_row(rows)
+            if header_row < len(rows) and any(not isna(cell) for cell in rows[header_row]):
+                registry.put(layout_fingerprint(rows[header_row]), header_row=header_row)
+        return header_row
     
     def analyze_column_completeness(self, df, threshold=0.1):
         """تحلیل کامل بودن ستون‌ها و حذف ستون‌های خالی و تکراری"""
@@ -42,55 +132,55 @@ class ExcelSheetCombiner:
         if total_rows == 0:
             return df
         
+        non_empty_counts = df.notna().sum()
+        return df[self.select_columns(df.columns, non_empty_counts, total_rows, threshold)]
+    
+    def select_columns(self, columns, non_empty_counts, total_rows, threshold=0.1):
+        """انتخاب ستون‌های نگهداری‌شده از روی تعداد مقادیر غیرخالی هر ستون
+
+        non_empty_counts نگاشت نام ستون به تعداد مقادیر غیرخالی است تا انتخاب بدون
+        نگه‌داشتن کل داده (مثلاً در ترکیب جریانی) هم انجام شود.
+        """
         columns_to_keep = []
         columns_to_remove = []
         
-        # گروه‌بندی ستون‌های تکراری
-        column_groups = {
-            'بستانکار': ['بستانکار', 'بستانكار - ريالي', 'معادل ریالی بستانکار'],
-            'بدهکار': ['بدهکار', 'بدهكار - ريالي', 'معادل ریالی بدهکار'],
-            'مانده بستانکار': ['مانده بستانکار', 'معادل ریالی مانده بستانکار'],
-            'مانده بدهکار': ['مانده بدهکار', 'معادل ریالی مانده بدهکار'],
-            'بستانكار - ارزي': ['بستانكار - ارزي', 'بستانکار ارزی'],
-            'بدهكار - ارزي': ['بدهكار - ارزي', 'بدهکار ارزی']
+        group_of_column = {
+            group_column: group_name
+            for group_name, group_columns in self.column_groups.items()
+            for group_column in group_columns
         }
         
         # ستون‌های انتخاب شده از هر گروه
         selected_columns = {}
         
-        for column in df.columns:
+        for column in columns:
             if column == self.sheet_name_column:
                 columns_to_keep.append(column)
                 continue
             
             # بررسی اینکه آیا ستون در گروه تکراری قرار دارد
-            column_in_group = False
-            for group_name, group_columns in column_groups.items():
-                if column in group_columns:
-                    column_in_group = True
-                    # اگر هنوز ستونی از این گروه انتخاب نشده، این ستون را انتخاب کن
-                    if group_name not in selected_columns:
-                        selected_columns[group_name] = column
-                        columns_to_keep.append(column)
-                    else:
-                        # ستون تکراری - حذف شود
-                        columns_to_remove.append(column)
-                    break
-            
-            if column_in_group:
+            group_name = group_of_column.get(column)
+            if group_name is not None:
+                # اگر هنوز ستونی از این گروه انتخاب نشده، این ستون را انتخاب کن
+                if group_name not in selected_columns:
+                    selected_columns[group_name] = column
+                    columns_to_keep.append(column)
+                else:
+                    # ستون تکراری - حذف شود
+                    columns_to_remove.append(column)
                 continue
                 
             # ستون‌های مهم همیشه حفظ شوند
-            if any(important_col in str(column) for important_col in self.important_columns):
+            if self.important_matcher.contains_any(str(column)):
                 columns_to_keep.append(column)
                 continue
             
             # محاسبه درصد داده‌های غیرخالی
-            non_empty_count = df[column].notna().sum()
+            non_empty_count = non_empty_counts[column]
             completeness_ratio = non_empty_count / total_rows
             
             # اگر ستون کم اهمیت است و کمتر از آستانه داده دارد، حذف شود
-            if any(low_col in str(column) for low_col in self.low_importance_columns):
+            if self.low_importance_matcher.contains_any(str(column)):
                 if completeness_ratio < threshold:
                     columns_to_remove.append(column)
                 else:
@@ -106,9 +196,8 @@ class ExcelSheetCombiner:
         columns_to_keep = list(set(columns_to_keep))
         
         # حذف ستون‌های مشخص شده برای تحلیل حسابرسی
-        audit_columns_to_remove = ['مانده بستانکار', 'مانده بدهکار', 'تاييد شده در سامانه مودیان', 'چاپ سند']
-        columns_to_keep = [col for col in columns_to_keep if col not in audit_columns_to_remove]
-        columns_to_remove.extend(audit_columns_to_remove)
+        columns_to_keep = [col for col in columns_to_keep if col not in self.audit_columns_to_remove]
+        columns_to_remove.extend(self.audit_columns_to_remove)
         
         print(f"   📊 تحلیل ستون‌ها: {len(columns_to_keep)} ستون نگهداری شد، {len(columns_to_remove)} ستون حذف شد")
         if columns_to_remove:
@@ -118,62 +207,54 @@ class ExcelSheetCombiner:
         if selected_columns:
             print(f"   🔄 ستون‌های یکسان ادغام شدند: {selected_columns}")
         
-        return df[columns_to_keep]
+        return columns_to_keep
     
-    def combine_sheets_simple(self, input_path, output_suffix="_combined"):
-        """ترکیب ساده و قابل اعتماد تمام شیت‌های اکسل"""
-        print(f"🚀 شروع ترکیب شیت‌های فایل: {input_path}")
-        
+    def read_sheet_frames(self, input_path):
+        """خواندن و پاک‌سازی تمام شیت‌ها: dict نام شیت به DataFrame (بدون ستون نام شیت)"""
         try:
-            # خواندن تمام شیت‌های فایل اکسل
-            excel_file = ExcelFile(input_path)
-            sheet_names = excel_file.sheet_names
+            # خواندن تمام شیت‌ها؛ ردیف سرستون هر شیت از چند ردیف اول آن تشخیص داده
+            # می‌شود (ردیف اول حاوی کلمات کلیدی) و هر شیت فقط یک بار پارس می‌شود.
+            # ستون‌های حسابرسی و Unnamed پارس نمی‌شوند و ستون‌های مبلغ مستقیماً float64
+            # خوانده می‌شوند. ستون‌های حسابرسی عضو گروه‌های تکراری خوانده می‌شوند چون
+            # انتخاب ستون هر گروه در select_columns به آن‌ها بستگی دارد
+            usecols = ColumnFilter(exclude=[column for column in self.audit_columns_to_remove
+                                            if column not in self.amount_columns],
+                                   exclude_prefixes=('Unnamed',))
+            read_options = dict(header=self.resolve_header_row, usecols=usecols)
+            try:
+                sheets = read_sheets(input_path, dtype=dict.fromkeys(self.amount_columns, 'float64'), **read_options)
+            except ValueError as e:
+                # مقدار غیرعددی در ستون مبلغ؛ نوع ستون‌ها مانند read_excel از داده تعیین می‌شود
+                print(f"   ⚠️ {str(e)} - خواندن بدون تعیین نوع ستون‌های مبلغ")
+                sheets = read_sheets(input_path, **read_options)
+            sheet_names = list(sheets)
             print(f"📋 شیت‌های شناسایی شده: {sheet_names}")
             
             if len(sheet_names) == 0:
                 print("❌ هیچ شیتی در فایل یافت نشد")
                 return None
             
-            # لیست برای ذخیره تمام داده‌ها
-            all_data = []
+            # شیت‌های تمیز شده به ترتیب فایل
+            frames = {}
             
             # پردازش تمام شیت‌ها
             for sheet_name in sheet_names:
                 print(f"📖 خواندن شیت: {sheet_name}")
                 
                 try:
-                    # خواندن شیت بدون فرض سرستون
-                    df_raw = read_excel(input_path, sheet_name=sheet_name, header=None)
+                    df = sheets[sheet_name]
                     
-                    if len(df_raw) == 0:
+                    if len(df.columns) == 0:
                         print(f"   ⚠️ شیت {sheet_name} خالی است")
                         continue
                     
-                    # پیدا کردن ردیف سرستون (ردیف اول حاوی کلمات کلیدی)
-                    header_row = 0
-                    for i in range(min(3, len(df_raw))):  # بررسی ۳ ردیف اول
-                        row_text = df_raw.iloc[i].astype(str).str.lower()
-                        header_keywords = ['شماره', 'تاریخ', 'سند', 'حساب', 'شرح', 'بدهکار', 'بستانکار']
-                        header_count = sum(any(keyword in cell for keyword in header_keywords) for cell in row_text)
-                        
-                        if header_count >= 2:  # اگر حداقل ۲ کلمه سرستون پیدا شد
-                            header_row = i
-                            break
-                    
-                    # خواندن شیت با سرستون صحیح
-                    df = read_excel(input_path, sheet_name=sheet_name, header=header_row)
-                    
                     # حذف ردیف‌های خالی
                     df = df.dropna(how='all')
                     
                     # حذف ستون‌های Unnamed
                     df = df.loc[:, ~df.columns.str.contains('^Unnamed')]
                     
-                    # اضافه کردن ستون نام شیت
-                    df[self.sheet_name_column] = sheet_name
-                    
-                    # اضافه کردن به لیست داده‌ها
-                    all_data.append(df)
+                    frames[sheet_name] = df
                     
                     print(f"   ✅ {len(df)} رکورد از شیت {sheet_name} خوانده شد")
                         
@@ -181,19 +262,102 @@ class ExcelSheetCombiner:
                     print(f"   ⚠️ خطا در خواندن شیت {sheet_name}: {str(e)}")
                     continue
             
-            if not all_data:
+            if not frames:
                 print("❌ هیچ داده‌ای از شیت‌ها خوانده شد")
                 return None
+            return frames
             
-            # ترکیب تمام داده‌ها با pd.concat()
+        except Exception as e:
+            print(f"❌ خطا در ترکیب شیت‌ها: {str(e)}")
+            return None
+    
+    def select_sheet_columns(self, frames):
+        """انتخاب ستون‌های نگهداری‌شده پیش از ترکیب: (frames، ستون‌ها)
+
+        تعداد مقادیر غیرخالی هر ستون از جمع شیت‌ها به دست می‌آید، پس ستون‌های
+        کم‌داده هیچ‌گاه در قاب ترکیب شده ساخته نمی‌شوند.
+        """
+        columns = union_columns(frames.values(), self.sheet_name_column)
+        total_rows = sum(len(df) for df in frames.values())
+        
+        def count_non_empty():
+            non_empty_counts = {self.sheet_name_column: total_rows}
+            for df in frames.values():
+                for column, count in df.notna().sum().items():
+                    non_empty_counts[column] = non_empty_counts.get(column, 0) + int(count)
+            return non_empty_counts
+        
+        return frames, self.resolve_columns(columns, count_non_empty, total_rows)
+    
+    def concat_selected(self, selection):
+        """ترکیب شیت‌ها فقط با ستون‌های انتخاب شده (ستون نام شیت categorical)"""
+        frames, columns = selection
+        try:
             print("🔗 ترکیب داده‌ها...")
-            combined_df = concat(all_data, axis=0, ignore_index=True, sort=False)
-            
+            combined_df = self.categorize_text_columns(concat_sheets(frames, self.sheet_name_column, columns))
             print(f"✅ ترکیب کامل شد: {len(combined_df)} رکورد در مجموع")
-            
-            # تحلیل و حذف ستون‌های خالی
-            print("🔍 تحلیل کامل بودن ستون‌ها...")
-            combined_df = self.analyze_column_completeness(combined_df, threshold=0.1)
+            return combined_df
+        except Exception as e:
+            print(f"❌ خطا در ترکیب شیت‌ها: {str(e)}")
+            return None
+    
+    def read_combined(self, input_path):
+        """خواندن و ترکیب تمام شیت‌ها در یک DataFrame با ستون نام شیت (بدون حذف ستون‌ها)"""
+        frames = self.read_sheet_frames(input_path)
+        if frames is None:
+            return None
+        return self.concat_selected((frames, None))
+    
+    def categorize_text_columns(self, df):
+        """نگهداری ستون‌های متنی کم‌تنوع (مثلاً نوع ارز، پروژه، صادر کننده) به صورت categorical"""
+        for column in df.columns[df.dtypes == object]:
+            values = df[column].dropna()
+            # set به جای nunique: جدول درهم‌سازی pandas نسخه UTF-8 هر رشته را در خود رشته نگه می‌دارد
+            if len(set(values)) < self.CATEGORY_MAX_RATIO * len(values):
+                df[column] = df[column].astype('category')
+        return df
+    
+    def resolve_columns(self, columns, count_non_empty, total_rows, threshold=0.1):
+        """ستون‌های نگهداری‌شده از چیدمان ثبت شده، یا انتخاب با select_columns و ثبت چیدمان جدید
+
+        count_non_empty فقط برای چیدمان جدید فراخوانی می‌شود و نگاشت ستون به تعداد
+        مقادیر غیرخالی را برمی‌گرداند.
+        """
+        registry = self._registry()
+        fingerprint = None
+        if registry is not None and all(isinstance(column, str) for column in columns):
+            # چیدمان شناخته شده: ستون‌های نگهداری‌شده بدون تحلیل دوباره
+            fingerprint = layout_fingerprint(columns, kind='columns')
+            retained_columns = registry.get(fingerprint, 'retained_columns')
+            if retained_columns is not None:
+                print(f"🧭 چیدمان شناخته شده: {len(retained_columns)} ستون ثبت شده نگهداری شد")
+                return retained_columns
+        
+        print("🔍 تحلیل کامل بودن ستون‌ها...")
+        if total_rows == 0:
+            return list(columns)
+        retained_columns = self.select_columns(columns, count_non_empty(), total_rows, threshold)
+        if fingerprint is not None:
+            registry.put(fingerprint, retained_columns=retained_columns)
+        return retained_columns
+    
+    def prune_columns(self, combined_df):
+        """حذف ستون‌های خالی و تکراری داده ترکیب شده"""
+        return combined_df[self.resolve_columns(combined_df.columns, combined_df.notna().sum, len(combined_df))]
+    
+    def combine_sheets_simple(self, input_path, output_suffix="_combined"):
+        """ترکیب ساده و قابل اعتماد تمام شیت‌های اکسل"""
+        print(f"🚀 شروع ترکیب شیت‌های فایل: {input_path}")
+        
+        frames = self.read_sheet_frames(input_path)
+        if frames is None:
+            return None
+        
+        try:
+            # تحلیل ستون‌های خالی و ترکیب فقط ستون‌های نگهداری‌شده
+            combined_df = self.concat_selected(self.select_sheet_columns(frames))
+            if combined_df is None:
+                return None
             
             # تولید نام فایل خروجی
             input_path_obj = Path(input_path)
@@ -209,14 +373,14 @@ class ExcelSheetCombiner:
             print(f"💾 فایل ترکیب شده ذخیره شد: {output_filename}")
             
             # نمایش خلاصه
+            sheet_counts = combined_df[self.sheet_name_column].value_counts(sort=False)
             print(f"\n📊 خلاصه ترکیب:")
-            print(f"   تعداد شیت‌های ترکیب شده: {len(sheet_names)}")
+            print(f"   تعداد شیت‌های ترکیب شده: {len(sheet_counts)}")
             print(f"   کل رکوردها: {len(combined_df)}")
             print(f"   تعداد ستون‌ها: {len(combined_df.columns)}")
             
             # نمایش تعداد رکوردها در هر شیت
-            for sheet_name in sheet_names:
-                count = len(combined_df[combined_df[self.sheet_name_column] == sheet_name])
+            for sheet_name, count in sheet_counts.items():
                 print(f"   - {sheet_name}: {count} رکورد")
             
             return output_filename
@@ -225,8 +389,80 @@ class ExcelSheetCombiner:
             print(f"❌ خطا در ترکیب شیت‌ها: {str(e)}")
             return None
     
-    def combine_sheets(self, input_path, output_suffix="_combined"):
-        """ترکیب تمام شیت‌های یک فایل اکسل در یک شیت واحد"""
+    def _iter_clean_chunks(self, input_path, chunk_size):
+        """تکه‌های تمیز شده شیت‌ها (مانند combine_sheets_simple) به صورت جریانی"""
+        for chunk in iter_sheet_chunks(input_path, chunk_size, header=self.resolve_header_row,
+                                       sheet_column=self.sheet_name_column):
+            data_columns = [column for column in chunk.columns if column != self.sheet_name_column]
+            
+            # حذف ردیف‌های خالی و ستون‌های Unnamed
+            chunk = chunk.dropna(how='all', subset=data_columns)
+            chunk = chunk.loc[:, ~chunk.columns.astype(str).str.startswith('Unnamed')]
+            if len(chunk):
+                yield chunk
+    
+    def combine_sheets_chunked(self, input_path, output_suffix="_combined", chunk_size=DEFAULT_CHUNK_ROWS):
+        """ترکیب جریانی شیت‌ها با حافظه ثابت برای فایل‌های بزرگ
+
+        در گذر اول فقط تعداد مقادیر غیرخالی هر ستون شمرده می‌شود و ستون‌ها مانند
+        ترکیب در حافظه با resolve_columns انتخاب می‌شوند (چیدمان ثبت شده به کار می‌رود
+        یا ثبت می‌شود)؛ در گذر دوم تکه‌ها در یک workbook فقط‌نوشتنی ذخیره می‌شوند.
+        """
+        print(f"🚀 شروع ترکیب جریانی شیت‌های فایل: {input_path} (تکه‌های {chunk_size} ردیفی)")
+        
+        try:
+            # گذر اول: شمارش مقادیر غیرخالی هر ستون
+            non_empty_counts = {}
+            sheet_counts = {}
+            total_rows = 0
+            for chunk in self._iter_clean_chunks(input_path, chunk_size):
+                for column, count in chunk.notna().sum().items():
+                    non_empty_counts[column] = non_empty_counts.get(column, 0) + int(count)
+                sheet_name = chunk[self.sheet_name_column].iloc[0]
+                sheet_counts[sheet_name] = sheet_counts.get(sheet_name, 0) + len(chunk)
+                total_rows += len(chunk)
+            
+            if total_rows == 0:
+                print("❌ هیچ داده‌ای از شیت‌ها خوانده شد")
+                return None
+            
+            # ستون نام شیت مانند union_columns بعد از ستون‌های شیت اول قرار می‌گیرد
+            columns_to_keep = self.resolve_columns(list(non_empty_counts), lambda: non_empty_counts, total_rows)
+            
+            # تولید نام فایل خروجی
+            input_path_obj = Path(input_path)
+            output_filename = f"{input_path_obj.stem}{output_suffix}{input_path_obj.suffix}"
+            
+            counter = 1
+            while os.path.exists(output_filename):
+                output_filename = f"{input_path_obj.stem}{output_suffix}_{counter}{input_path_obj.suffix}"
+                counter += 1
+            
+            # گذر دوم: نوشتن تکه‌ها
+            with StreamingExcelWriter(output_filename) as writer:
+                chunks = self._iter_clean_chunks(input_path, chunk_size)
+                writer.write_sheet('Sheet1', (chunk.reindex(columns=columns_to_keep) for chunk in chunks))
+            print(f"💾 فایل ترکیب شده ذخیره شد: {output_filename}")
+            print(f"   {writer.format_stats()}")
+            
+            # نمایش خلاصه
+            print(f"\n📊 خلاصه ترکیب:")
+            print(f"   تعداد شیت‌های ترکیب شده: {len(sheet_counts)}")
+            print(f"   کل رکوردها: {total_rows}")
+            print(f"   تعداد ستون‌ها: {len(columns_to_keep)}")
+            for sheet_name, count in sheet_counts.items():
+                print(f"   - {sheet_name}: {count} رکورد")
+            
+            return output_filename
+            
+        except Exception as e:
+            print(f"❌ خطا در ترکیب شیت‌ها: {str(e)}")
+            return None
+    
+    def combine_sheets(self, input_path, output_suffix="_combined", chunk_size=None):
+        """ترکیب تمام شیت‌های یک فایل اکسل در یک شیت واحد (با chunk_size به صورت جریانی)"""
+        if chunk_size:
+            return self.combine_sheets_chunked(input_path, output_suffix, chunk_size)
         return self.combine_sheets_simple(input_path, output_suffix)
 
 
@@ -234,7 +470,75 @@ class ExcelSheetCombiner:
 class SimpleSmartExtractor:
     """نسخه ساده استخراج کننده اطلاعات"""
     
-    def __init__(self):
+    INVOICE_PATTERNS = [
+        r'صورت وضعیت\s*[:؛]?\s*(\d+)',
+        r'شماره\s*صورت وضعیت\s*[:؛]?\s*(\d+)',
+        r'صورت وضعیت شماره\s*(\d+)',
+        r'صورت وضعيت\s*[:؛]?\s*(\d+)',
+        r'ش.\s*و.\s*(\d+)',
+        r'شماره\s*[:؛]?\s*(\d+)',
+        r'Invoice\s*#?\s*(\d+)',
+        r'INV\s*(\d+)',
+    ]
+    
+    # الگوهای بهبود یافته برای شناسایی دقیق مبلغ و نرخ
+    CURRENCY_PATTERNS = [
+        # فارسی - با نرخ (مثال: 8،276/74 یورو به نرخ 28500)
+        r'(\d[\d،,\.\/]*)\s*(یورو|دلار|يورو|ريال|ریال)\s*(?:به نرخ|با نرخ|نرخ|في|@|ارزش)\s*(\d[\d،,\.]*)\s*(?:ريال|ریال)?',
+        # فارسی - با نرخ (مثال: 8،276/74 یورو نرخ 28500)
+        r'(\d[\d،,\.\/]*)\s*(یورو|دلار|يورو|ريال|ریال)\s*(?:نرخ)\s*(\d[\d،,\.]*)\s*(?:ريال|ریال)?',
+        # فارسی - با نرخ (مثال: 8،276/74 یورو فی 28500)
+        r'(\d[\d،,\.\/]*)\s*(یورو|دلار|يورو|ريال|ریال)\s*(?:في|@)\s*(\d[\d،,\.]*)\s*(?:ريال|ریال)?',
+        # فارسی - با نرخ و خط تیره (مثال: 210154 يورو با نرخ- 16093 ريال)
+        r'(\d[\d،,\.\/]*)\s*(یورو|دلار|يورو|ريال|ریال)\s*(?:با نرخ|نرخ)\s*[-–]\s*(\d[\d،,\.]*)\s*(?:ريال|ریال)?',
+        # فارسی - نرخ بعد از ارز (مثال: 777635 يورو 14874 ريال)
+        r'(\d[\d،,\.\/]*)\s*(یورو|دلار|يورو|ريال|ریال)\s+(\d[\d،,\.]*)\s*(?:ريال|ریال)',
+        # فارسی - بدون نرخ
+        r'(\d[\d،,\.\/]*)\s*(یورو|دلار|يورو|ريال|ریال)',
+        # انگلیسی - با نرخ
+        r'(\d[\d,\.]*)\s*(EUR|USD|IRR|Euro|Dollar|Rial)\s*(?:rate|@|at|value)\s*(\d[\d,\.]*)',
+        # انگلیسی - بدون نرخ
+        r'(\d[\d,\.]*)\s*(EUR|USD|IRR|Euro|Dollar|Rial)',
+    ]
+    
+    # الگوهای شناسایی نام شرکت بعد از کلمه "شرکت"
+    COMPANY_PATTERNS = [
+        r'شركت\s+([^\s،]+)',
+        r'شرکت\s+([^\s،]+)',
+        r'شركت\s+([^\s،]+)\s+([^\s،]+)?',
+        r'شرکت\s+([^\s،]+)\s+([^\s،]+)?',
+    ]
+    
+    # روش قدیمی برای پشتیبانی از شرکت‌های شناخته شده
+    KNOWN_COMPANIES = ['ایران', 'ایرایتک', 'پترو ساحل', 'فرآب', 'ناردیس', 'خارک', 'پتروساحل', 'پترو ساحل خلیج فارس']
+    
+    # نگاشت ستون‌های خروجی extract_series به ستون‌های فایل نهایی
+    EXTRACTED_COLUMNS = {
+        'invoice_number': 'شماره_وضعیت',
+        'currency_amount': 'مبلغ_ارزی',
+        'currency_type': 'نوع_ارز',
+        'exchange_rate': 'نرخ_ارز',
+        'company_name': 'نام_شرکت',
+        'document_type': 'نوع_سند',
+    }
+    
+    # ستون‌های کم‌تنوع که به صورت categorical ذخیره می‌شوند
+    CATEGORICAL_COLUMNS = ('currency_type', 'document_type')
+    
+    # کلمات کلیدی نوع سند به ترتیب اولویت
+    DOCUMENT_TYPE_KEYWORDS = [
+        ('تسعیر', 'تسعیر ارز'),
+        ('نرخ', 'تسعیر ارز'),
+        ('صورت وضعیت', 'صورت وضعیت'),
+        ('صورتوضعیت', 'صورت وضعیت'),
+        ('چک', 'چک'),
+        ('انتقال', 'انتقال'),
+        ('مانده', 'انتقال'),
+    ]
+    
+    def __init__(self, layout_registry=None):
+        # ثبت چیدمان‌های شناخته شده (پیش‌فرض: get_layout_registry)
+        self.layout_registry = layout_registry
         self.column_mapping = {
             'شرح': 'description',
             'شرح سند': 'description',
@@ -253,56 +557,71 @@ class SimpleSmartExtractor:
             'account_number': 'account_number',
             'account_name': 'account_name',
         }
+        
+        self.company_matcher = KeywordMatcher(self.KNOWN_COMPANIES)
+        self.document_type_matcher = KeywordMatcher(
+            [keyword for keyword, _ in self.DOCUMENT_TYPE_KEYWORDS], ignore_case=True
+        )
     
     def extract_invoice_number(self, text):
         """استخراج شماره صورت‌وضعیت"""
         if not text:
             return None
         
-        patterns = [
-            r'صورت وضعیت\s*[:؛]?\s*(\d+)',
-            r'شماره\s*صورت وضعیت\s*[:؛]?\s*(\d+)',
-            r'صورت وضعیت شماره\s*(\d+)',
-            r'صورت وضعيت\s*[:؛]?\s*(\d+)',
-            r'ش.\s*و.\s*(\d+)',
-            r'شماره\s*[:؛]?\s*(\d+)',
-            r'Invoice\s*#?\s*(\d+)',
-            r'INV\s*(\d+)',
-        ]
-        
-        for pattern in patterns:
+        for pattern in self.INVOICE_PATTERNS:
             match = re.search(pattern, str(text), re.IGNORECASE)
             if match:
                 return match.group(1)
         
         return None
     
+    @staticmethod
+    def _normalize_amount(amount_str):
+        """حذف جداکننده‌ها از مبلغ ارزی با توجه به فرمت فارسی یا انگلیسی"""
+        # تشخیص نوع فرمت عدد
+        if '/' in amount_str:
+            # فرمت فارسی با اسلش (32،368/44) - اسلش به عنوان ممیز
+            amount_str = amount_str.replace('،', '').replace(',', '').replace('.', '')
+            amount_str = amount_str.replace('/', '.')
+        elif '.' in amount_str:
+            # فرمت انگلیسی با نقطه
+            if amount_str.count('.') == 1:
+                # یک نقطه - ممیز ارز (28679.3)
+                amount_str = amount_str.replace('،', '').replace(',', '')
+            else:
+                # بیش از یک نقطه - جداکننده هزارگان (48.638)
+                amount_str = amount_str.replace('،', '').replace(',', '').replace('.', '')
+        else:
+            # فرمت با جداکننده‌های هزارگان
+            amount_str = amount_str.replace('،', '').replace(',', '').replace('.', '')
+        
+        # حذف کاراکترهای غیرعددی (به جز نقطه)
+        return re.sub(r'[^\d\.]', '', amount_str)
+    
+    @staticmethod
+    def _normalize_amounts(amounts):
+        """نسخه ستونی _normalize_amount روی یک سری از رشته‌ها"""
+        base = amounts.str.replace('،', '', regex=False).str.replace(',', '', regex=False)
+        without_dots = base.str.replace('.', '', regex=False)
+        slash_decimal = without_dots.str.replace('/', '.', regex=False)
+        has_slash = amounts.str.contains('/', regex=False)
+        single_dot = amounts.str.count(r'\.') == 1
+        normalized = without_dots.where(~single_dot, base).where(~has_slash, slash_decimal)
+        return normalized.str.replace(r'[^\d\.]', '', regex=True)
+    
+    @staticmethod
+    def _normalize_rate(rate):
+        """حذف جداکننده‌ها از نرخ ارز"""
+        # برای نرخ هم جداکننده‌ها را حذف کنیم
+        rate_str = rate.replace('،', '').replace(',', '').replace('.', '')
+        return re.sub(r'[^\d\.]', '', rate_str)
+    
     def extract_currency_info(self, text):
         """استخراج اطلاعات ارز"""
         if not text:
             return {'amount': None, 'currency': None, 'rate': None}
         
-        # الگوهای بهبود یافته برای شناسایی دقیق مبلغ و نرخ
-        patterns = [
-            # فارسی - با نرخ (مثال: 8،276/74 یورو به نرخ 28500)
-            r'(\d[\d،,\.\/]*)\s*(یورو|دلار|يورو|ريال|ریال)\s*(?:به نرخ|با نرخ|نرخ|في|@|ارزش)\s*(\d[\d،,\.]*)\s*(?:ريال|ریال)?',
-            # فارسی - با نرخ (مثال: 8،276/74 یورو نرخ 28500)
-            r'(\d[\d،,\.\/]*)\s*(یورو|دلار|يورو|ريال|ریال)\s*(?:نرخ)\s*(\d[\d،,\.]*)\s*(?:ريال|ریال)?',
-            # فارسی - با نرخ (مثال: 8،276/74 یورو فی 28500)
-            r'(\d[\d،,\.\/]*)\s*(یورو|دلار|يورو|ريال|ریال)\s*(?:في|@)\s*(\d[\d،,\.]*)\s*(?:ريال|ریال)?',
-            # فارسی - با نرخ و خط تیره (مثال: 210154 يورو با نرخ- 16093 ريال)
-            r'(\d[\d،,\.\/]*)\s*(یورو|دلار|يورو|ريال|ریال)\s*(?:با نرخ|نرخ)\s*[-–]\s*(\d[\d،,\.]*)\s*(?:ريال|ریال)?',
-            # فارسی - نرخ بعد از ارز (مثال: 777635 يورو 14874 ريال)
-            r'(\d[\d،,\.\/]*)\s*(یورو|دلار|يورو|ريال|ریال)\s+(\d[\d،,\.]*)\s*(?:ريال|ریال)',
-            # فارسی - بدون نرخ
-            r'(\d[\d،,\.\/]*)\s*(یورو|دلار|يورو|ريال|ریال)',
-            # انگلیسی - با نرخ
-            r'(\d[\d,\.]*)\s*(EUR|USD|IRR|Euro|Dollar|Rial)\s*(?:rate|@|at|value)\s*(\d[\d,\.]*)',
-            # انگلیسی - بدون نرخ
-            r'(\d[\d,\.]*)\s*(EUR|USD|IRR|Euro|Dollar|Rial)',
-        ]
-        
-        for pattern in patterns:
+        for pattern in self.CURRENCY_PATTERNS:
             match = re.search(pattern, str(text))
             if match:
                 groups = match.groups()
@@ -313,34 +632,14 @@ class SimpleSmartExtractor:
                 try:
                     # تبدیل مبلغ ارزی - پردازش فرمت فارسی
                     if amount_str:
-                        # تشخیص نوع فرمت عدد
-                        if '/' in amount_str:
-                            # فرمت فارسی با اسلش (32،368/44) - اسلش به عنوان ممیز
-                            amount_str = amount_str.replace('،', '').replace(',', '').replace('.', '')
-                            amount_str = amount_str.replace('/', '.')
-                        elif '.' in amount_str:
-                            # فرمت انگلیسی با نقطه
-                            if amount_str.count('.') == 1:
-                                # یک نقطه - ممیز ارز (28679.3)
-                                amount_str = amount_str.replace('،', '').replace(',', '')
-                            else:
-                                # بیش از یک نقطه - جداکننده هزارگان (48.638)
-                                amount_str = amount_str.replace('،', '').replace(',', '').replace('.', '')
-                        else:
-                            # فرمت با جداکننده‌های هزارگان
-                            amount_str = amount_str.replace('،', '').replace(',', '').replace('.', '')
-                        
-                        # حذف کاراکترهای غیرعددی (به جز نقطه)
-                        amount_str = re.sub(r'[^\d\.]', '', amount_str)
+                        amount_str = self._normalize_amount(amount_str)
                         amount = float(amount_str) if amount_str else None
                     else:
                         amount = None
                     
                     # تبدیل نرخ
                     if rate:
-                        # برای نرخ هم جداکننده‌ها را حذف کنیم
-                        rate_str = rate.replace('،', '').replace(',', '').replace('.', '')
-                        rate_str = re.sub(r'[^\d\.]', '', rate_str)
+                        rate_str = self._normalize_rate(rate)
                         rate = float(rate_str) if rate_str else None
                 except (ValueError, TypeError) as e:
                     print(f"⚠️ خطا در تبدیل عدد: {amount_str} یا {rate} - {str(e)}")
@@ -359,15 +658,7 @@ class SimpleSmartExtractor:
         if not text:
             return None
         
-        # الگوهای شناسایی نام شرکت بعد از کلمه "شرکت"
-        patterns = [
-            r'شركت\s+([^\s،]+)',
-            r'شرکت\s+([^\s،]+)',
-            r'شركت\s+([^\s،]+)\s+([^\s،]+)?',
-            r'شرکت\s+([^\s،]+)\s+([^\s،]+)?',
-        ]
-        
-        for pattern in patterns:
+        for pattern in self.COMPANY_PATTERNS:
             match = re.search(pattern, str(text))
             if match:
                 # ترکیب کلمات نام شرکت
@@ -375,11 +666,9 @@ class SimpleSmartExtractor:
                 if company_parts:
                     return ' '.join(company_parts)
         
-        # روش قدیمی برای پشتیبانی از شرکت‌های شناخته شده
-        companies = ['ایران', 'ایرایتک', 'پترو ساحل', 'فرآب', 'ناردیس', 'خارک', 'پتروساحل', 'پترو ساحل خلیج فارس']
-        for company in companies:
-            if company in str(text):
-                return company
+        index = self.company_matcher.first_by_priority(str(text))
+        if index is not None:
+            return self.KNOWN_COMPANIES[index]
         
         return None
     
@@ -388,34 +677,86 @@ class SimpleSmartExtractor:
         if not text:
             return 'سند متفرقه'
         
-        desc_lower = str(text).lower()
-        
-        if 'تسعیر' in desc_lower or 'نرخ' in desc_lower:
-            return 'تسعیر ارز'
-        elif 'صورت وضعیت' in desc_lower or 'صورتوضعیت' in desc_lower:
-            return 'صورت وضعیت'
-        elif 'چک' in desc_lower:
-            return 'چک'
-        elif 'انتقال' in desc_lower or 'مانده' in desc_lower:
-            return 'انتقال'
-        else:
-            return 'سند متفرقه'
+        index = self.document_type_matcher.first_by_priority(str(text).lower())
+        if index is not None:
+            return self.DOCUMENT_TYPE_KEYWORDS[index][1]
+        return 'سند متفرقه'
     
-    def process_excel_file(self, input_path, output_suffix="_extracted"):
-        """پردازش کامل فایل اکسل"""
+    def extract_series(self, descriptions):
+        """استخراج ستونی اطلاعات از سری شرح‌ها با همان نتایج متدهای ردیفی"""
+        has_text = text_mask(descriptions).to_numpy()
+        
+        # شماره صورت‌وضعیت
+        invoice = first_match(descriptions, self.INVOICE_PATTERNS, re.IGNORECASE)
+        
+        # اطلاعات ارز؛ ردیف‌هایی که تبدیل عدد آنها خطا دهد به الگوی بعدی می‌روند
+        def convert_currency(pattern_index, whole, groups):
+            amount_text = self._normalize_amounts(groups[1]).fillna('')
+            amount = to_float(amount_text.where(amount_text != ''))
+            rate_text = groups[3].fillna('') if 3 in groups.columns else pd.Series('', index=groups.index)
+            rate_clean = rate_text.str.replace(r'[،,\.]', '', regex=True).str.replace(r'[^\d\.]', '', regex=True)
+            rate = to_float(rate_clean.where(rate_clean != ''))
+            failed = (amount_text.ne('') & amount.isna()) | (rate_clean.ne('') & rate.isna())
+            for amount_str, rate_str in zip(amount_text[failed], rate_text[failed]):
+                print(f"⚠️ خطا در تبدیل عدد: {amount_str} یا {rate_str}")
+            frame = pd.DataFrame({'amount': amount, 'currency': groups[2], 'rate': rate}, index=groups.index)
+            return frame[~failed]
+        
+        currency = first_match(descriptions, self.CURRENCY_PATTERNS, convert=convert_currency)
+        
+        # نام شرکت: ترکیب گروه‌های غیرخالی، در غیر این صورت فهرست شرکت‌های شناخته شده
+        def join_parts(pattern_index, whole, groups):
+            joined = pd.Series('', index=groups.index)
+            for column in groups.columns:
+                part = groups[column].fillna('')
+                joined = joined.where(part == '', joined.where(joined == '', joined + ' ') + part)
+            return pd.DataFrame({'company': joined[joined != '']})
+        
+        company = first_match(descriptions, self.COMPANY_PATTERNS, convert=join_parts)
+        company_names = company['company'] if 'company' in company.columns else pd.Series(None, index=descriptions.index, dtype=object)
+        unresolved = company_names.isna().to_numpy()
+        company_names = as_object(company_names).to_numpy()
+        company_names[unresolved] = take(self.KNOWN_COMPANIES, first_keyword(descriptions[unresolved], self.company_matcher), None)
+        
+        # نوع سند
+        lowered = descriptions.astype(object).where(has_text, None).str.lower()
+        document_index = first_keyword(lowered, self.document_type_matcher)
+        document_types = take([doc_type for _, doc_type in self.DOCUMENT_TYPE_KEYWORDS], document_index, 'سند متفرقه')
+        
+        def column(frame, name, numeric=False):
+            if name not in frame.columns:
+                return np.full(len(descriptions), np.nan) if numeric else np.full(len(descriptions), None, dtype=object)
+            return frame[name].astype(float).to_numpy() if numeric else as_object(frame[name]).to_numpy()
+        
+        return pd.DataFrame({
+            'invoice_number': column(invoice, 1),
+            'currency_amount': column(currency, 'amount', numeric=True),
+            'currency_type': column(currency, 'currency'),
+            'exchange_rate': column(currency, 'rate', numeric=True),
+            'company_name': company_names,
+            'document_type': document_types,
+        }, index=descriptions.index)
+    
+    def process_excel_file(self, input_path, output_suffix="_extracted", output_format='xlsx'):
+        """پردازش کامل فایل اکسل (output_format: xlsx، parquet، feather یا csv)"""
+        check_output_format(output_format)
         print(f"🚀 شروع پردازش فایل: {input_path}")
         
         # خواندن فایل
         try:
-            df = read_excel(input_path)
+            df = read_sheets(input_path, sheet_name=0)[0]
             print(f"✅ فایل خوانده شد: {len(df)} رکورد")
         except Exception as e:
             print(f"❌ خطا در خواندن فایل: {str(e)}")
             return None
         
+        df = self.enrich(df)
+        return self.write_output(df, self.output_filename(input_path, output_suffix, output_format), output_format)
+    
+    def enrich(self, df):
+        """استانداردسازی ستون‌ها و افزودن ستون‌های استخراج شده از شرح"""
         # استانداردسازی ستون‌ها
-        original_columns = df.columns.tolist()
-        df.columns = [self.column_mapping.get(str(col).strip(), str(col).strip()) for col in df.columns]
+        df.columns = self.standard_columns(df.columns)
         
         # حذف ستون‌های تکراری
         df = df.loc[:, ~df.columns.duplicated()]
@@ -431,53 +772,55 @@ class SimpleSmartExtractor:
             description_columns = [col for col in df.columns if 'description' in col.lower() or 'شرح' in col]
             if description_columns:
                 print(f"   🔍 ستون‌های شرح پیدا شده: {description_columns}")
-                descriptions = df[description_columns[0]].astype(str).tolist()
+                descriptions = df[description_columns[0]].astype(object).astype(str)
             else:
                 print("   ❌ هیچ ستون شرحی یافت نشد")
-                descriptions = []
+                descriptions = pd.Series('', index=df.index)
         else:
-            descriptions = df['description'].astype(str).tolist()
-        
-        # ستون‌های جدید
-        invoice_numbers = []
-        currency_amounts = []
-        currency_types = []
-        exchange_rates = []
-        company_names = []
-        document_types = []
-        
-        for desc in descriptions:
-            invoice_numbers.append(self.extract_invoice_number(desc))
-            
-            currency_info = self.extract_currency_info(desc)
-            currency_amounts.append(currency_info['amount'])
-            currency_types.append(currency_info['currency'])
-            exchange_rates.append(currency_info['rate'])
-            
-            company_names.append(self.extract_company(desc))
-            document_types.append(self.detect_document_type(desc))
-        
-        # افزودن ستون‌های جدید
-        df['شماره_وضعیت'] = invoice_numbers
-        df['مبلغ_ارزی'] = currency_amounts
-        df['نوع_ارز'] = currency_types
-        df['نرخ_ارز'] = exchange_rates
-        df['نام_شرکت'] = company_names
-        df['نوع_سند'] = document_types
-        
-        # تولید نام فایل خروجی
+            # astype(object) پیش از str: تبدیل مستقیم categorical آرایه‌ای با طول ثابت بلندترین شرح می‌سازد
+            descriptions = df['description'].astype(object).astype(str)
+        
+        # ستون‌های جدید (استخراج فقط روی شرح‌های یکتا)
+        extracted, stats = extract_unique(descriptions, self.extract_series)
+        print(f"   {format_unique_stats(stats)}")
+        for source, column in self.EXTRACTED_COLUMNS.items():
+            values = extracted[source].to_numpy()
+            df[column] = pd.Categorical(values) if source in self.CATEGORICAL_COLUMNS else values
+        return df
+    
+    def standard_columns(self, columns):
+        """نام استاندارد ستون‌ها با column_mapping (برای چیدمان شناخته شده از ثبت چیدمان)"""
+        registry = self.layout_registry if self.layout_registry is not None else get_layout_registry()
+        if registry is None:
+            return [self.column_mapping.get(str(col).strip(), str(col).strip()) for col in columns]
+        
+        fingerprint = layout_fingerprint(columns, kind='columns')
+        renamed = registry.get(fingerprint, 'renamed_columns')
+        if renamed is None or len(renamed) != len(columns):
+            renamed = [self.column_mapping.get(str(col).strip(), str(col).strip()) for col in columns]
+            registry.put(fingerprint, renamed_columns=renamed)
+        return renamed
+    
+    @staticmethod
+    def output_filename(input_path, output_suffix, output_format='xlsx'):
+        """نام فایل خروجی با پسوند قالب و اندیس در صورت وجود فایل"""
         input_path_obj = Path(input_path)
-        output_filename = f"{input_path_obj.stem}{output_suffix}{input_path_obj.suffix}"
+        extension = OUTPUT_FORMATS[output_format]
+        output_filename = f"{input_path_obj.stem}{output_suffix}{extension}"
         
         counter = 1
         while os.path.exists(output_filename):
-            output_filename = f"{input_path_obj.stem}{output_suffix}_{counter}{input_path_obj.suffix}"
+            output_filename = f"{input_path_obj.stem}{output_suffix}_{counter}{extension}"
             counter += 1
-        
-        # ذخیره فایل
+        return output_filename
+    
+    def write_output(self, df, output_filename, output_format='xlsx'):
+        """ذخیره داده غنی‌شده و نمایش خلاصه نتایج"""
         try:
-            df.to_excel(output_filename, index=False)
+            with open_output_sink(output_filename, output_format) as writer:
+                writer.write(df)
             print(f"💾 فایل خروجی ذخیره شد: {output_filename}")
+            print(f"   {writer.format_stats()}")
             
             # نمایش خلاصه
             invoice_count = df['شماره_وضعیت'].notna().sum()
@@ -497,38 +840,31 @@ class SimpleSmartExtractor:
             return None
 
 
-def process_all_integration(input_path, output_suffix="_all"):
-    """پردازش کامل یکپارچه: ترکیب شیت‌ها + استخراج اطلاعات + فیلتر ستون‌ها"""
+def process_all_integration(input_path, output_suffix="_all", output_format='xlsx', track_memory=False):
+    """پردازش کامل یکپارچه: ترکیب شیت‌ها + فیلتر ستون‌ها + استخراج اطلاعات
+
+    مراحل در یک خط لوله درون‌حافظه‌ای اجرا می‌شوند و DataFrame بدون فایل موقت
+    از مرحله‌ای به مرحله بعد می‌رود؛ خروجی فقط یک بار در پایان نوشته می‌شود.
+    ستون‌های کم‌داده پیش از ترکیب شیت‌ها کنار گذاشته می‌شوند.
+    """
+    check_output_format(output_format)
     print(f"🚀 شروع پردازش یکپارچه کامل: {input_path}")
     
-    # مرحله ۱: ترکیب شیت‌ها
-    print("\n📋 مرحله ۱: ترکیب تمام شیت‌ها")
     combiner = ExcelSheetCombiner()
-    combined_file = combiner.combine_sheets(input_path, "_combined_temp")
-    
-    if not combined_file:
-        print("❌ خطا در ترکیب شیت‌ها")
-        return None
-    
-    # مرحله ۲: استخراج اطلاعات
-    print("\n🔍 مرحله ۲: استخراج اطلاعات هوشمند")
     extractor = SimpleSmartExtractor()
-    final_file = extractor.process_excel_file(combined_file, output_suffix)
-    
-    if not final_file:
-        print("❌ خطا در استخراج اطلاعات")
-        return None
-    
-    # حذف فایل موقت
-    try:
-        os.remove(combined_file)
-        print(f"🗑️ فایل موقت حذف شد: {combined_file}")
-    except:
-        pass
+    output_filename = extractor.output_filename(input_path, output_suffix, output_format)
     
+    pipeline = Pipeline([
+        ('خواندن شیت‌ها', combiner.read_sheet_frames),
+        ('انتخاب ستون‌ها', combiner.select_sheet_columns),
+        ('ترکیب شیت‌ها', combiner.concat_selected),
+        ('استخراج اطلاعات', extractor.enrich),
+        ('نوشتن خروجی', lambda df: extractor.write_output(df, output_filename, output_format)),
+    ], track_memory=track_memory)
+    final_file = pipeline.run(input_path)
+    print(pipeline.format_timings())
     return final_file
 
-
 def main():
     """تابع اصلی"""
     parser = argparse.ArgumentParser(
@@ -539,7 +875,10 @@ def main():
   python simple_standalone.py data.xlsx -o "_processed"
   python simple_standalone.py data.xlsx --combine-sheets
   python simple_standalone.py data.xlsx --combine-sheets -o "_combined"
+  python simple_standalone.py ledger.xlsx --combine-sheets --chunk-size 50000
   python simple_standalone.py data.xlsx all_integration -o "_all"
+  python simple_standalone.py data.xlsx all_integration --format parquet
+  python simple_standalone.py data.xlsx all_integration --profile-memory
         """
     )
     
@@ -548,8 +887,20 @@ def main():
     parser.add_argument('-o', '--output', help='پسوند نام فایل خروجی', default='_extracted')
     parser.add_argument('--combine-sheets', action='store_true', 
                        help='ترکیب تمام شیت‌های فایل اکسل در یک شیت واحد')
+    parser.add_argument('--chunk-size', type=int, default=None,
+                       help='ترکیب جریانی شیت‌ها با تکه‌های N ردیفی برای فایل‌های بزرگ (اختیاری)')
+    parser.add_argument('--format', choices=list(OUTPUT_FORMATS), default='xlsx', dest='output_format',
+                       help='قالب فایل خروجی استخراج (parquet و feather نیاز به pyarrow دارند، پیش‌فرض: xlsx)')
+    parser.add_argument('--ingest-cache', help='مسیر پوشه حافظه نهان ورودی: شیت‌های پارس شده به صورت Parquet برای اجراهای بعدی نگه داشته می‌شوند (نیازمند pyarrow، اختیاری)', default=None)
+    parser.add_argument('--profile-memory', action='store_true',
+                       help='اندازه‌گیری اوج حافظه تخصیص یافته هر مرحله all_integration با tracemalloc (کندتر)')
+    parser.add_argument('--layout-registry', help='مسیر فایل JSON ثبت چیدمان: سرستون و ستون‌های چیدمان‌های تکراری ERP بدون تحلیل دوباره به کار می‌روند (اختیاری)', default=None)
     
     args = parser.parse_args()
+    if args.ingest_cache:
+        configure_ingest_cache(args.ingest_cache)
+    if args.layout_registry:
+        configure_layout_registry(args.layout_registry)
     
     # اعتبارسنجی فایل
     if not os.path.exists(args.input_file):
@@ -559,15 +910,20 @@ def main():
     try:
         if args.operation == 'all_integration':
             # پردازش یکپارچه کامل
-            output_file = process_all_integration(args.input_file, args.output)
+            output_file = process_all_integration(args.input_file, args.output, args.output_format,
+                                                  track_memory=args.profile_memory)
         elif args.combine_sheets:
             # استفاده از کلاس ترکیب کننده شیت‌ها
             combiner = ExcelSheetCombiner()
-            output_file = combiner.combine_sheets(args.input_file, args.output)
+            output_file = combiner.combine_sheets(args.input_file, args.output, args.chunk_size)
         else:
             # استفاده از کلاس استخراج کننده اطلاعات
             extractor = SimpleSmartExtractor()
-            output_file = extractor.process_excel_file(args.input_file, args.output)
+            output_file = extractor.process_excel_file(args.input_file, args.output, args.output_format)
+        
+        registry = get_layout_registry()
+        if registry is not None:
+            print(registry.format_stats())
         
         if output_file:
             print(f"\n🎉 پردازش با موفقیت تکمیل شد!")
@@ -12,6 +12,23 @@ import numpy as np
 from difflib import SequenceMatcher
 import argparse
 import os
+import sys
+from pathlib import Path
+
+# اضافه کردن مسیر ماژول به sys.path
+current_dir = Path(__file__).parent
+sys.path.insert(0, str(current_dir))
+
+# استفاده از import مطلق
+try:
+    from smart_extractor.utils.excel_reader import read_sheets
+    from smart_extractor.utils.excel_writer import StreamingExcelWriter
+    from smart_extractor.utils.ingest_cache import configure_ingest_cache
+except ImportError:
+    # اگر import مطلق کار نکرد، از import نسبی استفاده کنیم
+    from utils.excel_reader import read_sheets
+    from utils.excel_writer import StreamingExcelWriter
+    from utils.ingest_cache import configure_ingest_cache
 
 
 class SmartSheetAnalysis:
@@ -263,8 +280,8 @@ class SmartSheetAnalysis:
         print("=" * 50)
         
         # خواندن فایل‌ها
-        df_a = pd.read_excel(file_a_path)
-        df_b = pd.read_excel(file_b_path)
+        df_a = read_sheets(file_a_path, sheet_name=0)[0]
+        df_b = read_sheets(file_b_path, sheet_name=0)[0]
         
         print(f"✅ فایل A خوانده شد: {len(df_a)} رکورد")
         print(f"✅ فایل B خوانده شد: {len(df_b)} رکورد")
@@ -284,17 +301,17 @@ class SmartSheetAnalysis:
         print(f"🎯 تعداد تطابق‌های یافت شده: {len(matches)}")
         
         # ایجاد گزارش
-        with pd.ExcelWriter(output_path, engine='openpyxl') as writer:
+        with StreamingExcelWriter(output_path) as writer:
             # 1. خلاصه شیت‌های فایل A
-            summary_a.to_excel(writer, sheet_name='خلاصه_فایل_A', index=False)
+            writer.write_sheet('خلاصه_فایل_A', summary_a)
             
             # 2. خلاصه شیت‌های فایل B
-            summary_b.to_excel(writer, sheet_name='خلاصه_فایل_B', index=False)
+            writer.write_sheet('خلاصه_فایل_B', summary_b)
             
             # 3. تطابق‌های یافت شده
             if matches:
                 matches_df = pd.DataFrame(matches)
-                matches_df.to_excel(writer, sheet_name='تطابق‌ها', index=False)
+                writer.write_sheet('تطابق‌ها', matches_df)
             
             # 4. آمار کلی
             stats_data = {
@@ -316,7 +333,7 @@ class SmartSheetAnalysis:
                 ]
             }
             stats_df = pd.DataFrame(stats_data)
-            stats_df.to_excel(writer, sheet_name='آمار_کلی', index=False)
+            writer.write_sheet('آمار_کلی', stats_df)
         
         # نمایش نتایج
         self._display_results(summary_a, summary_b, matches)
@@ -350,8 +367,11 @@ def main():
     parser.add_argument('file_a', help='مسیر فایل اکسل شرکت A')
     parser.add_argument('file_b', help='مسیر فایل اکسل شرکت B')
     parser.add_argument('-o', '--output', help='مسیر فایل خروجی', default='smart_sheet_analysis.xlsx')
+    parser.add_argument('--ingest-cache', help='مسیر پوشه حافظه نهان ورودی: شیت‌های پارس شده به صورت Parquet برای اجراهای بعدی نگه داشته می‌شوند (نیازمند pyarrow، اختیاری)', default=None)
     
     args = parser.parse_args()
+    if args.ingest_cache:
+        configure_ingest_cache(args.ingest_cache)
     
     # بررسی وجود فایل‌ها
     if not os.path.exists(args.file_a):
@@ -17,10 +17,14 @@ sys.path.insert(0, str(current_dir))
 try:
     from smart_extractor.processors.excel_processor import ExcelProcessor
     from smart_extractor.utils.file_handler import FileHandler
+    from smart_extractor.utils.ingest_cache import configure_ingest_cache
+    from smart_extractor.utils.output_sinks import OUTPUT_FORMATS
 except ImportError:
     # اگر import مطلق کار نکرد، از import نسبی استفاده کنیم
     from processors.excel_processor import ExcelProcessor
     from utils.file_handler import FileHandler
+    from utils.ingest_cache import configure_ingest_cache
+    from utils.output_sinks import OUTPUT_FORMATS
 
 
 def main():
@@ -33,14 +37,28 @@ def main():
   python standalone.py data.xlsx
   python standalone.py data.xlsx -o extracted_data
   python standalone.py data.xlsx --suffix "_processed"
+  python standalone.py data.xlsx --cache extraction_cache.db
+  python standalone.py ledger.xlsx --chunk-size 50000 --sheet "1402"
+  python standalone.py data.xlsx --format parquet
         """
     )
     
     parser.add_argument('input_file', help='مسیر فایل اکسل ورودی')
     parser.add_argument('-o', '--output', help='پسوند نام فایل خروجی (اختیاری)', default='_extracted')
     parser.add_argument('--suffix', help='نام مستعار برای پسوند خروجی', default=None)
+    parser.add_argument('--cache', help='مسیر فایل SQLite حافظه نهان نتایج استخراج (اختیاری)', default=None)
+    parser.add_argument('--cache-size', type=int, default=1_000_000,
+                        help='حداکثر تعداد ردیف‌های حافظه نهان (پیش‌فرض: 1000000)')
+    parser.add_argument('--chunk-size', type=int, default=None,
+                        help='پردازش جریانی با تکه‌های N ردیفی برای فایل‌های بزرگ (اختیاری)')
+    parser.add_argument('--sheet', help='پردازش فقط یک شیت (اختیاری)', default=None)
+    parser.add_argument('--format', choices=list(OUTPUT_FORMATS), default='xlsx', dest='output_format',
+                        help='قالب فایل خروجی (parquet و feather نیاز به pyarrow دارند، پیش‌فرض: xlsx)')
+    parser.add_argument('--ingest-cache', help='مسیر پوشه حافظه نهان ورودی: شیت‌های پارس شده به صورت Parquet برای اجراهای بعدی نگه داشته می‌شوند (نیازمند pyarrow، اختیاری)', default=None)
     
     args = parser.parse_args()
+    if args.ingest_cache:
+        configure_ingest_cache(args.ingest_cache)
     
     # اعتبارسنجی فایل ورودی
     if not os.path.exists(args.input_file):
@@ -55,12 +73,12 @@ def main():
         print("=" * 50)
         
         # پردازش فایل
-        processor = ExcelProcessor()
-        output_path = processor.process_excel_file(args.input_file, suffix)
+        processor = ExcelProcessor(cache_path=args.cache, cache_size=args.cache_size)
+        output_path = processor.process_excel_file(args.input_file, suffix, chunk_size=args.chunk_size,
+                                                   sheet_name=args.sheet, output_format=args.output_format)
         
-        # نمایش خلاصه نتایج
-        df = processor.read_excel_file(output_path)
-        summary = processor.get_processing_summary(df)
+        # نمایش خلاصه نتایج (محاسبه شده هنگام پردازش، بدون خواندن مجدد خروجی)
+        summary = processor.last_summary
         
         print(f"\n📊 خلاصه نتایج:")
         print(f"   کل رکوردها: {summary['total_records']}")
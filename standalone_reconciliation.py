@@ -10,18 +10,67 @@ Usage:
     python standalone_reconciliation.py file_a.xlsx file_b.xlsx [output_file.xlsx]
 """
 
+import numpy as np
 import pandas as pd
 import sys
 import os
 import re
+import math
+import heapq
 import argparse
 from pathlib import Path
 
+# اضافه کردن مسیر ماژول به sys.path
+current_dir = Path(__file__).parent
+sys.path.insert(0, str(current_dir))
+
+# استفاده از import مطلق
+try:
+    from smart_extractor.utils.excel_reader import read_sheets
+    from smart_extractor.utils.excel_writer import StreamingExcelWriter
+    from smart_extractor.utils.ingest_cache import configure_ingest_cache
+    from smart_extractor.utils.sheet_union import concat_sheets
+except ImportError:
+    # اگر import مطلق کار نکرد، از import نسبی استفاده کنیم
+    from utils.excel_reader import read_sheets
+    from utils.excel_writer import StreamingExcelWriter
+    from utils.ingest_cache import configure_ingest_cache
+    from utils.sheet_union import concat_sheets
+
 
 class StandaloneReconciliation:
     """سیستم مغایرت‌گیری هوشمند مستقل"""
     
-    def __init__(self):
+    # تعداد ردیف‌های هر تکه در نوشتن فایل نتایج
+    RESULT_CHUNK_ROWS = 50_000
+    
+    # تطبیق فازی: آستانه امتیاز کلی و وزن تشابه شرح و مبلغ
+    FUZZY_THRESHOLD = 70
+    FUZZY_TEXT_WEIGHT = 0.7
+    FUZZY_AMOUNT_WEIGHT = 0.3
+    
+    # مقایسه علامت مبالغ در تطبیق فازی: same (بدون تغییر)، opposite (بدهکار یک طرف
+    # بستانکار طرف دیگر است) یا absolute (فقط اندازه مبلغ)
+    AMOUNT_SIGN_MODES = ('same', 'opposite', 'absolute')
+    
+    # فهرست کلمه‌های بلندتر از این به ترتیب مبلغ نگه داشته و با searchsorted به پنجره مبلغ بریده می‌شوند
+    FUZZY_SORTED_POSTINGS = 32
+    
+    # فیلدهای استخراج شده هر ردیف در دفتر آماده شده (به ترتیب _description_fields)
+    EXTRACTED_FIELDS = ('invoice_number', 'check_number', 'currency', 'foreign_amount', 'exchange_rate',
+                        'company_name', 'document_type')
+    
+    def __init__(self, amount_tolerance=0.01, amount_sign='same'):
+        if amount_sign not in self.AMOUNT_SIGN_MODES:
+            raise ValueError(f"amount_sign must be one of {', '.join(self.AMOUNT_SIGN_MODES)}: {amount_sign}")
+        
+        # پنجره مبلغ تطبیق فازی: اختلاف نسبی کمتر از amount_tolerance
+        self.amount_tolerance = amount_tolerance
+        self.amount_sign = amount_sign
+        
+        # آمار نامزدهای آخرین تطبیق فازی
+        self.fuzzy_stats = {}
+        
         self.column_mapping = {
             # Persian column names
             'شرح': 'description',
@@ -171,17 +220,9 @@ class StandaloneReconciliation:
     def _process_excel_file(self, file_path, company_label):
         """Process Excel file and extract data"""
         try:
-            # Read all sheets and combine
-            excel_file = pd.ExcelFile(file_path)
-            all_sheets_data = []
-            
-            for sheet_name in excel_file.sheet_names:
-                df_sheet = pd.read_excel(file_path, sheet_name=sheet_name)
-                df_sheet['sheet_name'] = sheet_name
-                all_sheets_data.append(df_sheet)
-            
-            # Combine all sheets
-            combined_df = pd.concat(all_sheets_data, ignore_index=True)
+            # Read all sheets (single open, parallel for multi-sheet files) and combine
+            # with aligned dtypes and a categorical sheet_name column
+            combined_df = concat_sheets(read_sheets(file_path), 'sheet_name')
             
             # Standardize column names
             combined_df = self._standardize_columns(combined_df)
@@ -239,112 +280,367 @@ class StandaloneReconciliation:
             'document_type': doc_type,
         }
     
-    def _find_exact_matches(self, df_a, df_b):
-        """Find exact matches based on invoice number and amount"""
+    def _ledger_columns(self, df):
+        """Description strings and parsed amounts of every row, parsed once per ledger"""
+        # مانند str(row.get('description', '')) و _convert_to_float(row.get('amount', 0)) در حلقه ردیفی
+        if 'description' in df.columns:
+            descriptions = [str(value) for value in df['description']]
+        else:
+            descriptions = [''] * len(df)
+        
+        if 'amount' not in df.columns:
+            amounts = [0.0] * len(df)
+        elif isinstance(df['amount'].dtype, np.dtype) and df['amount'].dtype.kind in 'iuf':
+            amounts = df['amount'].to_numpy(dtype=float).tolist()
+        else:
+            amounts = [self._convert_to_float(value) for value in df['amount']]
+        return descriptions, amounts
+    
+    def _description_fields(self, description):
+        """Word set and every extracted field of one description (all regex work of a row)"""
+        currency_info = self.extract_currency_info(description)
+        return (
+            frozenset(description.lower().split()),  # کلمه‌ها مانند _calculate_similarity
+            self.extract_invoice_number(description),
+            self.extract_check_number(description),
+            currency_info['currency'],
+            currency_info['amount'],
+            currency_info['rate'],
+            self.extract_company(description),
+            self.detect_document_type(description),
+        )
+    
+    def _prepare_ledger(self, df):
+        """Precompute stage: typed columns of every field used by matching, extracted once per ledger
+
+        Each distinct description is parsed once; the matching stages read only
+        these columns and run no regex. A prepared ledger is returned unchanged.
+        """
+        if df.attrs.get('reconciliation_ledger'):
+            return df
+        
+        descriptions, amounts = self._ledger_columns(df)
+        fields = {}
+        rows = []
+        for description in descriptions:
+            if description not in fields:
+                fields[description] = self._description_fields(description)
+            rows.append(fields[description])
+        columns = list(zip(*rows)) if rows else [()] * (len(self.EXTRACTED_FIELDS) + 1)
+        
+        ledger = pd.DataFrame({
+            'description': pd.Series(descriptions, index=df.index, dtype=object),
+            'amount': pd.Series(amounts, index=df.index, dtype='float64'),
+            'words': pd.Series(columns[0], index=df.index, dtype=object),
+            'invoice_number': pd.Series(columns[1], index=df.index, dtype=object),
+            'check_number': pd.Series(columns[2], index=df.index, dtype=object),
+            'currency': pd.Series(columns[3], index=df.index, dtype='category'),
+            'foreign_amount': pd.Series(columns[4], index=df.index, dtype='float64'),
+            'exchange_rate': pd.Series(columns[5], index=df.index, dtype='float64'),
+            'company_name': pd.Series(columns[6], index=df.index, dtype='category'),
+            'document_type': pd.Series(columns[7], index=df.index, dtype='category'),
+        }, index=df.index)
+        ledger.attrs['reconciliation_ledger'] = True
+        ledger.attrs['unique_descriptions'] = len(fields)
+        return ledger
+    
+    def _ledger_values(self, ledger):
+        """Ledger columns as lists for the matching loops, with per-row field tuples (missing values None)"""
+        values = {column: ledger[column].tolist() for column in ('description', 'amount', 'words')}
+        field_values = []
+        for column in self.EXTRACTED_FIELDS:
+            series = ledger[column].astype(object)
+            field_values.append(series.where(series.notna(), None).tolist())
+        values['fields'] = list(zip(*field_values))
+        return values
+    
+    def _line_fields(self, fields_a, fields_b):
+        """Extracted fields of a result line from both sides, as _extract_smart_data(description_a, description_b)"""
+        invoice_a, check_a, currency, foreign_amount, exchange_rate, company_a, document_type = fields_a
+        invoice_b, check_b, _, _, _, company_b, _ = fields_b
+        # extract_currency_info و detect_document_type همیشه مقدار برمی‌گردانند، پس ارز و نوع سند
+        # مانند _extract_smart_data همیشه از شرح اول هستند
+        return {
+            'invoice_number': invoice_a or invoice_b,
+            'check_number': check_a or check_b,
+            'currency': currency,
+            'foreign_amount': foreign_amount,
+            'exchange_rate': exchange_rate,
+            'company_name': company_a or company_b,
+            'document_type': document_type,
+        }
+    
+    def _unmatched_rows(self, ledger, matched):
+        """Positions of the rows not matched yet and the ledger values of only those rows"""
+        if matched is None:
+            matched = np.zeros(len(ledger), dtype=bool)
+        positions = np.flatnonzero(~matched)
+        rows = ledger if len(positions) == len(ledger) else ledger.iloc[positions]
+        return matched, positions.tolist(), self._ledger_values(rows)
+    
+    def _empty_fields(self):
+        """Extracted fields of an empty description (the missing side of a missing record)"""
+        return self._description_fields('')[1:]
+    
+    @staticmethod
+    def _minor_units(amount):
+        """Amount in integer minor units (hundredths) used as the join key"""
+        return math.floor(amount * 100)
+    
+    def _find_exact_matches(self, df_a, df_b, matched_a=None, matched_b=None):
+        """Find exact matches based on invoice number and amount
+
+        Hash join: the unmatched rows of file B are indexed once by (invoice
+        number, amount in minor units) and every unmatched row of A, in file
+        order, takes the first free row of B (in file order) with the same
+        invoice number and an amount difference below 0.01. Each row of B is
+        matched at most once. matched_a / matched_b are boolean row masks of
+        the ledgers; rows already set are skipped and matched rows are set.
+        """
         matches = []
         
-        for idx_a, row_a in df_a.iterrows():
-            description_a = str(row_a.get('description', ''))
-            amount_a = self._convert_to_float(row_a.get('amount', 0))
-            invoice_number = self.extract_invoice_number(description_a)
+        ledger_a = self._prepare_ledger(df_a)
+        ledger_b = self._prepare_ledger(df_b)
+        matched_a, rows_a, values_a = self._unmatched_rows(ledger_a, matched_a)
+        matched_b, rows_b, values_b = self._unmatched_rows(ledger_b, matched_b)
+        amounts_b = values_b['amount']
+        
+        # شاخص فایل دوم: (شماره صورت‌وضعیت، مبلغ به واحد خرد) ← ردیف‌ها به ترتیب فایل
+        index_b = {}
+        for position, (fields_b, amount_b) in enumerate(zip(values_b['fields'], amounts_b)):
+            invoice_number = fields_b[0]
+            if invoice_number and math.isfinite(amount_b):
+                index_b.setdefault((invoice_number, self._minor_units(amount_b)), []).append(position)
+        
+        for row_a, description_a, amount_a, fields_a in zip(rows_a, values_a['description'], values_a['amount'],
+                                                             values_a['fields']):
+            invoice_number = fields_a[0]
+            if not invoice_number or not math.isfinite(amount_a):
+                continue
             
-            if invoice_number:
-                # جستجوی تطبیق دقیق در فایل دوم
-                for idx_b, row_b in df_b.iterrows():
-                    description_b = str(row_b.get('description', ''))
-                    amount_b = self._convert_to_float(row_b.get('amount', 0))
-                    
-                    if (self.extract_invoice_number(description_b) == invoice_number and 
-                        abs(amount_a - amount_b) < 0.01):  # اختلاف کمتر از 0.01
-                        
-                        # استخراج اطلاعات هوشمند
-                        extracted_info = self._extract_smart_data(description_a, description_b)
-                        
-                        matches.append({
-                            'statement_number': f"INV{invoice_number}",
-                            'amount_a': amount_a,
-                            'amount_b': amount_b,
-                            'description_a': description_a,
-                            'description_b': description_b,
-                            'state': 'matched',
-                            'similarity_score': 100.0,
-                            'match_type': 'exact',
-                            **extracted_info
-                        })
+            # اختلاف کمتر از 0.01 یعنی مبلغ فایل دوم در همان واحد خرد یا واحد مجاور است
+            units = self._minor_units(amount_a)
+            match = None
+            match_key = None
+            for key_units in (units - 1, units, units + 1):
+                for position in index_b.get((invoice_number, key_units), ()):
+                    if match is not None and position > match:
+                        break
+                    if abs(amount_a - amounts_b[position]) < 0.01:  # اختلاف کمتر از 0.01
+                        match = position
+                        match_key = (invoice_number, key_units)
                         break
+            if match is None:
+                continue
+            
+            # هر ردیف B فقط یک بار تطبیق می‌خورد
+            index_b[match_key].remove(match)
+            matched_a[row_a] = True
+            matched_b[rows_b[match]] = True
+            
+            # اطلاعات هوشمند از فیلدهای استخراج شده دو دفتر
+            extracted_info = self._line_fields(fields_a, values_b['fields'][match])
+            
+            matches.append({
+                'statement_number': f"INV{invoice_number}",
+                'amount_a': amount_a,
+                'amount_b': amounts_b[match],
+                'description_a': description_a,
+                'description_b': values_b['description'][match],
+                'state': 'matched',
+                'similarity_score': 100.0,
+                'match_type': 'exact',
+                **extracted_info
+            })
         
         return matches
     
-    def _find_fuzzy_matches(self, df_a, df_b):
-        """Find fuzzy matches based on description similarity"""
+    def _min_shared_words(self, word_count):
+        """Fewest shared words that can lift a description of word_count words above the fuzzy threshold"""
+        # تشابه شرح حداکثر shared / word_count است و مبلغ حداکثر 100 امتیاز می‌دهد
+        for shared in range(1, word_count + 1):
+            similarity = shared / word_count * 100
+            if similarity * self.FUZZY_TEXT_WEIGHT + 100.0 * self.FUZZY_AMOUNT_WEIGHT > self.FUZZY_THRESHOLD:
+                return shared
+        return word_count + 1
+    
+    def _compared_amounts(self, amounts, side):
+        """Amounts as compared by the fuzzy amount window, after amount_sign handling"""
+        values = np.asarray(amounts, dtype=float)
+        if self.amount_sign == 'absolute':
+            return np.abs(values)
+        if self.amount_sign == 'opposite' and side == 'b':
+            return -values
+        return values
+    
+    def _find_fuzzy_matches(self, df_a, df_b, matched_a=None, matched_b=None):
+        """Find fuzzy matches based on description similarity
+
+        Only rows not set in the matched_a / matched_b masks take part, so rows
+        matched by an earlier stage shrink the search. A score above the threshold
+        needs shared words, so the free rows of B are indexed once as word -> row
+        positions and every free row of A scores only candidate rows of B. Pairs
+        above the threshold are assigned globally best-first from a heap (ties go
+        to the earlier row of A, then of B), each row at most once, and the masks
+        are set for the assigned rows.
+
+        A match shares at least _min_shared_words of the words of A, so it always
+        shares one of the rarest len - min + 1 of them; only those posting lists
+        are read and very frequent words are skipped whenever that bound allows.
+        The scored pairs equal the full scan. Candidate counts go to fuzzy_stats.
+
+        The amount half of the score is also required, so only rows of B inside
+        the amount window of A (relative amount_tolerance, after amount_sign
+        handling) are candidates. Long posting lists are kept sorted by amount
+        and cut to the window with searchsorted; short ones are filtered
+        directly. The full score is re-checked for every candidate, so typical
+        ledgers run in O(n log n).
+        """
         matches = []
         
-        for idx_a, row_a in df_a.iterrows():
-            description_a = str(row_a.get('description', ''))
-            amount_a = self._convert_to_float(row_a.get('amount', 0))
+        prepared_a = self._prepare_ledger(df_a)
+        prepared_b = self._prepare_ledger(df_b)
+        matched_a, rows_a, ledger_a = self._unmatched_rows(prepared_a, matched_a)
+        matched_b, rows_b, ledger_b = self._unmatched_rows(prepared_b, matched_b)
+        amounts_a, amounts_b = ledger_a['amount'], ledger_b['amount']
+        tokens_a, tokens_b = ledger_a['words'], ledger_b['words']
+        
+        # شاخص معکوس فایل دوم: کلمه ← ردیف‌ها به ترتیب فایل
+        index_b = {}
+        for position, words_b in enumerate(tokens_b):
+            for word in words_b:
+                index_b.setdefault(word, []).append(position)
+        
+        # پنجره مبلغ هر ردیف A؛ کمی بازتر جستجو می‌شود و شرط اصلی برای هر نامزد دوباره
+        # بررسی می‌شود (مبالغ نامتناهی و NaN هیچ‌گاه در پنجره نیستند)
+        values_a = self._compared_amounts(amounts_a, 'a')
+        values_b = self._compared_amounts(amounts_b, 'b')
+        with np.errstate(invalid='ignore'):
+            half_width = self.amount_tolerance * np.maximum(values_a, 1) * (1 + 1e-9) + 1e-12
+        window_lows = (values_a - half_width).tolist()
+        window_highs = (values_a + half_width).tolist()
+        
+        # فهرست‌های بلند کلمه‌ها به ترتیب مبلغ: (مبالغ مرتب، ردیف‌ها)
+        postings_by_amount = {}
+        for word, positions in index_b.items():
+            if len(positions) > self.FUZZY_SORTED_POSTINGS:
+                positions = np.asarray(positions)
+                positions = positions[np.isfinite(values_b[positions])]
+                order = np.argsort(values_b[positions], kind='stable')
+                postings_by_amount[word] = (values_b[positions[order]], positions[order])
+        
+        compared_b = values_b.tolist()
+        min_shared_words = {}
+        candidate_count = 0
+        skipped_postings = 0
+        # جفت‌های بالاتر از آستانه: (منفی امتیاز، ردیف A، ردیف B)
+        scored_pairs = []
+        
+        for position_a, (value_a, words_a, window_low, window_high) in enumerate(zip(
+                values_a.tolist(), tokens_a, window_lows, window_highs)):
+            if not words_a or not math.isfinite(value_a):
+                continue
+            
+            # کلمه‌های مشترک تطبیق از میان کلمه‌های موجود در B هستند؛ از کم‌تکرارترین‌ها
+            # همان تعدادی پیمایش می‌شود که حتماً یکی از آن‌ها مشترک باشد
+            if len(words_a) not in min_shared_words:
+                min_shared_words[len(words_a)] = self._min_shared_words(len(words_a))
+            present_words = sorted((word for word in words_a if word in index_b), key=lambda word: len(index_b[word]))
+            prefix_length = len(present_words) - min_shared_words[len(words_a)] + 1
+            if prefix_length <= 0:
+                continue
             
-            best_match = None
-            best_score = 0
+            # نامزدها: ردیف‌های فهرست کلمه‌های پیشوند که در پنجره مبلغ هستند
+            candidates = set()
+            for word in present_words[:prefix_length]:
+                if word in postings_by_amount:
+                    sorted_values, positions = postings_by_amount[word]
+                    start = np.searchsorted(sorted_values, window_low, side='left')
+                    end = np.searchsorted(sorted_values, window_high, side='right')
+                    candidates.update(positions[start:end].tolist())
+                else:
+                    candidates.update(position for position in index_b[word]
+                                      if window_low <= compared_b[position] <= window_high)
+            skipped_postings += len(present_words) - prefix_length
+            candidate_count += len(candidates)
             
-            for idx_b, row_b in df_b.iterrows():
-                description_b = str(row_b.get('description', ''))
-                amount_b = self._convert_to_float(row_b.get('amount', 0))
+            for position in candidates:
+                words_b = tokens_b[position]
                 
-                # محاسبه تشابه شرح
-                similarity = self._calculate_similarity(description_a, description_b)
+                # محاسبه تشابه مبلغ (اختلاف نسبی کمتر از amount_tolerance)
+                value_b = compared_b[position]
+                amount_similarity = 100.0 if abs(value_a - value_b) / max(value_a, 1) < self.amount_tolerance else 0
                 
-                # محاسبه تشابه مبلغ (اختلاف کمتر از 1%)
-                amount_similarity = 100.0 if abs(amount_a - amount_b) / max(amount_a, 1) < 0.01 else 0
+                # محاسبه تشابه شرح (مانند _calculate_similarity)
+                similarity = len(words_a & words_b) / max(len(words_a), len(words_b)) * 100
                 
                 # امتیاز کلی
-                total_score = (similarity * 0.7) + (amount_similarity * 0.3)
+                total_score = (similarity * self.FUZZY_TEXT_WEIGHT) + (amount_similarity * self.FUZZY_AMOUNT_WEIGHT)
                 
-                if total_score > best_score and total_score > 70:  # آستانه تشابه
-                    best_score = total_score
-                    best_match = (row_b, total_score)
+                if total_score > self.FUZZY_THRESHOLD:  # آستانه تشابه
+                    scored_pairs.append((-total_score, position_a, position))
+        
+        # تخصیص یک‌به‌یک: بهترین جفت‌ها اول، هر ردیف دو فایل حداکثر یک بار
+        heapq.heapify(scored_pairs)
+        assigned_a = set()
+        assigned_b = set()
+        pairs_left = min(len(tokens_a), len(tokens_b))
+        assignment = []
+        while scored_pairs and len(assignment) < pairs_left:
+            negative_score, position_a, position_b = heapq.heappop(scored_pairs)
+            if position_a in assigned_a or position_b in assigned_b:
+                continue
+            assigned_a.add(position_a)
+            assigned_b.add(position_b)
+            assignment.append((position_a, position_b, -negative_score))
+        
+        # نتایج به ترتیب ردیف‌های فایل A
+        for position_a, position_b, score in sorted(assignment):
+            row_a = rows_a[position_a]
+            matched_a[row_a] = True
+            matched_b[rows_b[position_b]] = True
+            extracted_info = self._line_fields(ledger_a['fields'][position_a], ledger_b['fields'][position_b])
             
-            if best_match:
-                row_b, score = best_match
-                description_b = str(row_b.get('description', ''))
-                amount_b = self._convert_to_float(row_b.get('amount', 0))
-                
-                extracted_info = self._extract_smart_data(description_a, description_b)
-                
-                matches.append({
-                    'statement_number': f"FUZZY{idx_a}",
-                    'amount_a': amount_a,
-                    'amount_b': amount_b,
-                    'description_a': description_a,
-                    'description_b': description_b,
-                    'state': 'matched',
-                    'similarity_score': score,
-                    'match_type': 'fuzzy',
-                    **extracted_info
-                })
-        
+            matches.append({
+                'statement_number': f"FUZZY{prepared_a.index[row_a]}",
+                'amount_a': amounts_a[position_a],
+                'amount_b': amounts_b[position_b],
+                'description_a': ledger_a['description'][position_a],
+                'description_b': ledger_b['description'][position_b],
+                'state': 'matched',
+                'similarity_score': score,
+                'match_type': 'fuzzy',
+                **extracted_info
+            })
+        
+        pairs = len(tokens_a) * len(tokens_b)
+        self.fuzzy_stats = {
+            'pairs': pairs,
+            'candidates': candidate_count,
+            'skipped_postings': skipped_postings,
+            'pruned_ratio': 1 - candidate_count / pairs if pairs else 0.0,
+        }
         return matches
     
-    def _find_missing_records(self, df_a, df_b, existing_matches):
-        """Find records that exist in only one file"""
+    def _find_missing_records(self, df_a, df_b, matched_a, matched_b):
+        """Find records that exist in only one file
+
+        The rows not set in the matched_a / matched_b masks of the matching
+        stages (row identity, so duplicate descriptions stay separate).
+        """
         missing_records = []
         
-        # استخراج رکوردهای تطبیق شده
-        matched_a_indices = set()
-        matched_b_indices = set()
-        
-        for match in existing_matches:
-            if match['description_a']:
-                matched_a_indices.add(match['description_a'])
-            if match['description_b']:
-                matched_b_indices.add(match['description_b'])
+        ledger_a = self._prepare_ledger(df_a)
+        ledger_b = self._prepare_ledger(df_b)
+        _, rows_a, values_a = self._unmatched_rows(ledger_a, matched_a)
+        _, rows_b, values_b = self._unmatched_rows(ledger_b, matched_b)
+        empty_fields = self._empty_fields()
         
         # شناسایی رکوردهای مفقود در فایل A
-        for idx_b, row_b in df_b.iterrows():
-            description_b = str(row_b.get('description', ''))
-            if description_b and description_b not in matched_b_indices:
-                amount_b = self._convert_to_float(row_b.get('amount', 0))
-                
-                extracted_info = self._extract_smart_data('', description_b)
+        for idx_b, description_b, amount_b, fields_b in zip(ledger_b.index[rows_b], values_b['description'],
+                                                             values_b['amount'], values_b['fields']):
+            if description_b:
+                extracted_info = self._line_fields(empty_fields, fields_b)
                 
                 missing_records.append({
                     'statement_number': f"MISSING_A{idx_b}",
@@ -359,12 +655,10 @@ class StandaloneReconciliation:
                 })
         
         # شناسایی رکوردهای مفقود در فایل B
-        for idx_a, row_a in df_a.iterrows():
-            description_a = str(row_a.get('description', ''))
-            if description_a and description_a not in matched_a_indices:
-                amount_a = self._convert_to_float(row_a.get('amount', 0))
-                
-                extracted_info = self._extract_smart_data(description_a, '')
+        for idx_a, description_a, amount_a, fields_a in zip(ledger_a.index[rows_a], values_a['description'],
+                                                             values_a['amount'], values_a['fields']):
+            if description_a:
+                extracted_info = self._line_fields(fields_a, empty_fields)
                 
                 missing_records.append({
                     'statement_number': f"MISSING_B{idx_a}",
@@ -389,20 +683,32 @@ class StandaloneReconciliation:
         df_a = self._process_excel_file(file_a_path, 'A')
         df_b = self._process_excel_file(file_b_path, 'B')
         
-        # اجرای الگوریتم‌های تطبیق
+        # استخراج یک‌باره فیلدهای هر دفتر؛ مراحل تطبیق فقط این ستون‌ها را می‌خوانند
+        print("🧮 استخراج فیلدهای دفترها...")
+        df_a = self._prepare_ledger(df_a)
+        df_b = self._prepare_ledger(df_b)
+        for label, ledger in (('A', df_a), ('B', df_b)):
+            print(f"   🔁 دفتر {label}: {ledger.attrs['unique_descriptions']} شرح یکتا از {len(ledger)} ردیف")
+        
+        # اجرای الگوریتم‌های تطبیق؛ ردیف‌های تطبیق شده در ماسک‌ها علامت می‌خورند
+        # و مراحل بعدی فقط ردیف‌های باقی‌مانده را می‌بینند
         print("🔍 اجرای الگوریتم‌های تطبیق...")
+        matched_a = np.zeros(len(df_a), dtype=bool)
+        matched_b = np.zeros(len(df_b), dtype=bool)
         
         # تطبیق دقیق - بر اساس شماره صورت‌وضعیت و مبلغ
-        exact_matches = self._find_exact_matches(df_a, df_b)
+        exact_matches = self._find_exact_matches(df_a, df_b, matched_a, matched_b)
         print(f"   تطبیق دقیق: {len(exact_matches)} رکورد")
+        print(f"   ↘️ ردیف‌های باقی‌مانده: A {len(df_a) - matched_a.sum():,}، B {len(df_b) - matched_b.sum():,}")
         
         # تطبیق فازی - بر اساس تشابه شرح و مبلغ
-        fuzzy_matches = self._find_fuzzy_matches(df_a, df_b)
+        fuzzy_matches = self._find_fuzzy_matches(df_a, df_b, matched_a, matched_b)
         print(f"   تطبیق فازی: {len(fuzzy_matches)} رکورد")
+        print(f"   🔎 نامزدهای تطبیق فازی: {self.fuzzy_stats['candidates']:,} از {self.fuzzy_stats['pairs']:,} جفت "
+              f"({self.fuzzy_stats['pruned_ratio'] * 100:.1f}% هرس شد)")
         
         # شناسایی رکوردهای مفقود
-        all_matches = exact_matches + fuzzy_matches
-        missing_records = self._find_missing_records(df_a, df_b, all_matches)
+        missing_records = self._find_missing_records(df_a, df_b, matched_a, matched_b)
         print(f"   رکوردهای مفقود: {len(missing_records)} رکورد")
         
         # ترکیب تمام نتایج
@@ -417,12 +723,11 @@ class StandaloneReconciliation:
         
         return analysis_lines
     
-    def _generate_result_file(self, analysis_lines, output_path):
-        """Generate result Excel file"""
-        try:
-            # ایجاد دیتافریم نتایج
+    def _result_chunks(self, analysis_lines):
+        """Build result rows chunk by chunk for streaming output"""
+        for start in range(0, len(analysis_lines), self.RESULT_CHUNK_ROWS):
             result_data = []
-            for line in analysis_lines:
+            for line in analysis_lines[start:start + self.RESULT_CHUNK_ROWS]:
                 result_data.append({
                     'Statement Number': line.get('statement_number', ''),
                     'Amount A': line.get('amount_a', 0),
@@ -438,9 +743,11 @@ class StandaloneReconciliation:
                     'Description A': line.get('description_a', ''),
                     'Description B': line.get('description_b', ''),
                 })
-            
-            result_df = pd.DataFrame(result_data)
-            
+            yield pd.DataFrame(result_data)
+    
+    def _generate_result_file(self, analysis_lines, output_path):
+        """Generate result Excel file"""
+        try:
             # آمار خلاصه
             summary_data = {
                 'Metric': ['Total Records', 'Matched Records', 'Mismatch Records', 'Missing in A', 'Missing in B'],
@@ -454,12 +761,13 @@ class StandaloneReconciliation:
             }
             summary_df = pd.DataFrame(summary_data)
             
-            # ایجاد فایل اکسل
-            with pd.ExcelWriter(output_path, engine='openpyxl') as writer:
-                result_df.to_excel(writer, sheet_name='Reconciliation Results', index=False)
-                summary_df.to_excel(writer, sheet_name='Summary', index=False)
+            # ایجاد فایل اکسل (ردیف‌های نتایج تکه‌به‌تکه نوشته می‌شوند)
+            with StreamingExcelWriter(output_path) as writer:
+                writer.write_sheet('Reconciliation Results', self._result_chunks(analysis_lines))
+                writer.write_sheet('Summary', summary_df)
             
             print(f"✅ فایل نتایج ایجاد شد: {output_path}")
+            print(f"   {writer.format_stats()}")
             
         except Exception as e:
             print(f"❌ خطا در تولید فایل نتایج: {str(e)}")
@@ -483,8 +791,15 @@ def main():
     parser.add_argument('file_a', help='مسیر فایل اکسل شرکت A')
     parser.add_argument('file_b', help='مسیر فایل اکسل شرکت B')
     parser.add_argument('-o', '--output', help='مسیر فایل خروجی (اختیاری)', default='reconciliation_results.xlsx')
+    parser.add_argument('--ingest-cache', help='مسیر پوشه حافظه نهان ورودی: شیت‌های پارس شده به صورت Parquet برای اجراهای بعدی نگه داشته می‌شوند (نیازمند pyarrow، اختیاری)', default=None)
+    parser.add_argument('--amount-tolerance', type=float, default=0.01,
+                        help='اختلاف نسبی مجاز مبلغ در تطبیق فازی (پیش‌فرض: 0.01 یعنی ±1%%)')
+    parser.add_argument('--amount-sign', choices=StandaloneReconciliation.AMOUNT_SIGN_MODES, default='same',
+                        help='مقایسه علامت مبالغ در تطبیق فازی: same، opposite (بدهکار در برابر بستانکار) یا absolute')
     
     args = parser.parse_args()
+    if args.ingest_cache:
+        configure_ingest_cache(args.ingest_cache)
     
     # بررسی وجود فایل‌ها
     if not os.path.exists(args.file_a):
@@ -496,7 +811,7 @@ def main():
         return
     
     # اجرای مغایرت‌گیری
-    reconciliation = StandaloneReconciliation()
+    reconciliation = StandaloneReconciliation(amount_tolerance=args.amount_tolerance, amount_sign=args.amount_sign)
     try:
         results = reconciliation.run_reconciliation(args.file_a, args.file_b, args.output)
         print(f"\n🎉 مغایرت‌گیری با موفقیت تکمیل شد!")
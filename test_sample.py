@@ -47,6 +47,915 @@ def test_extraction():
         print(f"   ✅ اطمینان: {result.confidence:.2f}")
 
 
+def test_pattern_registry():
+    """تست اولویت الگوهای کامپایل‌شده و بازسازی آنها پس از تغییر الگوها"""
+    print("\n\n🧩 تست موتور الگوهای کامپایل‌شده")
+    print("=" * 40)
+
+    from core.patterns import Patterns
+
+    # الگوی پراولویت‌تر برنده است حتی اگر دیرتر در متن آمده باشد
+    assert Patterns.extract_invoice_number("شماره 12 - صورت وضعیت 34") == ('34', 1.0)
+    currency, confidence = Patterns.extract_currency_info("100 یورو و 200 دلار نرخ 5")
+    assert (currency['amount'], currency['currency'], currency['rate'], confidence) == (200.0, 'دلار', 5.0, 1.0)
+    # مبلغ نامعتبر باعث رفتن به الگوی بعدی می‌شود
+    assert Patterns.extract_currency_info("1.2.3 یورو نرخ 5") == (None, 0.0)
+    assert Patterns.detect_document_type("Invoice 5 - Transfer") == ('صورت وضعیت', 0.7)
+
+    # الگوهای پیش‌فرض نوع سند (حتی با فاصله) کلمه ساده هستند و با trie بررسی می‌شوند؛ نتیجه همان مسیر regex است
+    registry = Patterns.registry()
+    assert registry.document_keywords is not None
+    for text in ["Invoice 5 - Transfer", "پرداخت صورت وضعیت 3 با چک", "سند متفرقه", "MISC", "تسعیر نرخ",
+                 "صورتوضعیت و مانده", "CHECK 12", "بدون نوع", ""]:
+        found = registry.document_type.search(text.lower())
+        expected = (registry.document_types[found[0]], registry.document_type_confidences[found[0]]) if found \
+            else ('سند متفرقه', 0.5)
+        assert Patterns.detect_document_type(text) == expected, text
+
+    class CustomPatterns(Patterns):
+        INVOICE_PATTERNS = [r'Bill\s*(\d+)']
+
+    version = CustomPatterns.version()
+    assert CustomPatterns.extract_invoice_number("Bill 7") == ('7', 0.8)
+    CustomPatterns.INVOICE_PATTERNS.insert(0, r'Ref\s*(\d+)')
+    assert CustomPatterns.version() != version
+    assert CustomPatterns.extract_invoice_number("Bill 7 Ref 9") == ('9', 0.8)
+    assert Patterns.extract_invoice_number("Ref 9") == (None, 0.0)
+
+    # ویرایش درجای یک الگو (بدون تغییر طول لیست) هم نسخه و نتایج نهان را به‌روز می‌کند
+    class EditedPatterns(Patterns):
+        COMPANY_PATTERNS = list(Patterns.COMPANY_PATTERNS)
+
+    extractor = SmartExtractor(cache_size=100)
+    extractor.patterns = EditedPatterns()
+    text = "پرداخت به شرکت ایران"
+    version = EditedPatterns.version()
+    assert extractor.extract_from_text(text).company_name == 'ایران'
+    assert extractor.extract_series(pd.Series([text]))['company_name'].tolist() == ['ایران']
+    EditedPatterns.COMPANY_PATTERNS[0] = 'زززز'
+    assert EditedPatterns.version() != version
+    assert EditedPatterns.extract_company(text) == (None, 0.0)
+    assert extractor.extract_from_text(text).company_name is None
+    assert extractor.extract_series(pd.Series([text]))['company_name'].isna().all()
+    assert Patterns.extract_company(text) == ('ایران', 0.9)
+
+    print("   ✅ اولویت و بازسازی الگوها درست است")
+
+
+def test_keyword_matcher():
+    """تست جستجوگر چندکلمه‌ای (leftmost-longest و اولویت فهرست)"""
+    print("\n\n🔤 تست جستجوگر کلمات کلیدی")
+    print("=" * 40)
+
+    from core.keyword_matcher import KeywordMatcher
+
+    keywords = ['ایران', 'ایران خودرو', 'خودرو', 'پترو ساحل']
+    text = "پرداخت به ایران خودرو و پترو ساحل"
+    # هر دو مسیر جستجو: خطی و trie
+    for limit in (KeywordMatcher.LINEAR_SCAN_LIMIT, 0):
+        matcher = KeywordMatcher(keywords)
+        matcher.LINEAR_SCAN_LIMIT = limit
+        assert matcher.find_all(text) == [(10, 21, 1), (24, 33, 3)]
+        # کلمه پراولویت‌تر حتی داخل کلمه طولانی‌تر پیدا می‌شود
+        assert matcher.first_by_priority(text) == 0
+        assert matcher.first_by_priority("خودرو و پترو ساحل") == 2
+        assert matcher.first_by_priority("بدون نام") is None
+
+    matcher = KeywordMatcher(['Invoice', 'چک'], ignore_case=True)
+    assert matcher.search("pay INVOICE 5") == (4, 11, 0)
+    assert matcher.contains_any("چک 12") and not matcher.contains_any("")
+
+    print("   ✅ جستجوگر کلمات کلیدی درست کار می‌کند")
+
+
+def test_extract_series():
+    """تست یکسان بودن استخراج ستونی با استخراج ردیفی"""
+    print("\n\n📐 تست استخراج ستونی")
+    print("=" * 40)
+
+    extractor = SmartExtractor()
+    texts = [
+        "صورت وضعیت شماره 1234 - پرداخت از شرکت ایران - مبلغ 1000 یورو با نرخ 50000",
+        "Invoice #999 - Payment to Iratec - 1500 EUR at rate 55000",
+        "1.2.3 یورو نرخ 5 و 7 دلار",
+        "سند متفرقه",
+        "",
+        "nan",
+    ]
+    series = pd.Series(texts, index=[10, 3, 7, 7, 1, 0])
+    extracted = extractor.extract_series(series)
+    assert list(extracted.index) == [10, 3, 7, 7, 1, 0]
+
+    for text, (_, row) in zip(texts, extracted.iterrows()):
+        expected = extractor.extract_from_description_column([text])[0]
+        for key, value in row.items():
+            if pd.isna(expected[key]):
+                assert pd.isna(value), (text, key)
+            else:
+                assert value == expected[key], (text, key, value, expected[key])
+
+    # استخراج روی مقادیر یکتا و پخش نتایج
+    from core.vectorized import extract_unique
+    repeated = pd.Series(texts * 3)
+    broadcast, stats = extract_unique(repeated, extractor.extract_series)
+    assert (stats['rows'], stats['unique']) == (18, 6)
+    pd.testing.assert_frame_equal(broadcast, extractor.extract_series(repeated))
+
+    print("   ✅ نتایج استخراج ستونی و ردیفی یکسان است")
+
+
+def test_extraction_cache():
+    """تست حافظه نهان LRU نتایج استخراج"""
+    print("\n\n🗃️ تست حافظه نهان استخراج")
+    print("=" * 40)
+
+    from core.patterns import Patterns
+
+    extractor = SmartExtractor(cache_size=2)
+    first = extractor.extract_from_text("تسعیر ارز 2000 دلار با نرخ 300000")
+    second = extractor.extract_from_text("تسعیر ارز 2000 دلار با نرخ 300000")
+    assert second == first and second is not first
+    extractor.extract_from_text("چک شماره 5678")
+    extractor.extract_from_text("انتقال از حساب جاری")
+    assert extractor.cache_info() == {'hits': 1, 'misses': 3, 'evictions': 1, 'size': 2, 'max_size': 2}
+
+    # تغییر الگوها حافظه نهان را باطل می‌کند
+    Patterns.COMPANY_PATTERNS.append('حساب جاری')
+    try:
+        assert extractor.extract_from_text("انتقال از حساب جاری").company_name == 'حساب جاری'
+    finally:
+        Patterns.COMPANY_PATTERNS.remove('حساب جاری')
+    assert extractor.extract_from_text("انتقال از حساب جاری").company_name is None
+    assert extractor.cache_info()['hits'] == 1
+
+    print("   ✅ حافظه نهان و باطل‌سازی آن درست کار می‌کند")
+
+
+def test_parallel_batch():
+    """تست اجرای موازی extract_batch (ترتیب و شمارنده‌ها)"""
+    print("\n\n⚙️ تست استخراج موازی")
+    print("=" * 40)
+
+    texts = ["چک شماره 5678 - مبلغ 5000000 ریال", "", "Invoice #999 - 1500 EUR at rate 55000", "سند متفرقه"] * 5
+    serial = SmartExtractor().extract_batch(texts)
+    parallel = SmartExtractor(parallel_threshold=0).extract_batch(texts, workers=2, chunksize=3)
+    assert parallel.results == serial.results
+    assert (parallel.total_records, parallel.successful_extractions, parallel.failed_extractions) == \
+        (serial.total_records, serial.successful_extractions, serial.failed_extractions)
+
+    print("   ✅ نتایج موازی و سریال یکسان است")
+
+
+def test_iter_extract():
+    """تست استخراج جریانی و خلاصه در حال اجرا"""
+    print("\n\n🌊 تست استخراج جریانی")
+    print("=" * 40)
+
+    from core.models import ExtractionSummary
+
+    extractor = SmartExtractor()
+    texts = ["تسعیر ارز 2000 دلار با نرخ 300000", "", "سند متفرقه", "Invoice #5 - Iratec"]
+
+    # نتایج یکی‌یکی و فقط هنگام درخواست تولید می‌شوند
+    summary = ExtractionSummary()
+    stream = extractor.iter_extract(iter(texts), summary)
+    first = next(stream)
+    assert first.invoice_number is None and summary.total_records == 1
+    rest = list(stream)
+
+    batch = extractor.extract_batch(texts)
+    assert [first] + rest == batch.results
+    assert extractor.get_extraction_summary(summary) == extractor.get_extraction_summary(batch)
+
+    print("   ✅ خلاصه جریانی با خلاصه دسته‌ای یکسان است")
+
+
+def test_columnar_batch():
+    """تست نتیجه دسته‌ای ستونی"""
+    print("\n\n🧮 تست نتیجه ستونی")
+    print("=" * 40)
+
+    import numpy as np
+
+    extractor = SmartExtractor()
+    texts = ["تسعیر ارز 2000 دلار با نرخ 300000", "", "Invoice #5 - 10 EUR", "سند متفرقه"]
+    batch = extractor.extract_batch(texts)
+    columnar = extractor.extract_batch_columnar(texts)
+
+    # ردیف‌ها هنگام دسترسی به همان ExtractionResult تبدیل می‌شوند
+    assert list(columnar) == batch.results and columnar[-1] == batch.results[-1]
+    assert columnar.to_dict() == batch.to_dict()
+
+    df = columnar.to_dataframe()
+    assert np.shares_memory(df['currency_amount'].to_numpy(), columnar.currency_amount)
+    assert str(df['document_type'].dtype) == 'category'
+    assert df['currency_type'][0] == 'دلار' and df['currency_type'].isna().tolist() == [False, True, False, True]
+
+    print("   ✅ نتیجه ستونی با نتیجه دسته‌ای یکسان است")
+
+
+def test_field_selection():
+    """تست استخراج انتخابی فیلدها"""
+    print("\n\n🎯 تست استخراج انتخابی فیلدها")
+    print("=" * 40)
+
+    extractor = SmartExtractor()
+    text = "صورت وضعیت شماره 1234 - شرکت ایران - 1000 یورو با نرخ 50000"
+
+    invoice_only = extractor.extract_from_text(text, fields=['invoice_number'])
+    assert invoice_only.invoice_number == '1234' and invoice_only.confidence == 1.0
+    assert invoice_only.currency_info is None and invoice_only.document_type is None
+
+    currency_only = extractor.extract_batch([text], fields='currency_info').results[0]
+    assert currency_only.currency_info == extractor.extract_from_text(text).currency_info
+    assert currency_only.invoice_number is None
+
+    extracted = extractor.extract_series(pd.Series([text, "چک 5"]), fields=['invoice_number', 'company_name'])
+    assert list(extracted.columns) == ['invoice_number', 'company_name', 'extraction_confidence']
+    assert extracted['company_name'].tolist() == ['ایران', None]
+
+    try:
+        extractor.extract_from_text(text, fields=['amount'])
+        assert False, "فیلد نامعتبر باید خطا بدهد"
+    except ValueError:
+        pass
+
+    print("   ✅ فقط فیلدهای انتخاب‌شده استخراج می‌شوند")
+
+
+def test_persistent_cache():
+    """تست حافظه نهان ماندگار SQLite"""
+    print("\n\n💾 تست حافظه نهان ماندگار")
+    print("=" * 40)
+
+    import tempfile
+    from core.persistent_cache import PersistentExtractionCache
+
+    texts = pd.Series([
+        "صورت وضعیت شماره 1234 - شرکت ایران - 1000 یورو با نرخ 50000",
+        "Invoice #999 - 1500 EUR at rate 55000",
+        "سند متفرقه",
+        "",
+    ])
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'cache.db')
+        expected = SmartExtractor().extract_series(texts)
+
+        with PersistentExtractionCache(path) as cache:
+            cold = SmartExtractor(persistent_cache=cache).extract_series(texts)
+            pd.testing.assert_frame_equal(cold, expected)
+            assert cache.stats()['misses'] == 3 and len(cache) == 3
+
+        # اجرای دوم با اتصال جدید فقط از حافظه نهان خوانده می‌شود
+        with PersistentExtractionCache(path) as cache:
+            extractor = SmartExtractor(persistent_cache=cache)
+            pd.testing.assert_frame_equal(extractor.extract_series(texts), expected)
+            assert cache.stats()['hits'] == 3 and cache.stats()['misses'] == 0
+
+            # فیلدهای انتخاب‌شده فضای نام جداگانه دارند
+            invoice_only = extractor.extract_series(texts, fields=['invoice_number'])
+            assert invoice_only['invoice_number'].tolist() == expected['invoice_number'].tolist()
+            assert cache.stats()['misses'] == 3
+
+        with PersistentExtractionCache(path, max_entries=10) as cache:
+            cache.set_many({cache.make_key('test', str(i)): {'value': i} for i in range(20)})
+            assert len(cache) <= 10
+
+    print("   ✅ نتایج از حافظه نهان بین اجراها یکسان هستند")
+
+
+def test_read_sheets():
+    """تست خواندن فایل چندشیتی با یک بار باز کردن"""
+    print("\n\n📚 تست خواندن شیت‌ها")
+    print("=" * 40)
+
+    import tempfile
+    from utils.excel_reader import read_sheets
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'sheets.xlsx')
+        with pd.ExcelWriter(path, engine='openpyxl') as writer:
+            for index in range(5):
+                pd.DataFrame({'شرح': [f'سند {index}-{row}' for row in range(3)], 'مبلغ': [index] * 3}) \
+                    .to_excel(writer, sheet_name=f'شیت{index}', index=False)
+
+        expected = pd.read_excel(path, sheet_name=None)
+        for workers in (1, 2):
+            sheets = read_sheets(path, workers=workers, parallel_threshold=2)
+            assert list(sheets) == list(expected)
+            for name in expected:
+                pd.testing.assert_frame_equal(sheets[name], expected[name])
+
+        combined = ExcelProcessor().read_excel_file(path)
+        assert len(combined) == 15 and combined['sheet_name'].iloc[-1] == 'شیت4'
+
+        # سرستون تابعی: تشخیص از ردیف‌های پیش‌نمایش و یک بار پارس هر شیت
+        previews = []
+        def detect(rows):
+            previews.append(rows)
+            return 1
+        for workers in (1, 2):
+            previews.clear()
+            sheets = read_sheets(path, workers=workers, parallel_threshold=2, header=detect)
+            assert len(previews) == 5 and previews[0][0] == ('شرح', 'مبلغ')
+            for name in expected:
+                pd.testing.assert_frame_equal(sheets[name], pd.read_excel(path, sheet_name=name, header=1))
+
+    print("   ✅ شیت‌ها به ترتیب و بدون تغییر خوانده می‌شوند")
+
+
+def test_ingest_cache():
+    """تست حافظه نهان ورودی شیت‌های پارس شده"""
+    print("\n\n🗃️ تست حافظه نهان ورودی")
+    print("=" * 40)
+
+    import importlib.util
+    import tempfile
+    from utils.excel_reader import read_sheets
+    from utils.ingest_cache import IngestCache
+
+    # حافظه نهان فقط Parquet می‌نویسد (بدون pickle) و بدون pyarrow ساخته نمی‌شود
+    if not importlib.util.find_spec('pyarrow'):
+        try:
+            IngestCache(tempfile.gettempdir())
+        except ImportError:
+            print("   ✅ بدون pyarrow حافظه نهان با پیام روشن غیرفعال است")
+            return
+        raise AssertionError("IngestCache بدون pyarrow ساخته شد")
+
+    def write_workbook(path, amount):
+        with pd.ExcelWriter(path, engine='openpyxl') as writer:
+            pd.DataFrame({'شرح': ['الف', None, 'ج'], 'مبلغ': [amount, 2.5, 3]}).to_excel(
+                writer, sheet_name='ساده', index=False)
+            # ستون با انواع مختلط که برای Parquet به متن تبدیل می‌شود
+            pd.DataFrame({'ردیف': [1, 'دو', None]}).to_excel(writer, sheet_name='مختلط', index=False)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'ledger.xlsx')
+        write_workbook(path, 1)
+        cache = IngestCache(os.path.join(directory, 'cache'))
+
+        for header in (0, None):
+            expected = pd.read_excel(path, sheet_name=None, header=header)
+            # header=None: نام ستون‌ها عدد است و ستون‌های شیت ساده هم مختلط می‌شوند
+            expected = {name: df.apply(lambda column: column.map(
+                lambda value: value if pd.isna(value) or isinstance(value, str) else str(value)).astype(object)
+                if column.dtype == object and column.dropna().map(type).nunique() > 1 else column)
+                for name, df in expected.items()}
+            cold = read_sheets(path, cache=cache, header=header)
+            warm = read_sheets(path, cache=cache, header=header)
+            assert list(warm) == list(expected)
+            for name in expected:
+                pd.testing.assert_frame_equal(cold[name], expected[name])
+                pd.testing.assert_frame_equal(warm[name], expected[name])
+        assert cache.stats()['hits'] == 4 and cache.stats()['misses'] == 4
+        mixed = read_sheets(path, sheet_name='مختلط', cache=cache, header=0)['مختلط']
+        assert mixed['ردیف'].tolist() == ['1', 'دو']
+        assert cache.stats()['hits'] == 5
+        assert not any(name.endswith('.pkl') for name in os.listdir(cache.directory))
+
+        # header تابعی با نام یکسان اما وضعیت متفاوت (مانند دو ترکیب‌کننده با کلمات کلیدی متفاوت):
+        # کلید، ردیف سرستونی است که هر شیت واقعاً به آن رسیده است
+        def fixed_header(row):
+            return lambda rows: row
+
+        for row in (0, 1, 0):
+            sheets = read_sheets(path, sheet_name='ساده', cache=cache, header=fixed_header(row))
+            pd.testing.assert_frame_equal(sheets['ساده'], pd.read_excel(path, sheet_name='ساده', header=row))
+        assert cache.stats()['hits'] == 7 and cache.stats()['misses'] == 5
+
+        # تغییر فایل ورودی مدخل‌های قبلی را بی‌اعتبار می‌کند
+        write_workbook(path, 100)
+        assert read_sheets(path, cache=cache)['ساده']['مبلغ'].iloc[0] == 100
+        assert cache.stats()['misses'] == 7
+
+        # محدودیت حجم
+        cache.max_bytes = 0
+        assert cache.evict() > 0 and cache.stats()['entries'] == 0
+        # فهرست شیت‌های هر فایل هم جزو مدخل‌ها است و حذف می‌شود
+        assert os.listdir(cache.directory) == []
+
+    print("   ✅ شیت‌ها یک بار پارس و بدون تغییر از حافظه نهان بارگذاری می‌شوند")
+
+
+def test_chunked_processing():
+    """تست خواندن و پردازش جریانی تکه‌تکه"""
+    print("\n\n📦 تست پردازش جریانی")
+    print("=" * 40)
+
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'ledger.xlsx')
+        with pd.ExcelWriter(path, engine='openpyxl') as writer:
+            for index in range(2):
+                pd.DataFrame({
+                    'شرح': [f"صورت وضعیت شماره {index}{row} - 100 یورو با نرخ 50000" for row in range(7)],
+                    'مبلغ': range(7),
+                }).to_excel(writer, sheet_name=f'شیت{index}', index=False)
+
+        processor = ExcelProcessor()
+        chunks = list(processor.iter_excel_chunks(path, chunk_size=3))
+        assert [len(chunk) for chunk in chunks] == [3, 3, 1, 3, 3, 1]
+        combined = processor.read_excel_file(path)
+        assert combined['sheet_name'].dtype == 'category'
+        pd.testing.assert_frame_equal(pd.concat(chunks), combined.astype({'sheet_name': object}))
+
+        cwd = os.getcwd()
+        os.chdir(directory)
+        try:
+            full_output = processor.process_excel_file(path, '_full')
+            chunked_output = processor.process_excel_file(path, '_chunked', chunk_size=3)
+            pd.testing.assert_frame_equal(pd.read_excel(chunked_output), pd.read_excel(full_output))
+            summary = processor.get_chunked_processing_summary(processor.iter_excel_chunks(chunked_output, 4))
+            assert summary == processor.get_processing_summary(pd.read_excel(full_output))
+        finally:
+            os.chdir(cwd)
+
+    print("   ✅ خروجی پردازش جریانی با پردازش کامل یکسان است")
+
+
+def test_integration_pipeline():
+    """تست خط لوله درون‌حافظه‌ای all_integration"""
+    print("\n\n🔗 تست خط لوله یکپارچه")
+    print("=" * 40)
+
+    import tempfile
+    from simple_standalone import process_all_integration
+    from utils.pipeline import Pipeline
+
+    pipeline = Pipeline().add_stage('دو برابر', lambda value: value * 2).add_stage('یک', lambda value: value + 1)
+    assert pipeline.run(5) == 11 and list(pipeline.timings) == ['دو برابر', 'یک']
+    assert Pipeline([('خطا', lambda value: None), ('بعدی', lambda value: 1 / 0)]).run(5) is None
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'ledger.xlsx')
+        with pd.ExcelWriter(path, engine='openpyxl') as writer:
+            for index in range(2):
+                pd.DataFrame({
+                    'شرح سند': [f"صورت وضعیت شماره {index}{row} - 100 یورو با نرخ 50000" for row in range(4)],
+                    'بدهكار - ريالي': range(4),
+                }).to_excel(writer, sheet_name=f'شیت{index}', index=False)
+
+        cwd = os.getcwd()
+        os.chdir(directory)
+        try:
+            output = process_all_integration(path, '_all')
+            # بدون فایل موقت ترکیب
+            assert sorted(os.listdir(directory)) == ['ledger.xlsx', 'ledger_all.xlsx'] and output == 'ledger_all.xlsx'
+            result = pd.read_excel(output)
+            assert len(result) == 8 and result['نام_شیت'].tolist()[-1] == 'شیت1'
+            assert result['شماره_وضعیت'].tolist()[:2] == [0, 1]
+        finally:
+            os.chdir(cwd)
+
+    print("   ✅ ترکیب، استخراج و نوشتن بدون فایل موقت انجام می‌شود")
+
+
+def test_layout_registry():
+    """تست ثبت چیدمان خروجی‌های تکراری ERP"""
+    print("\n\n🧭 تست ثبت چیدمان")
+    print("=" * 40)
+
+    import tempfile
+    from simple_standalone import ExcelSheetCombiner, SimpleSmartExtractor
+    from utils.layout_registry import LayoutRegistry
+
+    def write_workbook(path, rows):
+        with pd.ExcelWriter(path, engine='openpyxl') as writer:
+            # ردیف عنوان بالای سرستون و ستون کم‌داده
+            frame = pd.DataFrame({
+                'شرح سند': [f'سند {row}' for row in range(rows)],
+                'شماره سند': range(rows),
+                'ملاحظات': [None] * rows,
+            })
+            frame.to_excel(writer, sheet_name='دفتر', index=False, startrow=1)
+            writer.sheets['دفتر'].cell(row=1, column=1, value='گزارش دفتر')
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'ledger.xlsx')
+        registry_path = os.path.join(directory, 'layouts.json')
+        write_workbook(path, 4)
+
+        def run(registry):
+            combiner = ExcelSheetCombiner(layout_registry=registry)
+            df = combiner.prune_columns(combiner.read_combined(path))
+            return SimpleSmartExtractor(layout_registry=registry).enrich(df)
+
+        expected = run(None)
+        first = LayoutRegistry(registry_path)
+        pd.testing.assert_frame_equal(run(first), expected)
+        assert first.stats()['hits'] == 0 and len(first) == 3
+
+        # ماه بعد: همان قالب با داده متفاوت؛ تشخیص و تحلیل انجام نمی‌شود
+        write_workbook(path, 6)
+        second = LayoutRegistry(registry_path)
+        detected = []
+        combiner = ExcelSheetCombiner(layout_registry=second)
+        combiner.detect_header_row = lambda rows: detected.append(rows) or 0
+        combiner.select_columns = lambda *args, **kwargs: 1 / 0
+        df = SimpleSmartExtractor(layout_registry=second).enrich(combiner.prune_columns(combiner.read_combined(path)))
+        assert not detected and second.stats() == {'hits': 3, 'misses': 0, 'layouts': 3}
+        assert list(df.columns) == list(expected.columns) and len(df) == 6
+        assert 'ملاحظات' not in df.columns and df['description'].iloc[-1] == 'سند 5'
+
+        # ترکیب جریانی همان چیدمان ثبت شده را با همان ترتیب ستون‌ها به کار می‌برد
+        cwd = os.getcwd()
+        os.chdir(directory)
+        try:
+            combined = combiner.prune_columns(combiner.read_combined(path))
+            output = combiner.combine_sheets(path, '_chunked', chunk_size=2)
+            assert output is not None and second.stats()['misses'] == 0 and len(second) == 3
+            assert list(pd.read_excel(output).columns) == list(combined.columns)
+
+            # و چیدمان تازه را مانند ترکیب در حافظه ثبت می‌کند
+            third = LayoutRegistry(os.path.join(directory, 'chunked.json'))
+            assert ExcelSheetCombiner(layout_registry=third).combine_sheets(path, '_chunked', chunk_size=2)
+            assert len(third) == 2 and third.stats()['misses'] > 0
+        finally:
+            os.chdir(cwd)
+
+    print("   ✅ چیدمان‌های شناخته شده بدون تشخیص دوباره پردازش می‌شوند")
+
+
+def test_column_pushdown():
+    """تست انتخاب ستون و نوع داده در زمان خواندن شیت‌ها"""
+    print("\n\n🧮 تست خواندن ستون‌های انتخاب‌شده")
+    print("=" * 40)
+
+    import pickle
+    import tempfile
+    from simple_standalone import ExcelSheetCombiner
+    from utils.excel_reader import ColumnFilter, read_sheets
+
+    column_filter = ColumnFilter(exclude=['چاپ سند'], exclude_prefixes=('Unnamed',))
+    assert column_filter('شرح سند') and not column_filter('چاپ سند') and not column_filter('Unnamed: 3')
+    assert repr(pickle.loads(pickle.dumps(column_filter))) == repr(column_filter)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'ledger.xlsx')
+        with pd.ExcelWriter(path, engine='openpyxl') as writer:
+            for index in range(2):
+                pd.DataFrame({
+                    'شرح سند': [f'سند {index}-{row}' for row in range(6)],
+                    'بدهكار - ريالي': range(6),
+                    'مانده بدهکار': range(6),
+                    'معادل ریالی مانده بدهکار': range(6),
+                    'نوع ارز': ['یورو', 'ریال'] * 3,
+                    'چاپ سند': [True] * 6,
+                }).to_excel(writer, sheet_name=f'شیت{index}', index=False)
+
+        sheets = read_sheets(path, workers=2, parallel_threshold=2, usecols=column_filter)
+        assert all('چاپ سند' not in df.columns and len(df.columns) == 5 for df in sheets.values())
+
+        combiner = ExcelSheetCombiner()
+        combined = combiner.read_combined(path)
+        assert 'چاپ سند' not in combined.columns and len(combined) == 12
+        assert combined['بدهكار - ريالي'].dtype == 'float64' and combined['بدهكار - ريالي'].sum() == 30
+        assert combined['نوع ارز'].dtype == 'category' and combined['شرح سند'].dtype == object
+
+        # ستون حسابرسی عضو گروه تکراری خوانده می‌شود تا انتخاب ستون گروه تغییر نکند
+        pruned = combiner.prune_columns(combined)
+        assert 'مانده بدهکار' not in pruned.columns and 'معادل ریالی مانده بدهکار' not in pruned.columns
+        assert combined.memory_usage(deep=True).sum() < pd.concat(pd.read_excel(path, sheet_name=None)).memory_usage(deep=True).sum()
+
+    print("   ✅ ستون‌های حذفی خوانده نمی‌شوند و مبالغ float64 و متن‌های کم‌تنوع categorical هستند")
+
+
+def test_sheet_union():
+    """تست ترکیب شیت‌های ناهمگون با طرح اجتماع ستون‌ها"""
+    print("\n\n🧩 تست ترکیب شیت‌های ناهمگون")
+    print("=" * 40)
+
+    import tempfile
+    from simple_standalone import ExcelSheetCombiner
+    from utils.pipeline import Pipeline
+    from utils.sheet_union import concat_sheets, union_columns
+
+    frames = {
+        'الف': pd.DataFrame({'شرح': ['x', 'y'], 'مبلغ': [1, 2], 'تایید': [True, False]}),
+        'خالی': pd.DataFrame({'شرح': []}),
+        'ب': pd.DataFrame({'مبلغ': [3.5], 'شرح': ['z'], 'کد': ['k']}),
+    }
+    assert union_columns(frames.values(), 'sheet_name') == ['شرح', 'مبلغ', 'تایید', 'sheet_name', 'کد']
+    expected = pd.concat([df.assign(sheet_name=name) for name, df in frames.items()], ignore_index=True)
+    combined = concat_sheets(frames, 'sheet_name')
+    assert combined['sheet_name'].dtype == 'category' and list(combined['sheet_name'].cat.categories) == ['الف', 'ب']
+    pd.testing.assert_frame_equal(combined.astype({'sheet_name': object}), expected)
+    assert list(concat_sheets(frames, 'sheet_name', ['مبلغ', 'sheet_name']).columns) == ['مبلغ', 'sheet_name']
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'ledger.xlsx')
+        with pd.ExcelWriter(path, engine='openpyxl') as writer:
+            for index in range(3):
+                pd.DataFrame({
+                    'شرح سند': [f'سند {index}-{row}' for row in range(20)],
+                    'بدهكار - ريالي': range(20),
+                    f'یادداشت {index}': [f'متن {row}' for row in range(20)],
+                }).to_excel(writer, sheet_name=f'شیت{index}', index=False)
+
+        combiner = ExcelSheetCombiner()
+        expected = combiner.prune_columns(combiner.read_combined(path))
+        pipeline = Pipeline([
+            ('خواندن شیت‌ها', combiner.read_sheet_frames),
+            ('انتخاب ستون‌ها', combiner.select_sheet_columns),
+            ('ترکیب شیت‌ها', combiner.concat_selected),
+        ], track_memory=True)
+        df = pipeline.run(path)
+        # ستون‌های یادداشت هر شیت (یک‌سوم داده) پیش از ترکیب کنار گذاشته نمی‌شوند
+        pd.testing.assert_frame_equal(df, expected[df.columns])
+        assert sorted(df.columns) == sorted(expected.columns) and len(df) == 60
+        assert df[combiner.sheet_name_column].dtype == 'category'
+        assert all(peak > 0 for peak in pipeline.peak_allocated.values()) and 'MB' in pipeline.format_timings()
+
+    print("   ✅ ستون‌ها پیش از ترکیب انتخاب می‌شوند و نام شیت categorical است")
+
+
+def test_exact_matching():
+    """تست تطبیق دقیق مغایرت‌گیری با اتصال درهم‌سازی"""
+    print("\n\n🔗 تست تطبیق دقیق مغایرت‌گیری")
+    print("=" * 40)
+
+    import numpy as np
+    from standalone_reconciliation import StandaloneReconciliation
+
+    reconciliation = StandaloneReconciliation()
+
+    def nested(df_a, df_b):
+        matches = []
+        used_b = set()
+        for _, row_a in df_a.iterrows():
+            description_a = str(row_a.get('description', ''))
+            amount_a = reconciliation._convert_to_float(row_a.get('amount', 0))
+            invoice_number = reconciliation.extract_invoice_number(description_a)
+            for position_b, (_, row_b) in enumerate(df_b.iterrows() if invoice_number else ()):
+                amount_b = reconciliation._convert_to_float(row_b.get('amount', 0))
+                if (position_b not in used_b
+                        and reconciliation.extract_invoice_number(str(row_b.get('description', ''))) == invoice_number
+                        and abs(amount_a - amount_b) < 0.01):
+                    used_b.add(position_b)
+                    matches.append((description_a, amount_a, str(row_b['description']), amount_b))
+                    break
+        return matches
+
+    df_a = pd.DataFrame({
+        'description': ['صورت وضعیت 12', 'صورت وضعیت 12', 'صورت وضعیت 7', 'شماره 9', 'صورت وضعیت 5', None, 'صورت وضعیت 8'],
+        'amount': [100.004, 100.0, 250.0, float('nan'), 40.0, 1.0, 99.995],
+    })
+    df_b = pd.DataFrame({
+        'description': ['ش. و. 12', 'صورت وضعیت 12', 'صورت وضعیت 7', 'شماره 9', 'صورت وضعیت 5', 'nan', 'صورت وضعیت 8'],
+        'amount': ['100.5', 100.013, '۲۵۰', float('nan'), '40.009', 1.0, 100.004],
+    })
+    matches = reconciliation._find_exact_matches(df_a, df_b)
+    found = [(m['description_a'], m['amount_a'], m['description_b'], m['amount_b']) for m in matches]
+    assert found == nested(df_a, df_b) and len(found) == 4
+    assert matches[0]['statement_number'] == 'INV12' and matches[0]['match_type'] == 'exact'
+
+    # هر ردیف B یک بار تطبیق می‌خورد: ردیف سوم A بدون تطبیق می‌ماند؛ بدون ستون مبلغ همه مبالغ صفر هستند
+    df_a = pd.DataFrame({'description': ['صورت وضعیت 3'] * 3})
+    df_b = pd.DataFrame({'description': ['صورت وضعیت 4', 'صورت وضعیت 3', 'صورت وضعیت 3']})
+    matched_a, matched_b = np.zeros(3, dtype=bool), np.zeros(3, dtype=bool)
+    matches = reconciliation._find_exact_matches(df_a, df_b, matched_a, matched_b)
+    assert [m['description_b'] for m in matches] == ['صورت وضعیت 3'] * 2 and len(nested(df_a, df_b)) == 2
+    assert matched_a.tolist() == [True, True, False] and matched_b.tolist() == [False, True, True]
+
+    # ردیف‌هایی که در ماسک علامت خورده‌اند دوباره تطبیق نمی‌خورند
+    matched_b[:] = [False, True, False]
+    matched_a[:] = False
+    assert len(reconciliation._find_exact_matches(df_a, df_b, matched_a, matched_b)) == 1
+    assert matched_a.tolist() == [True, False, False] and matched_b.tolist() == [False, True, True]
+
+    print("   ✅ اتصال درهم‌سازی همان تطبیق یک‌به‌یک حلقه تودرتو را می‌دهد")
+
+
+def test_fuzzy_matching():
+    """تست نامزدهای تطبیق فازی با شاخص معکوس کلمه‌ها"""
+    print("\n\n🔎 تست تطبیق فازی مغایرت‌گیری")
+    print("=" * 40)
+
+    import random
+    import numpy as np
+    from standalone_reconciliation import StandaloneReconciliation
+
+    reconciliation = StandaloneReconciliation()
+
+    def brute_force(df_a, df_b):
+        # امتیاز همه جفت‌ها و تخصیص حریصانه بهترین جفت‌ها، هر ردیف یک بار
+        rows_a = [(idx_a, str(row['description']), reconciliation._convert_to_float(row['amount']))
+                  for idx_a, row in df_a.iterrows()]
+        rows_b = [(str(row['description']), reconciliation._convert_to_float(row['amount'])) for _, row in df_b.iterrows()]
+        scored = []
+        for position_a, (_, description_a, amount_a) in enumerate(rows_a):
+            for position_b, (description_b, amount_b) in enumerate(rows_b):
+                total_score = (reconciliation._calculate_similarity(description_a, description_b) * 0.7 +
+                               (100.0 if abs(amount_a - amount_b) / max(amount_a, 1) < 0.01 else 0) * 0.3)
+                if total_score > 70:
+                    scored.append((-total_score, position_a, position_b))
+        assigned_a, assigned_b, assignment = set(), set(), []
+        for negative_score, position_a, position_b in sorted(scored):
+            if position_a not in assigned_a and position_b not in assigned_b:
+                assigned_a.add(position_a)
+                assigned_b.add(position_b)
+                assignment.append((position_a, position_b, -negative_score))
+        return [(f"FUZZY{rows_a[position_a][0]}", rows_a[position_a][1]) + rows_b[position_b] + (score,)
+                for position_a, position_b, score in sorted(assignment)]
+
+    # کلمه‌های پرتکرار (صورت، وضعیت، پرداخت) در بیشتر شرح‌ها هستند
+    generator = random.Random(7)
+    words = ['صورت', 'وضعیت', 'پرداخت', 'شرکت', 'الف', 'ب', 'یورو', 'EURO', 'Euro'] + [f'P{index}' for index in range(12)]
+
+    def description():
+        return ' '.join(['صورت', 'وضعیت'][:generator.randint(0, 2)] + generator.sample(words, generator.randint(0, 4)))
+
+    df_a = pd.DataFrame({'description': [description() for _ in range(80)] + [None],
+                         'amount': [generator.choice([100.0, 500.0, 0.5]) for _ in range(81)]},
+                        index=range(10, 91))
+    df_b = pd.DataFrame({'description': [description() for _ in range(80)] + ['nan'],
+                         'amount': [generator.choice(['100.5', 500.0, 0.5, '۵۰۰']) for _ in range(81)]})
+    matches = reconciliation._find_fuzzy_matches(df_a, df_b)
+    found = [(m['statement_number'], m['description_a'], m['description_b'], m['amount_b'], m['similarity_score'])
+             for m in matches]
+    assert found == brute_force(df_a, df_b) and len(found) > 10
+    stats = reconciliation.fuzzy_stats
+    assert stats['pairs'] == 81 * 81 and 0 < stats['candidates'] < stats['pairs'] and stats['pruned_ratio'] > 0.5
+    assert len({m['description_b'] for m in matches}) <= len(found)
+
+    # تخصیص سراسری: جفت با امتیاز بالاتر ردیف B را می‌گیرد حتی اگر ردیف A آن دیرتر بیاید؛
+    # ردیف‌های تطبیق شده مرحله قبل کنار گذاشته می‌شوند
+    df_a = pd.DataFrame({'description': ['پرداخت پیمانکار الف پروژه', 'پرداخت پیمانکار الف'], 'amount': [100.0, 100.0]})
+    df_b = pd.DataFrame({'description': ['پرداخت پیمانکار الف', 'پرداخت پیمانکار الف پروژه ب'], 'amount': [100.0, 100.0]})
+    matches = reconciliation._find_fuzzy_matches(df_a, df_b)
+    assert [(m['statement_number'], m['description_b']) for m in matches] == [
+        ('FUZZY0', 'پرداخت پیمانکار الف پروژه ب'), ('FUZZY1', 'پرداخت پیمانکار الف')]
+    matched_a, matched_b = np.array([False, False]), np.array([True, False])
+    matches = reconciliation._find_fuzzy_matches(df_a, df_b, matched_a, matched_b)
+    assert [(m['statement_number'], m['description_b']) for m in matches] == [('FUZZY0', 'پرداخت پیمانکار الف پروژه ب')]
+    assert matched_a.tolist() == [True, False] and reconciliation.fuzzy_stats['pairs'] == 2
+
+    # پنجره مبلغ: بدهکار یک طرف بستانکار طرف دیگر است و اختلاف مجاز قابل تنظیم است
+    df_a = pd.DataFrame({'description': ['پرداخت پیمانکار الف', 'پرداخت پیمانکار ب'], 'amount': [1000.0, -250.0]})
+    df_b = pd.DataFrame({'description': ['پرداخت پیمانکار الف', 'پرداخت پیمانکار ب'], 'amount': [-1005.0, 250.0]})
+
+    def matched(**options):
+        return [m['description_b'] for m in StandaloneReconciliation(**options)._find_fuzzy_matches(df_a, df_b)]
+
+    assert matched() == []
+    assert matched(amount_sign='opposite') == ['پرداخت پیمانکار الف', 'پرداخت پیمانکار ب']
+    assert matched(amount_sign='absolute') == ['پرداخت پیمانکار الف', 'پرداخت پیمانکار ب']
+    assert matched(amount_sign='absolute', amount_tolerance=0.001) == ['پرداخت پیمانکار ب']
+    try:
+        StandaloneReconciliation(amount_sign='debit')
+        assert False, 'علامت نامعتبر باید خطا بدهد'
+    except ValueError:
+        pass
+
+    print(f"   ✅ {len(found)} تطبیق برابر با امتیازدهی همه جفت‌ها ({stats['pruned_ratio'] * 100:.0f}% جفت‌ها هرس شد)")
+
+
+def test_reconciliation_ledger():
+    """تست استخراج یک‌باره فیلدهای دفترها در مغایرت‌گیری"""
+    print("\n\n🧮 تست آماده‌سازی دفترهای مغایرت‌گیری")
+    print("=" * 40)
+
+    import numpy as np
+    from standalone_reconciliation import StandaloneReconciliation
+
+    reconciliation = StandaloneReconciliation()
+    df_a = pd.DataFrame({
+        'description': ['صورت وضعیت شماره 12 شرکت آرمان 100 یورو نرخ 50000', 'چک 445566 بابت اجاره',
+                        'واریز حقوق', None, 'صورت وضعیت شماره 12 شرکت آرمان 100 یورو نرخ 50000'],
+        'amount': [5000000, '1,200', 300.0, 7.0, 5000000],
+    }, index=[10, 11, 12, 13, 14])
+    df_b = pd.DataFrame({
+        'description': ['پرداخت صورت وضعیت شماره 12', 'چک 445566 بابت اجاره ماهانه', 'هزینه بانکی'],
+        'amount': [5000000.004, 1205.0, 15.0],
+    })
+
+    ledger_a = reconciliation._prepare_ledger(df_a)
+    assert reconciliation._prepare_ledger(ledger_a) is ledger_a
+    assert ledger_a.attrs['unique_descriptions'] == 4
+    assert list(ledger_a.index) == [10, 11, 12, 13, 14]
+    assert ledger_a['amount'].dtype == 'float64' and ledger_a['document_type'].dtype == 'category'
+    assert ledger_a['amount'].tolist() == [5000000.0, 1200.0, 300.0, 7.0, 5000000.0]
+    assert ledger_a.loc[10, 'invoice_number'] == '12' and ledger_a.loc[10, 'currency'] == 'یورو'
+    assert ledger_a.loc[10, 'foreign_amount'] == 100.0 and ledger_a.loc[10, 'exchange_rate'] == 50000.0
+    assert ledger_a.loc[11, 'check_number'] == '445566' and ledger_a.loc[13, 'description'] == 'None'
+
+    # پس از آماده‌سازی، مراحل تطبیق هیچ استخراج (عبارت منظم) دیگری اجرا نمی‌کنند
+    ledger_b = reconciliation._prepare_ledger(df_b)
+    empty_fields = reconciliation._empty_fields()
+    expected = {}
+    for name in ('extract_invoice_number', 'extract_check_number', 'extract_currency_info',
+                 'extract_company', 'detect_document_type', '_extract_smart_data'):
+        expected[name] = getattr(reconciliation, name)
+
+        def fail(*args, name=name):
+            raise AssertionError(f"{name} پس از آماده‌سازی دفتر فراخوانی شد")
+        setattr(reconciliation, name, fail)
+    reconciliation._empty_fields = lambda: empty_fields
+    matched_a, matched_b = np.zeros(len(ledger_a), dtype=bool), np.zeros(len(ledger_b), dtype=bool)
+    exact = reconciliation._find_exact_matches(ledger_a, ledger_b, matched_a, matched_b)
+    fuzzy = reconciliation._find_fuzzy_matches(ledger_a, ledger_b, matched_a, matched_b)
+    missing = reconciliation._find_missing_records(ledger_a, ledger_b, matched_a, matched_b)
+    for name, method in expected.items():
+        setattr(reconciliation, name, method)
+    del reconciliation._empty_fields
+
+    # فیلدهای هر سطر همان نتیجه _extract_smart_data روی دو شرح است
+    fields = ('invoice_number', 'check_number', 'currency', 'foreign_amount', 'exchange_rate',
+              'company_name', 'document_type')
+    # ردیف تکراری 14 در A همتای جدایی در B ندارد و با شناسه ردیف مفقود است
+    assert [m['statement_number'] for m in exact] == ['INV12']
+    assert [m['statement_number'] for m in fuzzy] == ['FUZZY11']
+    for record in exact + fuzzy + missing:
+        smart = reconciliation._extract_smart_data(record['description_a'], record['description_b'])
+        assert {field: record[field] for field in fields} == smart
+    assert [m['statement_number'] for m in missing] == ['MISSING_A2', 'MISSING_B12', 'MISSING_B13', 'MISSING_B14']
+    print(f"   ✅ {len(exact)} دقیق، {len(fuzzy)} فازی، {len(missing)} مفقود بدون استخراج دوباره")
+
+
+def test_streaming_writer():
+    """تست نویسنده جریانی اکسل"""
+    print("\n\n✍️ تست نویسنده جریانی اکسل")
+    print("=" * 40)
+
+    import tempfile
+    from utils.excel_writer import StreamingExcelWriter
+
+    df = pd.DataFrame({
+        'شرح': ['الف', 'ب', None, 'د', 'ه'],
+        'مبلغ': [1.5, None, 3.0, 4.0, 5.0],
+        'تعداد': [1, 2, 3, 4, 5],
+    })
+    with tempfile.TemporaryDirectory() as directory:
+        expected_path = os.path.join(directory, 'expected.xlsx')
+        path = os.path.join(directory, 'streamed.xlsx')
+        df.to_excel(expected_path, index=False)
+
+        chunks = (df.iloc[start:start + 2] for start in range(0, len(df), 2))
+        with StreamingExcelWriter(path) as writer:
+            assert writer.write_sheet('Sheet1', chunks) == 5
+            writer.write_sheet('خلاصه', pd.DataFrame({'آمار': ['کل'], 'مقدار': [5]}))
+        assert writer.stats()['rows'] == 6
+
+        pd.testing.assert_frame_equal(pd.read_excel(path), pd.read_excel(expected_path))
+        assert list(pd.read_excel(path, sheet_name=None)) == ['Sheet1', 'خلاصه']
+
+    print("   ✅ خروجی تکه‌تکه با to_excel یکسان است")
+
+
+def test_output_sinks():
+    """تست قالب‌های خروجی و نوع ستون‌های استخراج شده"""
+    print("\n\n🗂️ تست قالب‌های خروجی")
+    print("=" * 40)
+
+    import importlib.util
+    import tempfile
+    from utils.file_handler import FileHandler
+    from utils.output_sinks import open_output_sink
+
+    processor = ExcelProcessor()
+    enriched = processor.extract_and_enrich(pd.DataFrame({'description': [
+        'صورت وضعیت شماره 1001 - مبلغ 1,000 دلار',
+        'چک شماره 1234 - مبلغ 500,000 ریال',
+        'انتقال وجه به شرکت فولاد',
+    ]}), verbose=False)
+    assert enriched['مبلغ_ارزی'].dtype == 'float64'
+    assert enriched['نوع_ارز'].dtype == 'category'
+    assert enriched['نوع_سند'].dtype == 'category'
+    assert FileHandler.generate_output_filename('data.xlsx', '_extracted', 'parquet') == 'data_extracted.parquet'
+
+    formats = ['csv'] + (['parquet', 'feather'] if importlib.util.find_spec('pyarrow') else [])
+    chunks = [enriched.iloc[:1], enriched.iloc[1:]]
+    with tempfile.TemporaryDirectory() as directory:
+        for output_format in formats:
+            path = os.path.join(directory, f'out.{output_format}')
+            with open_output_sink(path) as sink:
+                assert sink.write(iter(chunks)) == 3
+            result = getattr(pd, f'read_{output_format}')(path)
+            assert list(result.columns) == list(enriched.columns)
+            assert result['نوع_سند'].astype(str).tolist() == enriched['نوع_سند'].astype(str).tolist()
+            if output_format != 'csv':
+                assert result['نوع_ارز'].dtype == 'category'
+            print(f"   ✅ {output_format}: {len(result)} ردیف")
+
+        # نوع ستون‌ها بین تکه‌های خوانده شده از اکسل تغییر می‌کند (int64 سپس float64 یا متن مختلط)
+        typed_chunks = [
+            pd.DataFrame({'بدهکار': [1, 2], 'سند': [1, 2]}),
+            pd.DataFrame({'بدهکار': [12.5, None], 'سند': ['A-0', 4]}, index=[2, 3]),
+            pd.DataFrame({'بدهکار': [5, 6], 'سند': [5, 6]}, index=[4, 5]),
+        ]
+        for output_format in formats:
+            path = os.path.join(directory, f'typed.{output_format}')
+            with open_output_sink(path) as sink:
+                assert sink.write(iter(typed_chunks)) == 6
+            result = getattr(pd, f'read_{output_format}')(path)
+            assert result['بدهکار'].dtype == 'float64'
+            assert result['بدهکار'].fillna(-1).tolist() == [1.0, 2.0, 12.5, -1, 5.0, 6.0]
+            assert result['سند'].astype(str).tolist() == ['1', '2', 'A-0', '4', '5', '6']
+        print(f"   ✅ تکه‌های با نوع ستون متفاوت: {', '.join(formats)}")
+
+
 def create_sample_excel():
     """ایجاد فایل اکسل نمونه برای تست"""
     print("\n\n📁 ایجاد فایل اکسل نمونه")
@@ -173,6 +1082,27 @@ if __name__ == "__main__":
     
     # اجرای تست‌ها
     test_extraction()
+    test_pattern_registry()
+    test_keyword_matcher()
+    test_extract_series()
+    test_extraction_cache()
+    test_parallel_batch()
+    test_iter_extract()
+    test_columnar_batch()
+    test_field_selection()
+    test_persistent_cache()
+    test_read_sheets()
+    test_ingest_cache()
+    test_chunked_processing()
+    test_integration_pipeline()
+    test_layout_registry()
+    test_column_pushdown()
+    test_sheet_union()
+    test_exact_matching()
+    test_fuzzy_matching()
+    test_reconciliation_ledger()
+    test_streaming_writer()
+    test_output_sinks()
     test_excel_processing()
     test_standalone_script()
     
@@ -4,5 +4,15 @@ Utility modules for Smart Extractor
 """
 
 from .file_handler import FileHandler
+from .excel_reader import ColumnFilter, iter_sheet_chunks, read_sheet_headers, read_sheets
+from .excel_writer import StreamingExcelWriter
+from .ingest_cache import IngestCache, configure_ingest_cache, get_ingest_cache
+from .layout_registry import LayoutRegistry, configure_layout_registry, get_layout_registry, layout_fingerprint
+from .output_sinks import OUTPUT_FORMATS, OutputSink, open_output_sink
+from .pipeline import Pipeline, peak_rss_mb
+from .sheet_union import concat_sheets, union_columns, union_dtypes
 
-__all__ = ['FileHandler']
+__all__ = ['ColumnFilter', 'FileHandler', 'IngestCache', 'LayoutRegistry', 'OUTPUT_FORMATS', 'OutputSink',
+           'Pipeline', 'StreamingExcelWriter', 'concat_sheets', 'configure_ingest_cache', 'configure_layout_registry',
+           'get_ingest_cache', 'get_layout_registry', 'iter_sheet_chunks', 'layout_fingerprint', 'open_output_sink',
+           'peak_rss_mb', 'read_sheet_headers', 'read_sheets', 'union_columns', 'union_dtypes']
@@ -0,0 +1,292 @@
+"""
+Multi-sheet Excel reader for Smart Extractor
+خواندن همه شیت‌های یک فایل اکسل با یک بار باز کردن و پردازش موازی شیت‌ها،
+و خواندن جریانی تکه‌تکه با حافظه ثابت برای دفاتر بزرگ
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain, islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+import openpyxl
+import pandas as pd
+
+try:
+    from smart_extractor.utils.ingest_cache import IngestCache, get_ingest_cache
+except ImportError:
+    from .ingest_cache import IngestCache, get_ingest_cache
+
+# حداقل تعداد شیت برای استفاده از process pool (هزینه راه‌اندازی فرآیندها)
+PARALLEL_SHEETS = 4
+
+# تعداد ردیف‌های پیش‌نمایش برای تشخیص سرستون و عرض جدول
+HEADER_PREVIEW_ROWS = 10
+
+# اندازه پیش‌فرض هر تکه در خواندن جریانی
+DEFAULT_CHUNK_ROWS = 50_000
+
+# شماره ردیف سرستون یا تابع انتخاب آن از روی ردیف‌های پیش‌نمایش
+HeaderSpec = Union[int, Callable[[List[tuple]], int]]
+
+# فایل باز شده در هر فرآیند process pool
+_worker_excel_file: Optional[pd.ExcelFile] = None
+
+
+class ColumnFilter:
+    """انتخاب ستون‌ها برای usecols در زمان خواندن (قابل pickle با repr پایدار برای کلید حافظه نهان)
+
+    اگر include داده شود فقط همان ستون‌ها خوانده می‌شوند؛ ستون‌های exclude و ستون‌هایی
+    که نامشان با یکی از exclude_prefixes (مثلاً 'Unnamed') شروع شود هرگز پارس نمی‌شوند.
+    """
+
+    def __init__(self, include: Optional[Iterable] = None, exclude: Iterable = (),
+                 exclude_prefixes: Tuple[str, ...] = ()):
+        self.include = frozenset(include) if include is not None else None
+        self.exclude = frozenset(exclude)
+        self.exclude_prefixes = tuple(exclude_prefixes)
+
+    def __call__(self, column: Any) -> bool:
+        if self.include is not None and column not in self.include:
+            return False
+        return column not in self.exclude and not str(column).startswith(self.exclude_prefixes)
+
+    def __repr__(self) -> str:
+        include = sorted(map(str, self.include)) if self.include is not None else None
+        return (f"ColumnFilter(include={include!r}, exclude={sorted(map(str, self.exclude))!r}, "
+                f"exclude_prefixes={self.exclude_prefixes!r})")
+
+
+def _init_reader(file_path: str):
+    """باز کردن فایل اکسل یک بار برای هر فرآیند کارگر"""
+    global _worker_excel_file
+    _worker_excel_file = pd.ExcelFile(file_path)
+
+
+def _parse_sheet(sheet_name: str, parse_kwargs: dict) -> pd.DataFrame:
+    """خواندن یک شیت از فایل باز شده فرآیند کارگر"""
+    return _worker_excel_file.parse(sheet_name, **parse_kwargs)
+
+
+def read_sheets(file_path: str, workers: Optional[int] = 0, parallel_threshold: int = PARALLEL_SHEETS,
+                sheet_name: Optional[str] = None, cache: Optional[IngestCache] = None,
+                **parse_kwargs) -> Dict[str, pd.DataFrame]:
+    """خواندن همه شیت‌ها به ترتیب فایل (مانند pd.read_excel با sheet_name=None)
+
+    فایل فقط یک بار باز می‌شود و همه شیت‌ها از همان ExcelFile خوانده می‌شوند. با
+    workers > 1 (یا 0 برای تعداد هسته‌ها) و حداقل parallel_threshold شیت، شیت‌ها
+    بین فرآیندهای یک process pool پخش می‌شوند و هر فرآیند فایل را فقط یک بار باز
+    می‌کند. با sheet_name فقط همان شیت خوانده می‌شود و parse_kwargs (مثلاً header)
+    به ExcelFile.parse داده می‌شود. header می‌تواند مانند iter_sheet_chunks تابعی
+    روی ردیف‌های پیش‌نمایش باشد؛ در این صورت فقط چند ردیف اول هر شیت برای تشخیص
+    سرستون خوانده و شیت یک بار با همان سرستون پارس می‌شود.
+
+    cache (یا حافظه نهان پیش‌فرض get_ingest_cache) شیت‌های پارس شده را با کلید
+    هش فایل، نام شیت و parse_kwargs نگه می‌دارد؛ اگر همه شیت‌ها در آن باشند فایل
+    اکسل اصلاً باز نمی‌شود. header تابعی می‌تواند به وضعیت بیرونی (کلمات کلیدی،
+    چیدمان‌های ثبت شده) وابسته باشد، پس ابتدا ردیف‌های پیش‌نمایش خوانده می‌شوند و
+    کلید هر شیت شماره ردیف سرستونی است که واقعاً به آن رسیده است.
+    """
+    requested = [sheet_name] if sheet_name is not None else None
+    cache = cache if cache is not None else get_ingest_cache()
+    if cache is None:
+        return _read_sheets(file_path, workers, parallel_threshold, requested, parse_kwargs)
+
+    digest = cache.file_digest(file_path)
+    headers = None
+    if callable(parse_kwargs.get('header')):
+        headers = _resolve_headers(file_path, parse_kwargs['header'], requested)
+        sheet_names = list(headers)
+    else:
+        sheet_names = requested or cache.get_sheet_names(digest)
+
+    def options(name) -> dict:
+        return {**parse_kwargs, 'header': headers[name]} if headers is not None else parse_kwargs
+
+    if sheet_names is None:
+        sheets = _read_sheets(file_path, workers, parallel_threshold, None, parse_kwargs)
+        cache.put_sheet_names(digest, list(sheets))
+        missing = list(sheets)
+    else:
+        # فقط شیت‌هایی که در حافظه نهان نیستند از فایل خوانده می‌شوند
+        sheets = {name: cache.get(digest, name, options(name)) for name in sheet_names}
+        missing = [name for name, df in sheets.items() if df is None]
+        if missing:
+            sheets.update(_read_sheets(file_path, workers, parallel_threshold, missing, parse_kwargs, headers))
+
+    for name in missing:
+        sheets[name] = cache.put(digest, name, options(name), sheets[name])
+    return sheets
+
+
+def _resolve_headers(file_path: str, header: Callable[[List[tuple]], int],
+                     sheet_names: Optional[List]) -> Dict[Any, int]:
+    """شماره ردیف سرستون هر شیت از روی ردیف‌های پیش‌نمایش (بدون پارس کامل شیت‌ها)"""
+    # مانند موتور openpyxl در pandas، فایل در حالت read-only باز می‌شود
+    workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True, keep_links=False)
+    try:
+        names = sheet_names if sheet_names is not None else workbook.sheetnames
+        return {name: _preview_header(_worksheet(workbook, name), header) for name in names}
+    finally:
+        workbook.close()
+
+
+def _read_sheets(file_path: str, workers: Optional[int], parallel_threshold: int,
+                 sheet_names: Optional[List], parse_kwargs: dict,
+                 headers: Optional[Dict[Any, int]] = None) -> Dict[str, pd.DataFrame]:
+    """خواندن شیت‌ها (همه یا فهرست sheet_names) از فایل اکسل بدون حافظه نهان
+
+    headers شماره ردیف سرستون از پیش تعیین شده هر شیت برای header تابعی است.
+    """
+    with pd.ExcelFile(file_path) as excel_file:
+        if sheet_names is None:
+            sheet_names = excel_file.sheet_names
+        sheet_kwargs = [parse_kwargs] * len(sheet_names)
+        header = parse_kwargs.get('header')
+        if headers is not None:
+            sheet_kwargs = [{**parse_kwargs, 'header': headers[name]} for name in sheet_names]
+        elif callable(header):
+            # تشخیص سرستون از ردیف‌های پیش‌نمایش، بدون پارس کامل شیت
+            sheet_kwargs = [{**parse_kwargs, 'header': _preview_header(_worksheet(excel_file.book, name), header)}
+                            for name in sheet_names]
+        if workers == 0:
+            workers = os.cpu_count() or 1
+        workers = min(workers or 1, len(sheet_names))
+        if workers <= 1 or len(sheet_names) < parallel_threshold:
+            return {name: excel_file.parse(name, **kwargs) for name, kwargs in zip(sheet_names, sheet_kwargs)}
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_reader, initargs=(str(file_path),)) as executor:
+        frames = executor.map(_parse_sheet, sheet_names, sheet_kwargs)
+        return dict(zip(sheet_names, frames))
+
+
+def _worksheet(workbook, sheet_name: Union[str, int]):
+    """شیت openpyxl با نام یا شماره (مانند sheet_name در pandas)"""
+    return workbook.worksheets[sheet_name] if isinstance(sheet_name, int) else workbook[sheet_name]
+
+
+def _preview_header(worksheet, header: Callable[[List[tuple]], int]) -> int:
+    """شماره ردیف سرستون از روی HEADER_PREVIEW_ROWS ردیف اول شیت"""
+    return header(list(islice(worksheet.iter_rows(values_only=True), HEADER_PREVIEW_ROWS)))
+
+
+def _convert_value(value: Any) -> Any:
+    """تبدیل مقدار سلول مانند خواننده openpyxl در pandas (عدد صحیح اعشاری به int، متن خالی به None)"""
+    if type(value) is float:
+        return int(value) if value.is_integer() else value
+    if type(value) is str and not value:
+        return None
+    return value
+
+
+def _trimmed_length(row: tuple) -> int:
+    """طول ردیف بدون سلول‌های خالی انتهایی"""
+    length = len(row)
+    while length and (row[length - 1] is None or row[length - 1] == ''):
+        length -= 1
+    return length
+
+
+def _column_names(row: tuple, width: int) -> List[str]:
+    """نام ستون‌ها از ردیف سرستون (Unnamed برای سلول خالی و .1 برای نام تکراری مانند pandas)"""
+    names = []
+    seen: Dict[Any, int] = {}
+    for index in range(width):
+        name = _convert_value(row[index]) if index < len(row) else None
+        if name is None:
+            name = f'Unnamed: {index}'
+        if name in seen:
+            seen[name] += 1
+            name = f'{name}.{seen[name]}'
+        seen.setdefault(name, 0)
+        names.append(name)
+    return names
+
+
+def _sheet_rows(worksheet, header: HeaderSpec = 0) -> Tuple[Optional[List], Iterator[tuple]]:
+    """نام ستون‌ها و جریان ردیف‌های داده یک شیت
+
+    header شماره ردیف سرستون است یا تابعی که با ردیف‌های پیش‌نمایش این شماره را
+    برمی‌گرداند. مانند pandas ردیف‌های خالی میانی حفظ و ردیف‌های خالی انتهایی حذف
+    می‌شوند. عرض جدول از سرستون و ردیف‌های پیش‌نمایش تعیین می‌شود؛ اگر ردیفی در
+    ادامه پهن‌تر باشد ستون‌های Unnamed به فهرست ستون‌ها (همان لیست برگردانده شده)
+    اضافه می‌شوند. مقادیر متنی بدون تبدیل نوع خوانده می‌شوند. برای شیت خالی
+    (None, جریان خالی) برگردانده می‌شود.
+    """
+    rows = worksheet.iter_rows(values_only=True)
+    preview = list(islice(rows, HEADER_PREVIEW_ROWS))
+    if not any(_trimmed_length(row) for row in preview):
+        return None, iter(())
+
+    header_row = header(preview) if callable(header) else header
+    if header_row >= len(preview):
+        preview.extend(islice(rows, header_row - len(preview) + 1))
+        if header_row >= len(preview):
+            return None, iter(())
+    columns = _column_names(preview[header_row], max(_trimmed_length(row) for row in preview[header_row:]))
+
+    def data_rows() -> Iterator[tuple]:
+        width = len(columns)
+        pending_blank = 0
+        for row in chain(preview[header_row + 1:], rows):
+            length = _trimmed_length(row)
+            if not length:
+                # ردیف خالی فقط اگر ردیف غیرخالی بعد از آن بیاید نگه داشته می‌شود
+                pending_blank += 1
+                continue
+            if length > width:
+                columns.extend(f'Unnamed: {index}' for index in range(width, length))
+                width = length
+            for _ in range(pending_blank):
+                yield (None,) * width
+            pending_blank = 0
+            yield tuple(_convert_value(value) for value in row[:length]) + (None,) * (width - length)
+
+    return columns, data_rows()
+
+
+def iter_sheet_chunks(file_path: str, chunk_size: int = DEFAULT_CHUNK_ROWS,
+                      sheet_name: Optional[str] = None, header: HeaderSpec = 0,
+                      sheet_column: Optional[str] = 'sheet_name') -> Iterator[pd.DataFrame]:
+    """خواندن جریانی شیت‌ها در تکه‌های chunk_size ردیفی با حافظه ثابت
+
+    فایل در حالت read-only خوانده می‌شود و در هر لحظه فقط یک تکه در حافظه است.
+    هر تکه ستون sheet_column (نام شیت) دارد و اندیس تکه‌ها پیوسته است؛ ترکیب
+    تکه‌ها همان نتیجه خواندن کامل و concat با ignore_index را می‌دهد. با sheet_name
+    فقط همان شیت خوانده می‌شود.
+    """
+    workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        names = [sheet_name] if sheet_name is not None else workbook.sheetnames
+        start = 0
+        for name in names:
+            columns, rows = _sheet_rows(workbook[name], header)
+            if columns is None:
+                continue
+            while True:
+                block = list(islice(rows, chunk_size))
+                if not block:
+                    break
+                chunk = pd.DataFrame(block, columns=list(columns), index=pd.RangeIndex(start, start + len(block)))
+                if sheet_column is not None:
+                    chunk[sheet_column] = name
+                start += len(block)
+                yield chunk
+    finally:
+        workbook.close()
+
+
+def read_sheet_headers(file_path: str, sheet_name: Optional[str] = None,
+                       header: HeaderSpec = 0) -> Dict[str, List]:
+    """نام ستون‌های هر شیت بدون خواندن ردیف‌های داده (برای ساخت سرستون خروجی جریانی)"""
+    workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        names = [sheet_name] if sheet_name is not None else workbook.sheetnames
+        headers = {}
+        for name in names:
+            columns, _ = _sheet_rows(workbook[name], header)
+            if columns is not None:
+                headers[name] = columns
+        return headers
+    finally:
+        workbook.close()
@@ -0,0 +1,99 @@
+"""
+Streaming Excel writer for Smart Extractor
+نوشتن جریانی فایل اکسل در حالت write-only با حافظه ثابت
+"""
+
+import time
+from typing import Dict, Iterable, List, Optional, Union
+
+import openpyxl
+import pandas as pd
+
+
+class StreamingExcelWriter:
+    """نویسنده اکسل فقط‌نوشتنی که ردیف‌ها را تکه‌به‌تکه روی دیسک می‌نویسد
+
+    برخلاف pd.ExcelWriter کل workbook در حافظه ساخته نمی‌شود؛ هر شیت از یک
+    DataFrame یا جریانی از تکه‌های DataFrame (مثلاً یک generator) نوشته می‌شود و
+    حافظه مصرفی به تعداد ردیف‌ها وابسته نیست. سرستون هر شیت با اولین تکه ثابت
+    می‌شود و ستون‌هایی که فقط در تکه‌های بعدی ظاهر شوند در dropped_columns ثبت
+    می‌شوند.
+
+        with StreamingExcelWriter('out.xlsx') as writer:
+            writer.write_sheet('نتایج', chunks)
+    """
+
+    def __init__(self, path: str):
+        self.path = str(path)
+        self.workbook = openpyxl.Workbook(write_only=True)
+        self.rows_written = 0
+        self.seconds = 0.0
+        self.dropped_columns: Dict[str, List] = {}
+
+    def write_sheet(self, sheet_name: str, data: Union[pd.DataFrame, Iterable[pd.DataFrame]],
+                    columns: Optional[List] = None) -> int:
+        """نوشتن یک شیت از DataFrame یا تکه‌های آن و برگرداندن تعداد ردیف‌ها
+
+        columns ترتیب سرستون را از پیش مشخص می‌کند؛ ستون‌های اضافه اولین تکه به
+        انتهای آن اضافه می‌شوند. زمان صرف شده برای تولید تکه‌ها (مثلاً استخراج)
+        در seconds حساب نمی‌شود.
+        """
+        chunks = [data] if isinstance(data, pd.DataFrame) else data
+        worksheet = self.workbook.create_sheet(sheet_name)
+        header = list(columns) if columns is not None else []
+        header_written = False
+        rows = 0
+
+        for chunk in chunks:
+            start = time.perf_counter()
+            if not header_written:
+                header += [column for column in chunk.columns if column not in header]
+                worksheet.append(header)
+                header_written = True
+
+            extra = [column for column in chunk.columns if column not in header]
+            if extra:
+                dropped = self.dropped_columns.setdefault(sheet_name, [])
+                dropped.extend(column for column in extra if column not in dropped)
+
+            # NaN و NaT به سلول خالی تبدیل می‌شوند (مانند to_excel)
+            values = chunk if list(chunk.columns) == header else chunk.reindex(columns=header)
+            values = values.astype(object)
+            for row in values.where(values.notna(), None).itertuples(index=False, name=None):
+                worksheet.append(row)
+
+            rows += len(chunk)
+            self.seconds += time.perf_counter() - start
+
+        if not header_written and header:
+            worksheet.append(header)
+        self.rows_written += rows
+        return rows
+
+    def save(self):
+        """ذخیره workbook روی دیسک"""
+        start = time.perf_counter()
+        self.workbook.save(self.path)
+        self.seconds += time.perf_counter() - start
+
+    def stats(self) -> Dict[str, float]:
+        """آمار نوشتن (تعداد ردیف، زمان و ردیف در ثانیه)"""
+        return {
+            'rows': self.rows_written,
+            'seconds': self.seconds,
+            'rows_per_second': self.rows_written / self.seconds if self.seconds > 0 else 0.0,
+        }
+
+    def format_stats(self) -> str:
+        """متن یک‌خطی آمار نوشتن برای نمایش"""
+        stats = self.stats()
+        return (f"✍️ {stats['rows']} ردیف در {stats['seconds']:.2f}s نوشته شد "
+                f"({stats['rows_per_second']:,.0f} ردیف در ثانیه)")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        # در صورت خطا فایل ناقص ذخیره نمی‌شود
+        if exc_type is None:
+            self.save()
@@ -8,14 +8,21 @@ import re
 from pathlib import Path
 from typing import Optional
 
+try:
+    from smart_extractor.utils.output_sinks import OUTPUT_FORMATS
+except ImportError:
+    from .output_sinks import OUTPUT_FORMATS
+
 
 class FileHandler:
     """کلاس مدیریت فایل و نام‌گذاری"""
     
     @staticmethod
-    def generate_output_filename(input_path: str, suffix: str = "_extracted") -> str:
-        """تولید نام فایل خروجی با اندیس"""
+    def generate_output_filename(input_path: str, suffix: str = "_extracted",
+                                 output_format: Optional[str] = None) -> str:
+        """تولید نام فایل خروجی با اندیس (پسوند از output_format، وگرنه پسوند ورودی)"""
         input_path = Path(input_path)
+        extension = OUTPUT_FORMATS[output_format] if output_format else input_path.suffix
         
         # استخراج نام فایل بدون پسوند
         filename = input_path.stem
@@ -25,10 +32,10 @@ class FileHandler:
         
         # اضافه کردن اندیس در صورت وجود فایل تکراری
         counter = 1
-        output_filename = f"{filename}{suffix}{input_path.suffix}"
+        output_filename = f"{filename}{suffix}{extension}"
         
         while os.path.exists(output_filename):
-            output_filename = f"{filename}{suffix}_{counter}{input_path.suffix}"
+            output_filename = f"{filename}{suffix}_{counter}{extension}"
             counter += 1
         
         return output_filename
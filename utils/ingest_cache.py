@@ -0,0 +1,234 @@
+"""
+Columnar ingest cache for parsed Excel sheets
+حافظه نهان ستونی شیت‌های خوانده شده: هر شیت اکسل یک بار خوانده و به صورت Parquet
+ذخیره می‌شود و اجراهای بعدی همان فایل آن را بدون پارس مجدد xlsx بارگذاری می‌کنند
+"""
+
+import hashlib
+import json
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# حداکثر حجم پیش‌فرض حافظه نهان (بایت)
+DEFAULT_INGEST_CACHE_BYTES = 1 << 30
+
+# متغیر محیطی مسیر حافظه نهان پیش‌فرض همه خواننده‌ها
+INGEST_CACHE_ENV = 'SMART_EXTRACTOR_INGEST_CACHE'
+
+# پسوند فایل‌های مدخل: شیت‌های Parquet و فهرست شیت‌های هر فایل؛ مدخل‌های pickle
+# نسخه‌های قبلی هرگز بارگذاری نمی‌شوند و فقط برای حذف شمرده می‌شوند
+ENTRY_EXTENSIONS = ('.parquet', '.sheets.json', '.pkl')
+
+# کلید فراداده Parquet برای نام اصلی ستون‌ها (JSON)
+COLUMNS_METADATA_KEY = b'smart_extractor.columns'
+
+_default_cache: Optional['IngestCache'] = None
+
+
+def _table_to_frame(table) -> pd.DataFrame:
+    """DataFrame از جدول Arrow؛ مانند read_excel سلول‌های خالی ستون‌های متنی NaN هستند (نه None)"""
+    df = table.to_pandas()
+    df.columns = json.loads(table.schema.metadata[COLUMNS_METADATA_KEY])
+    for position in np.flatnonzero(df.dtypes.to_numpy() == object):
+        column = df.iloc[:, position]
+        df.isetitem(position, column.where(column.notna(), np.nan))
+    return df
+
+
+def _normalize_frame(df: pd.DataFrame) -> Optional[pd.DataFrame]:
+    """شیت قابل ذخیره در Parquet: ستون‌های object با انواع مختلط به متن تبدیل می‌شوند
+
+    None یعنی نام ستون‌ها در JSON قابل نگهداری نیست (مثلاً تاریخ به عنوان سرستون).
+    """
+    names = [name.item() if isinstance(name, np.generic) else name for name in df.columns]
+    if not all(type(name) in (str, int, float, bool) for name in names):
+        return None
+    df = df.set_axis(names, axis=1)
+    for position in np.flatnonzero(df.dtypes.to_numpy() == object):
+        column = df.iloc[:, position]
+        values = column[column.notna()]
+        if len(set(map(type, values))) > 1:
+            df.isetitem(position, column.map(lambda value: value if pd.isna(value) or isinstance(value, str)
+                                              else str(value)).astype(object))
+    return df
+
+
+def _require_pyarrow():
+    """import تنبل pyarrow (حافظه نهان فقط Parquet می‌نویسد)"""
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError("برای حافظه نهان ورودی بسته pyarrow لازم است: pip install pyarrow") from None
+    return pyarrow
+
+
+class IngestCache:
+    """حافظه نهان شیت‌های پارس شده با کلید هش محتوای فایل، نام شیت و گزینه‌های خواندن
+
+    کلید از هش SHA-256 محتوای فایل ساخته می‌شود، پس تغییر فایل ورودی خودبه‌خود
+    مدخل‌های قبلی را بی‌اعتبار می‌کند. گزینه‌های خواندن (مثلاً ردیف سرستون) بخشی از
+    کلید هستند. شیت‌ها فقط به صورت Parquet (داده بدون کد اجرایی) ذخیره می‌شوند و
+    pyarrow لازم است؛ ستون‌های object با انواع مختلط (مثلاً عدد و متن) به متن تبدیل
+    می‌شوند و put همان شیت تبدیل شده را برمی‌گرداند تا خواندن اول و بعدی یکسان باشند.
+    شیتی که بازگشت از Parquet داده آن را دقیقاً نمی‌دهد ذخیره نمی‌شود. با عبور حجم
+    کل از max_bytes، مدخل‌هایی که مدت بیشتری استفاده نشده‌اند حذف می‌شوند.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = DEFAULT_INGEST_CACHE_BYTES):
+        self.pa = _require_pyarrow()
+        self.directory = str(directory)
+        self.max_bytes = max_bytes
+        os.makedirs(self.directory, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+        # هش فایل‌ها در این فرآیند تا فایل برای هر شیت دوباره هش نشود
+        self._digests: Dict[Tuple[str, int, int], str] = {}
+
+    def file_digest(self, file_path: str) -> str:
+        """هش SHA-256 محتوای فایل"""
+        stat = os.stat(file_path)
+        signature = (os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns)
+        digest = self._digests.get(signature)
+        if digest is None:
+            sha = hashlib.sha256()
+            with open(file_path, 'rb') as handle:
+                for block in iter(lambda: handle.read(1 << 20), b''):
+                    sha.update(block)
+            digest = self._digests[signature] = sha.hexdigest()
+        return digest
+
+    @staticmethod
+    def _key(digest: str, sheet_name: Any, options: Dict[str, Any]) -> str:
+        """کلید یک شیت با گزینه‌های خواندن آن"""
+        spec = json.dumps([repr(sheet_name), sorted((key, repr(value)) for key, value in options.items())],
+                          ensure_ascii=False)
+        return hashlib.sha256(f'{digest}|{spec}'.encode('utf-8')).hexdigest()
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def get(self, digest: str, sheet_name: Any, options: Dict[str, Any]) -> Optional[pd.DataFrame]:
+        """شیت ذخیره شده یا None"""
+        path = self._path(self._key(digest, sheet_name, options) + '.parquet')
+        if not os.path.exists(path):
+            return None
+        try:
+            df = _table_to_frame(self.pa.parquet.read_table(path))
+        except Exception:
+            # مدخل خراب؛ شیت دوباره خوانده می‌شود
+            return None
+        os.utime(path)
+        self.hits += 1
+        return df
+
+    def put(self, digest: str, sheet_name: Any, options: Dict[str, Any], df: pd.DataFrame) -> pd.DataFrame:
+        """ذخیره یک شیت تازه خوانده شده (نوشتن اتمی) و حذف مدخل‌های قدیمی در صورت نیاز
+
+        شیت تبدیل شده (همان چیزی که get بعداً برمی‌گرداند) یا در صورت ذخیره نشدن خود df برگردانده می‌شود.
+        """
+        self.misses += 1
+        pa = self.pa
+        normalized = _normalize_frame(df)
+        if normalized is None:
+            return df
+        try:
+            # ستون‌ها با شماره ذخیره می‌شوند و نام اصلی آنها (حتی عدد یا تکراری) در فراداده است
+            table = pa.Table.from_pandas(normalized.set_axis([str(i) for i in range(normalized.shape[1])], axis=1))
+            table = table.replace_schema_metadata({
+                **(table.schema.metadata or {}),
+                COLUMNS_METADATA_KEY: json.dumps(list(normalized.columns), ensure_ascii=False).encode('utf-8'),
+            })
+            # فقط اگر بازگشت از Parquet همان داده و انواع را بدهد
+            restored = _table_to_frame(table)
+            if not (restored.dtypes.equals(normalized.dtypes) and restored.equals(normalized)):
+                return df
+        except (pa.ArrowException, TypeError, ValueError):
+            return df
+
+        path = self._path(self._key(digest, sheet_name, options) + '.parquet')
+        temp_path = f'{path}.{os.getpid()}.tmp'
+        pa.parquet.write_table(table, temp_path)
+        os.replace(temp_path, path)
+        self.evict()
+        return normalized
+
+    def get_sheet_names(self, digest: str) -> Optional[List[str]]:
+        """فهرست شیت‌های فایل در صورت ذخیره شدن"""
+        path = self._path(f'{digest}.sheets.json')
+        try:
+            with open(path, encoding='utf-8') as handle:
+                sheet_names = json.load(handle)
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        return sheet_names
+
+    def put_sheet_names(self, digest: str, sheet_names: List[str]):
+        """ذخیره فهرست شیت‌های فایل"""
+        path = self._path(f'{digest}.sheets.json')
+        temp_path = f'{path}.{os.getpid()}.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as handle:
+            json.dump(list(sheet_names), handle, ensure_ascii=False)
+        os.replace(temp_path, path)
+        self.evict()
+
+    def _entries(self) -> List[Tuple[float, int, str]]:
+        """(زمان آخرین استفاده، حجم، مسیر) مدخل‌های شیت و فهرست‌های شیت"""
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(ENTRY_EXTENSIONS):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def evict(self) -> int:
+        """حذف مدخل‌هایی که مدت بیشتری استفاده نشده‌اند تا حجم زیر max_bytes برسد"""
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        return removed
+
+    def stats(self) -> Dict[str, int]:
+        """آمار حافظه نهان (یافت شده، خوانده شده، تعداد و حجم مدخل‌ها)"""
+        entries = self._entries()
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'entries': len(entries),
+            'bytes': sum(size for _, size, _ in entries),
+        }
+
+    def format_stats(self) -> str:
+        """متن یک‌خطی آمار برای نمایش"""
+        stats = self.stats()
+        return (f"🗃️ حافظه نهان ورودی: {stats['hits']} شیت بارگذاری شد، {stats['misses']} شیت خوانده شد "
+                f"({stats['entries']} مدخل، {stats['bytes'] / (1 << 20):.1f} MB)")
+
+
+def configure_ingest_cache(directory: Optional[str],
+                           max_bytes: int = DEFAULT_INGEST_CACHE_BYTES) -> Optional[IngestCache]:
+    """تنظیم حافظه نهان پیش‌فرض همه خواننده‌ها (None برای غیرفعال کردن)"""
+    global _default_cache
+    _default_cache = IngestCache(directory, max_bytes) if directory else None
+    return _default_cache
+
+
+def get_ingest_cache() -> Optional[IngestCache]:
+    """حافظه نهان پیش‌فرض (تنظیم شده یا از متغیر محیطی SMART_EXTRACTOR_INGEST_CACHE)"""
+    global _default_cache
+    if _default_cache is None and os.environ.get(INGEST_CACHE_ENV):
+        _default_cache = IngestCache(os.environ[INGEST_CACHE_ENV])
+    return _default_cache
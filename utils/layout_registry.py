@@ -0,0 +1,115 @@
+"""
+Schema fingerprint registry for recurring export layouts
+ثبت چیدمان فایل‌های خروجی تکراری ERP: ردیف سرستون، تغییر نام ستون‌ها و ستون‌های
+نگهداری‌شده هر چیدمان با کلید اثر انگشت سرستون ذخیره می‌شود تا چیدمان‌های
+شناخته شده بدون تشخیص و تحلیل دوباره پردازش شوند
+"""
+
+import hashlib
+import json
+import os
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+# متغیر محیطی مسیر فایل ثبت چیدمان پیش‌فرض
+LAYOUT_REGISTRY_ENV = 'SMART_EXTRACTOR_LAYOUT_REGISTRY'
+
+_default_registry: Optional['LayoutRegistry'] = None
+
+
+def _cell_text(cell: Any) -> str:
+    """متن نرمال شده یک سلول سرستون (سلول خالی رشته تهی)"""
+    if cell is None or (isinstance(cell, float) and cell != cell):
+        return ''
+    return str(cell).strip()
+
+
+def layout_fingerprint(cells: Iterable[Any], kind: str = 'header') -> str:
+    """اثر انگشت یک ردیف سرستون یا فهرست ستون‌ها (سلول‌های خالی انتهایی نادیده گرفته می‌شوند)
+
+    kind فضای نام اثر انگشت است تا چیدمان یک شیت و چیدمان داده ترکیب شده با
+    ستون‌های یکسان با هم اشتباه نشوند.
+    """
+    texts = [_cell_text(cell) for cell in cells]
+    while texts and not texts[-1]:
+        texts.pop()
+    spec = json.dumps([kind, texts], ensure_ascii=False)
+    return hashlib.sha256(spec.encode('utf-8')).hexdigest()[:16]
+
+
+class LayoutRegistry:
+    """فایل JSON چیدمان‌های شناخته شده با کلید اثر انگشت سرستون
+
+    هر مدخل یک dict از تصمیم‌های گرفته شده برای آن چیدمان است (header_row برای ردیف
+    سرستون یک شیت، retained_columns و renamed_columns برای فهرست ستون‌ها). تصمیم‌ها فقط یک بار برای چیدمان جدید گرفته و
+    ثبت می‌شوند؛ اجراهای بعدی همان قالب ERP آن‌ها را مستقیماً به کار می‌برند.
+    حذف فایل (یا مدخل) تحلیل دوباره را اجباری می‌کند.
+    """
+
+    def __init__(self, path: str):
+        self.path = str(path)
+        self.hits = 0
+        self.misses = 0
+        self.layouts: Dict[str, Dict[str, Any]] = {}
+        try:
+            with open(self.path, encoding='utf-8') as handle:
+                self.layouts = json.load(handle)
+        except (OSError, ValueError):
+            # فایل وجود ندارد یا خراب است؛ چیدمان‌ها دوباره ثبت می‌شوند
+            self.layouts = {}
+
+    def get(self, fingerprint: str, field: str) -> Any:
+        """تصمیم ثبت شده field برای چیدمان یا None"""
+        value = self.layouts.get(fingerprint, {}).get(field)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def find_header_row(self, rows: List[Sequence[Any]], max_rows: int = 3) -> Optional[int]:
+        """شماره ردیف سرستون ثبت شده در میان ردیف‌های اول یک شیت یا None برای چیدمان جدید"""
+        for index, row in enumerate(rows[:max_rows]):
+            if self.layouts.get(layout_fingerprint(row), {}).get('header_row') == index:
+                self.hits += 1
+                return index
+        self.misses += 1
+        return None
+
+    def put(self, fingerprint: str, **fields: Any):
+        """ثبت تصمیم‌های یک چیدمان و ذخیره اتمی فایل"""
+        self.layouts.setdefault(fingerprint, {}).update(fields)
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = f'{self.path}.{os.getpid()}.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as handle:
+            json.dump(self.layouts, handle, ensure_ascii=False, indent=1)
+        os.replace(temp_path, self.path)
+
+    def __len__(self) -> int:
+        return len(self.layouts)
+
+    def stats(self) -> Dict[str, int]:
+        """آمار (یافت شده، ثبت نشده، تعداد چیدمان‌ها)"""
+        return {'hits': self.hits, 'misses': self.misses, 'layouts': len(self.layouts)}
+
+    def format_stats(self) -> str:
+        """متن یک‌خطی آمار برای نمایش"""
+        stats = self.stats()
+        return (f"🧭 ثبت چیدمان: {stats['hits']} تصمیم از چیدمان‌های شناخته شده، "
+                f"{stats['misses']} تصمیم تازه ({stats['layouts']} چیدمان ثبت شده)")
+
+
+def configure_layout_registry(path: Optional[str]) -> Optional[LayoutRegistry]:
+    """تنظیم فایل ثبت چیدمان پیش‌فرض (None برای غیرفعال کردن)"""
+    global _default_registry
+    _default_registry = LayoutRegistry(path) if path else None
+    return _default_registry
+
+
+def get_layout_registry() -> Optional[LayoutRegistry]:
+    """ثبت چیدمان پیش‌فرض (تنظیم شده یا از متغیر محیطی SMART_EXTRACTOR_LAYOUT_REGISTRY)"""
+    global _default_registry
+    if _default_registry is None and os.environ.get(LAYOUT_REGISTRY_ENV):
+        _default_registry = LayoutRegistry(os.environ[LAYOUT_REGISTRY_ENV])
+    return _default_registry
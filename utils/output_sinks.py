@@ -0,0 +1,331 @@
+"""
+Output sinks for enriched data
+نوشتن خروجی داده‌های غنی‌شده در قالب‌های xlsx، Parquet، Feather و CSV تکه‌ای
+"""
+
+import os
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Union
+
+import pandas as pd
+
+try:
+    from smart_extractor.utils.excel_writer import StreamingExcelWriter
+except ImportError:
+    from .excel_writer import StreamingExcelWriter
+
+# قالب‌های خروجی پشتیبانی شده و پسوند فایل هر کدام
+OUTPUT_FORMATS = {
+    'xlsx': '.xlsx',
+    'parquet': '.parquet',
+    'feather': '.feather',
+    'csv': '.csv',
+}
+
+
+def _require_pyarrow(output_format: str):
+    """import تنبل pyarrow (وابستگی اختیاری قالب‌های Parquet و Feather)"""
+    try:
+        import pyarrow
+    except ImportError:
+        raise ImportError(
+            f"برای خروجی {output_format} بسته pyarrow لازم است: pip install pyarrow"
+        ) from None
+    return pyarrow
+
+
+class OutputSink:
+    """پایه نویسنده‌های خروجی: یک جدول از DataFrame یا جریانی از تکه‌های آن
+
+    مانند StreamingExcelWriter سرستون با اولین تکه ثابت می‌شود (columns ترتیب آن
+    را از پیش مشخص می‌کند) و ستون‌هایی که فقط در تکه‌های بعدی ظاهر شوند در
+    dropped_columns ثبت می‌شوند. در صورت خطا فایل ناقص باقی نمی‌ماند.
+
+        with open_output_sink('out.parquet') as sink:
+            sink.write(chunks)
+    """
+
+    output_format = ''
+
+    def __init__(self, path: str):
+        self.path = str(path)
+        self.rows_written = 0
+        self.seconds = 0.0
+        self.dropped_columns: List = []
+
+    def write(self, data: Union[pd.DataFrame, Iterable[pd.DataFrame]], columns: Optional[List] = None) -> int:
+        """نوشتن DataFrame یا تکه‌های آن و برگرداندن تعداد ردیف‌ها"""
+        chunks = [data] if isinstance(data, pd.DataFrame) else data
+        header = list(columns) if columns is not None else []
+        header_written = False
+        rows = 0
+
+        for chunk in chunks:
+            start = time.perf_counter()
+            if not header_written:
+                header += [column for column in chunk.columns if column not in header]
+                header_written = True
+
+            extra = [column for column in chunk.columns if column not in header]
+            self.dropped_columns.extend(column for column in extra if column not in self.dropped_columns)
+
+            self._write_chunk(chunk if list(chunk.columns) == header else chunk.reindex(columns=header))
+            rows += len(chunk)
+            self.seconds += time.perf_counter() - start
+
+        if not header_written and header:
+            self._write_chunk(pd.DataFrame(columns=header))
+        self.rows_written += rows
+        return rows
+
+    def _write_chunk(self, chunk: pd.DataFrame):
+        raise NotImplementedError
+
+    def close(self):
+        """بستن فایل خروجی"""
+
+    def abort(self):
+        """بستن و حذف فایل ناقص"""
+        try:
+            self.close()
+        finally:
+            if os.path.exists(self.path):
+                os.remove(self.path)
+
+    def stats(self) -> Dict[str, float]:
+        """آمار نوشتن (تعداد ردیف، زمان و ردیف در ثانیه)"""
+        return {
+            'rows': self.rows_written,
+            'seconds': self.seconds,
+            'rows_per_second': self.rows_written / self.seconds if self.seconds > 0 else 0.0,
+        }
+
+    def format_stats(self) -> str:
+        """متن یک‌خطی آمار نوشتن برای نمایش"""
+        stats = self.stats()
+        return (f"✍️ {stats['rows']} ردیف {self.output_format} در {stats['seconds']:.2f}s نوشته شد "
+                f"({stats['rows_per_second']:,.0f} ردیف در ثانیه)")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class ExcelSink(OutputSink):
+    """خروجی xlsx با StreamingExcelWriter در یک شیت"""
+
+    output_format = 'xlsx'
+
+    def __init__(self, path: str, sheet_name: str = 'Sheet1'):
+        super().__init__(path)
+        self.sheet_name = sheet_name
+        self.writer = StreamingExcelWriter(path)
+
+    def write(self, data: Union[pd.DataFrame, Iterable[pd.DataFrame]], columns: Optional[List] = None) -> int:
+        rows = self.writer.write_sheet(self.sheet_name, data, columns=columns)
+        self.dropped_columns = self.writer.dropped_columns.get(self.sheet_name, [])
+        self.rows_written, self.seconds = self.writer.rows_written, self.writer.seconds
+        return rows
+
+    def close(self):
+        self.writer.save()
+        self.seconds = self.writer.seconds
+
+    def abort(self):
+        # workbook فقط‌نوشتنی پیش از save چیزی روی دیسک ننوشته است
+        pass
+
+
+class CsvSink(OutputSink):
+    """خروجی CSV که هر تکه به انتهای فایل اضافه می‌شود (UTF-8 با BOM برای اکسل)"""
+
+    output_format = 'csv'
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        self.header_written = False
+
+    def _write_chunk(self, chunk: pd.DataFrame):
+        if self.header_written:
+            chunk.to_csv(self.path, mode='a', header=False, index=False, encoding='utf-8')
+        else:
+            chunk.to_csv(self.path, mode='w', header=True, index=False, encoding='utf-8-sig')
+            self.header_written = True
+
+
+class _ArrowSink(OutputSink):
+    """پایه خروجی‌های ستونی pyarrow با طرح (schema) اعلام شده برای همه تکه‌ها
+
+    نوع ستون‌ها در تکه‌های خوانده شده از اکسل پایدار نیست (مثلاً int64 در یک تکه و
+    float64 یا متن مختلط در تکه بعد)، پس طرح از نوع کلی ستون‌ها ساخته می‌شود: ستون‌های
+    عددی float64، ستون‌های object و کاملاً خالی رشته. اگر تکه‌ای باز هم با طرح سازگار
+    نباشد (مثلاً متن در ستون عددی)، آن ستون به رشته گسترش می‌یابد و بخش نوشته شده
+    فایل، گروه به گروه با طرح جدید بازنویسی می‌شود. دسته‌های ستون‌های categorical
+    بین تکه‌ها فقط به انتها اضافه می‌شوند تا کدهای دیکشنری پایدار بمانند.
+    """
+
+    # آیا دیکشنری‌ها فقط با delta (و نه جایگزینی) قابل تغییرند
+    dictionary_deltas = False
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        self.pa = _require_pyarrow(self.output_format)
+        self.schema = None
+        self.writer = None
+        self.categories: Dict[str, pd.Index] = {}
+
+    def _to_table(self, chunk: pd.DataFrame):
+        pa = self.pa
+        chunk = chunk.copy()
+        for column in chunk.columns:
+            series = chunk[column]
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                known = self.categories.get(column, pd.Index([], dtype=object))
+                new = series.cat.categories.difference(known, sort=False)
+                self.categories[column] = known = known.append(new)
+                chunk[column] = series.cat.set_categories(known)
+            elif series.dtype == object:
+                chunk[column] = series.map(lambda value: None if pd.isna(value) else str(value)).astype(object)
+        table = pa.Table.from_pandas(chunk, preserve_index=False)
+
+        if self.schema is None:
+            fields = []
+            for field in table.schema:
+                if pa.types.is_null(field.type):
+                    field = field.with_type(pa.string())
+                elif pa.types.is_integer(field.type):
+                    # ستون عددی در تکه‌های بعد ممکن است اعشاری یا خالی باشد
+                    field = field.with_type(pa.float64())
+                elif pa.types.is_dictionary(field.type):
+                    # دیکشنری خالی در IPC قابل گسترش با delta نیست؛ آن ستون رشته‌ای نوشته می‌شود
+                    empty = self.dictionary_deltas and not len(self.categories[field.name])
+                    field = field.with_type(pa.string() if empty else pa.dictionary(pa.int32(), pa.string()))
+                fields.append(field)
+            self.schema = pa.schema(fields)
+            self.writer = self._open_writer(self.schema)
+        return self._cast(table)
+
+    def _cast(self, table):
+        """تکه با طرح فایل؛ ستون ناسازگار با طرح، طرح را به رشته گسترش می‌دهد"""
+        pa = self.pa
+        columns = []
+        widened = []
+        for field in self.schema:
+            column = table.column(field.name)
+            try:
+                columns.append(column.cast(field.type))
+            except (pa.ArrowInvalid, pa.ArrowNotImplementedError, pa.ArrowTypeError):
+                columns.append(column.cast(pa.string()))
+                widened.append(field.name)
+        if widened:
+            self._widen(widened)
+        return pa.Table.from_arrays(columns, schema=self.schema)
+
+    def _widen(self, names: List):
+        """گسترش ستون‌های names به رشته و بازنویسی بخش نوشته شده فایل با طرح جدید"""
+        pa = self.pa
+        self.schema = pa.schema([field.with_type(pa.string()) if field.name in names else field
+                                 for field in self.schema])
+        self.writer.close()
+        temp_path = f'{self.path}.{os.getpid()}.tmp'
+        os.replace(self.path, temp_path)
+        try:
+            self.writer = self._open_writer(self.schema)
+            for table in self._read_tables(temp_path):
+                self.writer.write_table(table.cast(self.schema))
+        finally:
+            os.remove(temp_path)
+
+    def _write_chunk(self, chunk: pd.DataFrame):
+        table = self._to_table(chunk)
+        self.writer.write_table(table)
+
+    def _open_writer(self, schema):
+        raise NotImplementedError
+
+    def _read_tables(self, path: str):
+        """جدول‌های نوشته شده یک فایل به ترتیب (row group یا record batch)"""
+        raise NotImplementedError
+
+    def close(self):
+        if self.writer is not None:
+            start = time.perf_counter()
+            self.writer.close()
+            self.writer = None
+            self.seconds += time.perf_counter() - start
+
+
+class ParquetSink(_ArrowSink):
+    """خروجی Parquet با یک row group برای هر تکه"""
+
+    output_format = 'parquet'
+
+    def _open_writer(self, schema):
+        import pyarrow.parquet as pq
+        return pq.ParquetWriter(self.path, schema)
+
+    def _read_tables(self, path: str):
+        import pyarrow.parquet as pq
+        parquet_file = pq.ParquetFile(path)
+        try:
+            for index in range(parquet_file.num_row_groups):
+                yield parquet_file.read_row_group(index)
+        finally:
+            parquet_file.close()
+
+
+class FeatherSink(_ArrowSink):
+    """خروجی Feather (Arrow IPC نسخه ۲) با یک record batch برای هر تکه"""
+
+    output_format = 'feather'
+    dictionary_deltas = True
+
+    def _open_writer(self, schema):
+        # دسته‌های جدید تکه‌های بعدی به صورت delta به دیکشنری اضافه می‌شوند
+        options = self.pa.ipc.IpcWriteOptions(emit_dictionary_deltas=True)
+        return self.pa.ipc.new_file(self.path, schema, options=options)
+
+    def _read_tables(self, path: str):
+        with self.pa.OSFile(path, 'rb') as source:
+            reader = self.pa.ipc.open_file(source)
+            for index in range(reader.num_record_batches):
+                yield self.pa.Table.from_batches([reader.get_batch(index)])
+
+
+OUTPUT_SINKS = {
+    'xlsx': ExcelSink,
+    'parquet': ParquetSink,
+    'feather': FeatherSink,
+    'csv': CsvSink,
+}
+
+
+def resolve_output_format(path: str, output_format: Optional[str] = None) -> str:
+    """قالب خروجی از آرگومان یا پسوند فایل"""
+    if output_format is None:
+        suffix = Path(path).suffix.lower()
+        output_format = next((name for name, extension in OUTPUT_FORMATS.items() if extension == suffix), 'xlsx')
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"قالب خروجی نامعتبر: {output_format} (مجاز: {', '.join(OUTPUT_FORMATS)})")
+    return output_format
+
+
+def check_output_format(output_format: str):
+    """بررسی معتبر بودن قالب و نصب بودن وابستگی آن پیش از شروع پردازش"""
+    resolve_output_format('', output_format)
+    if issubclass(OUTPUT_SINKS[output_format], _ArrowSink):
+        _require_pyarrow(output_format)
+
+
+def open_output_sink(path: str, output_format: Optional[str] = None, sheet_name: str = 'Sheet1') -> OutputSink:
+    """ساخت نویسنده خروجی مناسب قالب (یا پسوند فایل)؛ sheet_name فقط برای xlsx است"""
+    output_format = resolve_output_format(path, output_format)
+    if output_format == 'xlsx':
+        return ExcelSink(path, sheet_name=sheet_name)
+    return OUTPUT_SINKS[output_format](path)
@@ -0,0 +1,105 @@
+"""
+In-memory processing pipeline
+خط لوله درون‌حافظه‌ای: مراحل نام‌دار که خروجی هر مرحله (معمولاً DataFrame) را
+بدون نوشتن فایل موقت به مرحله بعد می‌دهند و زمان و حافظه هر مرحله را اندازه می‌گیرند
+"""
+
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+try:
+    import resource
+except ImportError:  # ویندوز
+    resource = None
+
+Stage = Tuple[str, Callable[[Any], Any]]
+
+
+def peak_rss_mb() -> Optional[float]:
+    """بیشینه حافظه مقیم فرآیند تا این لحظه (MB) یا None در صورت در دسترس نبودن"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss در macOS بایت و در لینوکس کیلوبایت است
+    return peak / (1 << 20) if sys.platform == 'darwin' else peak / 1024
+
+
+class Pipeline:
+    """زنجیره‌ای از مراحل (نام، تابع) با زمان‌سنجی و اندازه‌گیری حافظه هر مرحله
+
+    اگر مرحله‌ای None برگرداند (روش معمول گزارش خطا در اسکریپت‌ها) مراحل بعدی
+    اجرا نمی‌شوند و run مقدار None برمی‌گرداند.
+
+    بعد از هر مرحله بیشینه حافظه مقیم فرآیند (RSS) ثبت می‌شود؛ مرحله‌ای که آن را
+    بالا برده اوج حافظه را ساخته است. با track_memory=True اوج حافظه تخصیص یافته
+    پایتون/numpy در طول هر مرحله هم با tracemalloc اندازه گرفته می‌شود (کندتر).
+
+        pipeline = Pipeline([('ترکیب', combine), ('استخراج', enrich)])
+        result = pipeline.run(input_path)
+        print(pipeline.format_timings())
+    """
+
+    def __init__(self, stages: Optional[Iterable[Stage]] = None, track_memory: bool = False):
+        self.stages: List[Stage] = list(stages or [])
+        self.track_memory = track_memory
+        self.timings: Dict[str, float] = {}
+        self.peak_rss: Dict[str, Optional[float]] = {}
+        self.peak_allocated: Dict[str, float] = {}
+
+    def add_stage(self, name: str, func: Callable[[Any], Any]) -> 'Pipeline':
+        """افزودن یک مرحله به انتهای خط لوله"""
+        self.stages.append((name, func))
+        return self
+
+    def run(self, value: Any) -> Any:
+        """اجرای مراحل به ترتیب روی value"""
+        self.timings = {}
+        self.peak_rss = {}
+        self.peak_allocated = {}
+        started_tracing = self.track_memory and not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        try:
+            for name, func in self.stages:
+                if self.track_memory:
+                    tracemalloc.reset_peak()
+                start = time.perf_counter()
+                value = func(value)
+                self.timings[name] = time.perf_counter() - start
+                self.peak_rss[name] = peak_rss_mb()
+                if self.track_memory:
+                    self.peak_allocated[name] = tracemalloc.get_traced_memory()[1] / (1 << 20)
+                print(f"   ⏱️ {name}: {self.timings[name]:.2f}s{self._format_memory(name)}")
+                if value is None:
+                    print(f"❌ خط لوله در مرحله «{name}» متوقف شد")
+                    return None
+        finally:
+            if started_tracing:
+                tracemalloc.stop()
+        return value
+
+    def _format_memory(self, name: str) -> str:
+        """متن حافظه یک مرحله برای خط گزارش"""
+        text = ''
+        if self.peak_rss.get(name) is not None:
+            text += f", اوج RSS {self.peak_rss[name]:.1f} MB"
+        if name in self.peak_allocated:
+            text += f", اوج تخصیص {self.peak_allocated[name]:.1f} MB"
+        return text
+
+    def format_timings(self) -> str:
+        """جدول زمان و حافظه مراحل آخرین اجرا"""
+        total = sum(self.timings.values())
+        lines = ["⏱️ زمان مراحل:"]
+        for name, seconds in self.timings.items():
+            share = seconds / total * 100 if total > 0 else 0.0
+            line = f"   {name:<24}{seconds:>8.2f}s {share:>5.1f}%"
+            if self.peak_rss.get(name) is not None:
+                line += f" {self.peak_rss[name]:>9.1f} MB RSS"
+            if name in self.peak_allocated:
+                line += f" {self.peak_allocated[name]:>9.1f} MB تخصیص"
+            lines.append(line)
+        lines.append(f"   {'کل':<24}{total:>8.2f}s")
+        return '\n'.join(lines)
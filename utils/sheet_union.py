@@ -0,0 +1,91 @@
+"""
+Union-schema concat of sheets
+ترکیب شیت‌ها با طرح (schema) اجتماع ستون‌ها: ستون‌ها و انواع داده پیش از ترکیب
+تعیین می‌شوند تا pd.concat قاب پهن پر از ستون‌های object خالی نسازد
+"""
+
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+# انواعی که بدون تغییر نوع مقدار خالی (NaN/NaT/None) را نگه می‌دارند
+_NULLABLE_KINDS = 'fcmMO'
+
+
+def union_columns(frames: Iterable[pd.DataFrame], sheet_column: Optional[str] = None) -> List:
+    """ستون‌های همه شیت‌ها به ترتیب اولین ظاهر شدن (مانند pd.concat با sort=False)
+
+    ستون نام شیت (در صورت وجود) مانند ستونی که به انتهای هر شیت اضافه شده باشد
+    بعد از ستون‌های اولین شیت قرار می‌گیرد.
+    """
+    columns = {}
+    for df in frames:
+        columns.update(dict.fromkeys(df.columns))
+        if sheet_column is not None:
+            columns.setdefault(sheet_column)
+    return list(columns)
+
+
+def union_dtypes(frames: List[pd.DataFrame], columns: Iterable) -> Dict:
+    """نوع داده هر ستون در قاب ترکیب شده
+
+    نوع یکسان حفظ می‌شود (اعداد صحیح و بولی فقط اگر ستون در همه شیت‌ها باشد)،
+    ترکیب انواع عددی float64 و بقیه حالت‌ها object می‌شود؛ همان نتیجه pd.concat
+    ولی بدون تبدیل نوع تکه‌تکه هنگام ترکیب.
+    """
+    dtypes = {}
+    for column in columns:
+        present = [df[column].dtype for df in frames if column in df.columns]
+        if not present:
+            dtypes[column] = np.dtype(object)
+            continue
+        complete = len(present) == len(frames)
+        first = present[0]
+        if all(dtype == first for dtype in present) and (complete or first.kind in _NULLABLE_KINDS):
+            dtypes[column] = first
+        elif all(isinstance(dtype, np.dtype) and dtype.kind in 'iuf' for dtype in present):
+            dtypes[column] = np.result_type(*present) if complete else np.result_type(*present, np.float64)
+        else:
+            dtypes[column] = np.dtype(object)
+    return dtypes
+
+
+def concat_sheets(frames: Dict[str, pd.DataFrame], sheet_column: str,
+                  columns: Optional[List] = None) -> pd.DataFrame:
+    """ترکیب شیت‌ها با ستون‌های columns (پیش‌فرض: اجتماع ستون‌ها) و ستون categorical نام شیت
+
+    فقط ستون‌های columns از هر شیت برداشته می‌شوند و ستون‌های موجود هر شیت پیش
+    از ترکیب به نوع نهایی تبدیل می‌شوند؛ ستون‌های غایب را pd.concat با همان نوع پر
+    می‌کند. ستون نام شیت از کدهای شیت‌ها ساخته می‌شود (دسته‌ها به ترتیب شیت‌ها) و
+    در جای خود در columns قرار می‌گیرد؛ اگر در columns نباشد اضافه نمی‌شود.
+    """
+    names = list(frames)
+    pieces = list(frames.values())
+    if columns is None:
+        columns = union_columns(pieces, sheet_column)
+    data_columns = [column for column in columns if column != sheet_column]
+    dtypes = union_dtypes(pieces, data_columns)
+
+    aligned = []
+    for df in pieces:
+        present = [column for column in df.columns if column in dtypes]
+        piece = df if len(present) == len(df.columns) else df[present]
+        changed = {column: dtypes[column] for column in present if piece[column].dtype != dtypes[column]}
+        aligned.append(piece.astype(changed) if changed else piece)
+    if aligned:
+        combined = pd.concat(aligned, axis=0, ignore_index=True, sort=False)
+        if list(combined.columns) != data_columns:
+            combined = combined.reindex(columns=data_columns)
+    else:
+        combined = pd.DataFrame(columns=data_columns)
+
+    if sheet_column in columns:
+        lengths = [len(df) for df in pieces]
+        codes = np.repeat(np.arange(len(names)), lengths)
+        categories = [name for name, length in zip(names, lengths) if length]
+        # کدها دوباره به ترتیب دسته‌های غیرخالی نگاشته می‌شوند
+        remap = np.cumsum([bool(length) for length in lengths]) - 1
+        sheet_names = pd.Categorical.from_codes(remap[codes] if len(codes) else codes, categories=categories)
+        combined.insert(list(columns).index(sheet_column), sheet_column, sheet_names)
+    return combined